@@ -0,0 +1,111 @@
+"""Microbenchmark: per-mapping ``diff_members`` vs ``bulk_diff`` over all groups.
+
+Usage::
+
+    python -m benchmarks.diff_bulk --sizes 10 1000 100000 --memberships 1000000 --churn 0.01
+
+For each group size, enough groups are generated to reach ``--memberships``
+in total. ``churn`` is the fraction of groups that changed since the last
+iteration; each changed group swaps 1% of its members. Reported times are
+the best of ``--repeat`` runs, in seconds, for:
+
+- ``diff_members_emails``: the old engine, one call per group on email strings
+- ``diff_members_idents``: the same call on interned idents
+- ``bulk_diff``: one call over all groups' sorted ident arrays
+"""
+
+from __future__ import annotations
+
+import argparse
+from array import array
+import json
+import random
+import sys
+import timeit
+from typing import Any, Dict, List
+
+from sync_service.services.mappers import bulk_diff, diff_members, np
+
+
+def _groups(size: int, count: int, churn: float, seed: int) -> List[tuple]:
+    rng = random.Random(seed)
+    universe = max(size * 4, 1000)
+    groups = []
+    for _ in range(count):
+        current = sorted(rng.sample(range(universe), size))
+        desired = list(current)
+        if rng.random() < churn:
+            swaps = max(size // 100, 1)
+            members = set(desired)
+            for i in rng.sample(range(size), swaps):
+                members.discard(desired[i])
+            while len(members) < size:
+                members.add(rng.randrange(universe))
+            desired = sorted(members)
+        groups.append((desired, current))
+    return groups
+
+
+def run_benchmark(
+    sizes: List[int], memberships: int = 1_000_000, churn: float = 0.01, repeat: int = 3, seed: int = 0
+) -> Dict[str, Any]:
+    results = []
+    for size in sizes:
+        count = max(memberships // size, 1)
+        groups = _groups(size, count, churn, seed)
+        as_emails = [
+            ([f"user{i:07d}@example.com" for i in desired], [f"user{i:07d}@example.com" for i in current])
+            for desired, current in groups
+        ]
+        as_arrays = {n: (array("I", desired), array("I", current)) for n, (desired, current) in enumerate(groups)}
+
+        def run_emails() -> None:
+            for desired, current in as_emails:
+                diff_members(desired, current)
+
+        def run_idents() -> None:
+            for desired, current in as_arrays.values():
+                diff_members(desired, current)
+
+        def run_bulk() -> None:
+            bulk_diff(as_arrays)
+
+        timings = {
+            name: min(timeit.repeat(func, number=1, repeat=repeat))
+            for name, func in (
+                ("diff_members_emails", run_emails),
+                ("diff_members_idents", run_idents),
+                ("bulk_diff", run_bulk),
+            )
+        }
+        results.append(
+            {
+                "group_size": size,
+                "groups": count,
+                "changed_groups": len(bulk_diff(as_arrays)),
+                "seconds": timings,
+                "speedup_vs_emails": timings["diff_members_emails"] / max(timings["bulk_diff"], 1e-9),
+            }
+        )
+    return {
+        "benchmark": "diff_bulk",
+        "params": {"memberships": memberships, "churn": churn, "repeat": repeat, "seed": seed},
+        "numpy": np is not None,
+        "results": results,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--memberships", type=int, default=1_000_000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.sizes, args.memberships, args.churn, args.repeat, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""End-to-end SyncEngine benchmark against a synthetic directory and target.
+
+Usage::
+
+    python -m benchmarks.e2e_sync --users 10000 --groups 50 --group-size 2000 \
+        --churn 0.01 --iterations 5 --output results.json
+
+Results are written as JSON so runs can be compared across versions with
+``--baseline previous.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import logging
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from ldap3 import MOCK_SYNC, MODIFY_REPLACE, Connection, Server
+
+from sync_service.adapters.base import DirectoryProvider
+from sync_service.adapters.ldap_provider import LDAPProvider
+from sync_service.adapters.mock_adapter import MockAdapter
+from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
+from sync_service.domain.models import GroupMapping
+from sync_service.metrics import registry
+from sync_service.services.sync_engine import SyncEngine
+from sync_service.utils.synthetic import (
+    BASE_DN,
+    SyntheticDataset,
+    apply_churn,
+    generate_dataset,
+    write_ldif,
+)
+
+from .owui_standin import PATH_TEMPLATES, OpenWebUIStandIn
+
+BENCHMARK_NAME = "e2e_sync"
+
+
+@dataclass
+class BenchmarkParams:
+    users: int = 1000
+    groups: int = 10
+    group_size: int = 100
+    churn: float = 0.01
+    missing_ratio: float = 0.0
+    iterations: int = 3
+    directory: str = "memory"
+    target: str = "standin"
+    seed: int = 0
+
+
+class SyntheticDirectory(DirectoryProvider):
+    """Directory provider reading group members straight from a dataset."""
+
+    def __init__(self, dataset: SyntheticDataset) -> None:
+        self.dataset = dataset
+
+    def get_group_members(self, group_dn: str) -> Iterable[str]:
+        users = self.dataset.directory_users
+        return [users[dn] for dn in self.dataset.ldap_groups.get(group_dn, [])]
+
+
+def build_mock_connection(dataset: SyntheticDataset) -> Connection:
+    """Load the dataset into an ldap3 MOCK_SYNC server."""
+    server = Server("synthetic", get_info=MOCK_SYNC)
+    conn = Connection(server, user=f"cn=admin,{BASE_DN}", password="pw", client_strategy=MOCK_SYNC)
+    conn.bind()
+    for dn, email in dataset.directory_users.items():
+        conn.strategy.add_entry(dn, {"objectClass": ["inetOrgPerson"], "mail": email})
+    for dn, members in dataset.ldap_groups.items():
+        conn.strategy.add_entry(dn, {"objectClass": ["groupOfNames"], "member": list(members)})
+    return conn
+
+
+def build_directory(dataset: SyntheticDataset, kind: str) -> DirectoryProvider:
+    if kind == "memory":
+        return SyntheticDirectory(dataset)
+    return LDAPProvider(
+        url="ldap://synthetic",
+        bind_dn=f"cn=admin,{BASE_DN}",
+        bind_password="pw",
+        base_dn=BASE_DN,
+        group_object_class="groupOfNames",
+        membership_attr="member",
+        user_filter="(objectClass=inetOrgPerson)",
+        identity_attr="mail",
+        connection=build_mock_connection(dataset),
+    )
+
+
+def sync_directory(directory: DirectoryProvider, dataset: SyntheticDataset) -> None:
+    """Push churned memberships into the MOCK_SYNC server."""
+    if isinstance(directory, LDAPProvider):
+        for dn, members in dataset.ldap_groups.items():
+            directory.conn.modify(dn, {"member": [(MODIFY_REPLACE, list(members))]})
+
+
+class MockAdapterTarget:
+    """Exposes MockAdapter call counts like the HTTP stand-in."""
+
+    def __init__(self, dataset: SyntheticDataset) -> None:
+        self.adapter = MockAdapter(base_url="mock://", api_key="", dataset=dataset)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    @property
+    def requests(self) -> Dict[str, int]:
+        return {k: v for k, v in self.adapter.calls.items() if k != "refresh_users"}
+
+    def reset_counters(self) -> None:
+        self.adapter.calls.clear()
+
+
+def build_target(dataset: SyntheticDataset, kind: str) -> OpenWebUIStandIn | MockAdapterTarget:
+    if kind == "mock_adapter":
+        return MockAdapterTarget(dataset)
+    return OpenWebUIStandIn(dataset)
+
+
+def build_engine(
+    dataset: SyntheticDataset,
+    target: OpenWebUIStandIn | MockAdapterTarget,
+    directory: DirectoryProvider,
+) -> SyncEngine:
+    if isinstance(target, MockAdapterTarget):
+        adapter = target.adapter
+    else:
+        adapter = OpenWebUIAdapter(base_url="http://owui.test", api_key="bench", path_templates=PATH_TEMPLATES)
+        adapter.client = target.client()
+    mappings = [GroupMapping(**m) for m in dataset.mappings]
+    return SyncEngine(directory, adapter, mappings, retries=1, name=BENCHMARK_NAME)
+
+
+def _external_calls_total() -> float:
+    return registry.get_sample_value("sync_external_calls_sum", {"engine": BENCHMARK_NAME}) or 0.0
+
+
+def _peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark(params: BenchmarkParams) -> Dict[str, Any]:
+    """Run the benchmark and return machine-readable results."""
+    setup_start = time.perf_counter()
+    dataset = generate_dataset(
+        users=params.users,
+        groups=params.groups,
+        group_size=params.group_size,
+        missing_ratio=params.missing_ratio,
+        seed=params.seed,
+    )
+    target = build_target(dataset, params.target)
+    directory = build_directory(dataset, params.directory)
+    engine = build_engine(dataset, target, directory)
+    setup_seconds = time.perf_counter() - setup_start
+
+    iterations: List[Dict[str, Any]] = []
+    for i in range(params.iterations + 1):
+        changed = apply_churn(dataset, params.churn, seed=params.seed + i) if i else 0
+        sync_directory(directory, dataset)
+        target.reset_counters()
+        calls_before = _external_calls_total()
+        # The last iteration runs under tracemalloc to measure allocations
+        # without distorting the timed iterations.
+        traced = i == params.iterations
+        if traced:
+            tracemalloc.start()
+        start = time.perf_counter()
+        engine.run_iteration()
+        wall = time.perf_counter() - start
+        result: Dict[str, Any] = {
+            "iteration": i,
+            "wall_seconds": wall,
+            "memberships_changed": changed,
+            "external_calls": int(_external_calls_total() - calls_before),
+            "target_requests": dict(target.requests),
+            "target_bytes_sent": target.bytes_sent,
+            "target_bytes_received": target.bytes_received,
+        }
+        if traced:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result["tracemalloc_peak_bytes"] = peak
+        iterations.append(result)
+
+    # Iteration 0 converges the target, the remaining ones are steady state
+    steady = [it for it in iterations[1:-1]] or iterations[1:]
+    walls = sorted(it["wall_seconds"] for it in steady)
+    return {
+        "benchmark": BENCHMARK_NAME,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "params": asdict(params),
+        "dataset": {
+            "directory_users": len(dataset.directory_users),
+            "target_users": len(dataset.target_users),
+            "memberships": dataset.membership_count,
+        },
+        "setup_seconds": setup_seconds,
+        "iterations": iterations,
+        "summary": {
+            "first_iteration_seconds": iterations[0]["wall_seconds"],
+            "steady_median_seconds": walls[len(walls) // 2] if walls else None,
+            "steady_max_seconds": walls[-1] if walls else None,
+            "steady_external_calls": steady[-1]["external_calls"] if steady else None,
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "tracemalloc_peak_bytes": iterations[-1]["tracemalloc_peak_bytes"],
+        },
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, float]:
+    """Return current/baseline ratios for numeric summary fields."""
+    ratios = {}
+    for key, value in current["summary"].items():
+        base = baseline.get("summary", {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(base, (int, float)) and base:
+            ratios[key] = value / base
+    return ratios
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=BenchmarkParams.users)
+    parser.add_argument("--groups", type=int, default=BenchmarkParams.groups)
+    parser.add_argument("--group-size", type=int, default=BenchmarkParams.group_size)
+    parser.add_argument("--churn", type=float, default=BenchmarkParams.churn, help="fraction of each group's members swapped per iteration")
+    parser.add_argument("--missing-ratio", type=float, default=BenchmarkParams.missing_ratio, help="fraction of directory users without a target account")
+    parser.add_argument("--iterations", type=int, default=BenchmarkParams.iterations)
+    parser.add_argument("--directory", choices=("memory", "mock_sync"), default=BenchmarkParams.directory, help="mock_sync goes through LDAPProvider and an ldap3 MOCK_SYNC server")
+    parser.add_argument("--target", choices=("standin", "mock_adapter"), default=BenchmarkParams.target, help="mock_adapter skips HTTP and JSON entirely")
+    parser.add_argument("--seed", type=int, default=BenchmarkParams.seed)
+    parser.add_argument("--output", type=Path, help="write JSON results here instead of stdout")
+    parser.add_argument("--baseline", type=Path, help="previous results to compare against")
+    parser.add_argument("--write-ldif", type=Path, help="also write the generated directory as LDIF")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level)
+    params = BenchmarkParams(
+        users=args.users,
+        groups=args.groups,
+        group_size=args.group_size,
+        churn=args.churn,
+        missing_ratio=args.missing_ratio,
+        iterations=args.iterations,
+        directory=args.directory,
+        target=args.target,
+        seed=args.seed,
+    )
+    if args.write_ldif:
+        dataset = generate_dataset(params.users, params.groups, params.group_size, params.missing_ratio, params.seed)
+        write_ldif(dataset, args.write_ldif)
+
+    results = run_benchmark(params)
+    if args.baseline:
+        results["compared_to_baseline"] = compare(results, json.loads(args.baseline.read_text()))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Memory used by an engine's membership state: raw dicts/strings vs interned idents.
+
+Usage::
+
+    python -m benchmarks.identity_memory --users 50000 --groups 500 --group-size 2000
+
+The "dicts" representation is what an iteration held before identities were
+interned: parsed API groups with string ``user_ids``, user dicts keyed by id
+and a set of freshly decoded LDAP email strings per mapping. The "interned"
+representation is an ``IdentityTable`` plus ``GroupRecord`` arrays for both
+sides. Both are built from the same JSON payloads and measured with
+tracemalloc.
+"""
+
+from __future__ import annotations
+
+import argparse
+from array import array
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from sync_service.domain.identity import GroupRecord, IdentityTable, UserRecord
+from sync_service.utils.synthetic import generate_dataset
+
+
+def _measure(build: Callable[[], Any]) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    state = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del state
+    return {"retained_bytes": retained, "peak_bytes": peak}
+
+
+def run_benchmark(users: int, groups: int, group_size: int, seed: int = 0) -> Dict[str, Any]:
+    dataset = generate_dataset(users=users, groups=groups, group_size=group_size, seed=seed)
+    users_payload = json.dumps({"users": dataset.target_users}).encode()
+    groups_payload = json.dumps(dataset.target_groups).encode()
+    # LDAP returns every group's member emails as new string objects
+    ldap_payload = json.dumps(
+        [[dataset.directory_users[dn] for dn in members] for members in dataset.ldap_groups.values()]
+    ).encode()
+
+    def build_dicts() -> Any:
+        users_by_id = {u["id"]: u for u in json.loads(users_payload)["users"]}
+        all_groups = json.loads(groups_payload)
+        ldap_sets = [set(emails) for emails in json.loads(ldap_payload)]
+        return users_by_id, all_groups, ldap_sets
+
+    def build_interned() -> Any:
+        table = IdentityTable()
+        users_by_id: Dict[str, UserRecord] = {}
+        for u in json.loads(users_payload)["users"]:
+            users_by_id[u["id"]] = UserRecord(u["id"], u["email"], u["updated_at"])
+            table.bind(u["email"], u["id"])
+        records: List[GroupRecord] = [GroupRecord.from_api(g, table) for g in json.loads(groups_payload)]
+        desired: List[array] = [table.members_from_emails(emails) for emails in json.loads(ldap_payload)]
+        return table, users_by_id, records, desired
+
+    dicts = _measure(build_dicts)
+    interned = _measure(build_interned)
+    return {
+        "benchmark": "identity_memory",
+        "params": {"users": users, "groups": groups, "group_size": group_size, "seed": seed},
+        "memberships": dataset.membership_count,
+        "dicts": dicts,
+        "interned": interned,
+        "retained_ratio": dicts["retained_bytes"] / max(interned["retained_bytes"], 1),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--group-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.users, args.groups, args.group_size, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Bytes on the wire and peak memory of a full user refresh and a group update.
+
+Usage::
+
+    python -m benchmarks.json_transfer --users 100000
+
+Two adapter configurations run against the same in-process target:
+
+- ``baseline``: identity-encoded responses parsed as one document, and an
+  uncompressed ``update_group`` body
+- ``fast``: ``stream_json`` and ``compress_requests``, with the target
+  gzipping responses for clients that accept it
+
+The listing is produced lazily in chunks, as a real server would send it.
+After a first refresh builds the index, ``--churn`` of the users are updated
+and a second full refresh is measured: ``peak_bytes`` is its tracemalloc
+peak and ``index_bytes`` what the rebuilt user index retains.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Any, Dict, Iterator, List
+import zlib
+
+import httpx
+
+from benchmarks.owui_standin import PATH_TEMPLATES
+from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
+from sync_service.utils.synthetic import generate_dataset
+
+MODES = {
+    "baseline": {"stream_json": False, "compress_requests": False, "gzip_responses": False},
+    "fast": {"stream_json": True, "compress_requests": True, "gzip_responses": True},
+}
+
+
+class _Target:
+    """Serves the user listing in chunks and counts bytes in both directions."""
+
+    def __init__(self, users: List[Dict[str, Any]], gzip_responses: bool, batch: int = 1000) -> None:
+        self.users = users
+        self.gzip_responses = gzip_responses
+        self.batch = batch
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.bytes_received += len(request.read())
+        if request.method == "GET":
+            chunks = self._listing()
+            headers = {"content-type": "application/json"}
+            if self.gzip_responses and "gzip" in request.headers.get("accept-encoding", ""):
+                chunks = _gzip(chunks)
+                headers["content-encoding"] = "gzip"
+            return httpx.Response(200, content=self._count(chunks), headers=headers)
+        return httpx.Response(200, json={})
+
+    def _listing(self) -> Iterator[bytes]:
+        yield b'{"users": ['
+        for start in range(0, len(self.users), self.batch):
+            batch = json.dumps(self.users[start : start + self.batch])[1:-1]
+            yield ((", " if start else "") + batch).encode()
+        yield f'], "total": {len(self.users)}}}'.encode()
+
+    def _count(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk)
+    yield compressor.flush()
+
+
+def _run_mode(
+    users: List[Dict[str, Any]], member_ids: List[str], mode: Dict[str, bool], churn: float
+) -> Dict[str, int]:
+    target = _Target(users, mode["gzip_responses"])
+    adapter = OpenWebUIAdapter(
+        base_url="http://bench",
+        api_key="x",
+        path_templates=PATH_TEMPLATES,
+        full_user_refresh_seconds=0,
+        stream_json=mode["stream_json"],
+        compress_requests=mode["compress_requests"],
+    )
+    adapter.client = httpx.Client(transport=httpx.MockTransport(target.handle))
+    adapter.refresh_users()
+    # Measure a later full refresh, where a few users changed since the index was built
+    for user in users[:: max(len(users) // max(int(len(users) * churn), 1), 1)]:
+        user["updated_at"] += 1
+    target.bytes_sent = target.bytes_received = 0
+
+    gc.collect()
+    tracemalloc.start()
+    adapter.refresh_users()
+    index_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    listing_bytes = target.bytes_sent
+
+    adapter.update_group_users("g1", member_ids, "group")
+    return {
+        "listing_wire_bytes": listing_bytes,
+        "update_wire_bytes": target.bytes_received,
+        "peak_bytes": peak_bytes,
+        "index_bytes": index_bytes,
+        "indexed_users": len(adapter.users_by_id),
+    }
+
+
+def run_benchmark(users: int, group_size: int | None = None, churn: float = 0.01, seed: int = 0) -> Dict[str, Any]:
+    dataset = generate_dataset(users=users, groups=1, group_size=1, seed=seed)
+    member_ids = [u["id"] for u in dataset.target_users[: group_size or users]]
+    results = {name: _run_mode(dataset.target_users, member_ids, mode, churn) for name, mode in MODES.items()}
+    baseline, fast = results["baseline"], results["fast"]
+    return {
+        "benchmark": "json_transfer",
+        "params": {"users": users, "group_size": len(member_ids), "churn": churn, "seed": seed},
+        "results": results,
+        "listing_wire_ratio": baseline["listing_wire_bytes"] / max(fast["listing_wire_bytes"], 1),
+        "update_wire_ratio": baseline["update_wire_bytes"] / max(fast["update_wire_bytes"], 1),
+        "peak_ratio": baseline["peak_bytes"] / max(fast["peak_bytes"], 1),
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--group-size", type=int, default=None, help="members in the update (default: all users)")
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of users updated before the measured refresh")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run_benchmark(args.users, args.group_size, args.churn, args.seed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""In-process LiteLLM proxy stand-in served through ``httpx.MockTransport``."""
+
+from __future__ import annotations
+
+from collections import Counter
+import json
+import math
+from typing import Any, Dict, Iterable, List
+
+import httpx
+
+
+class LiteLLMStandIn:
+    """Serves the team and user endpoints the LiteLLM adapter uses.
+
+    ``users`` are ``{"user_id", "user_email"}`` dicts and ``teams`` map a
+    team id to its alias and member user ids. Requests are counted per
+    route in ``requests``; calls without the master key get 401.
+    """
+
+    def __init__(
+        self,
+        users: Iterable[Dict[str, Any]],
+        teams: Dict[str, Dict[str, Any]],
+        master_key: str = "sk-master",
+    ) -> None:
+        self.master_key = master_key
+        self.users: Dict[str, Dict[str, Any]] = {u["user_id"]: dict(u) for u in users}
+        self.teams: Dict[str, Dict[str, Any]] = {
+            team_id: {"team_alias": t["team_alias"], "members": list(t.get("members", []))}
+            for team_id, t in teams.items()
+        }
+        self.requests: Counter[str] = Counter()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def client(self) -> httpx.Client:
+        return httpx.Client(transport=self.transport())
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.headers.get("authorization") != f"Bearer {self.master_key}":
+            return httpx.Response(401, json={"error": "Authentication Error"})
+        route = f"{request.method} {request.url.path}"
+        self.requests[route] += 1
+        if route == "GET /team/list":
+            return httpx.Response(200, json=[self._team(team_id) for team_id in self.teams])
+        if route == "GET /user/list":
+            return httpx.Response(200, json=self._list_users(request.url.params))
+        body = json.loads(request.content or b"{}")
+        team = self.teams.get(body.get("team_id"))
+        if team is None:
+            return httpx.Response(404, json={"error": "Team not found"})
+        if route == "POST /team/member_add":
+            members = body["member"] if isinstance(body["member"], list) else [body["member"]]
+            for member in members:
+                if member["user_id"] in team["members"]:
+                    return httpx.Response(400, json={"error": f"User {member['user_id']} already in team"})
+                team["members"].append(member["user_id"])
+            return httpx.Response(200, json=self._team(body["team_id"]))
+        if route == "POST /team/member_delete":
+            if body["user_id"] not in team["members"]:
+                return httpx.Response(400, json={"error": "User not in team"})
+            team["members"].remove(body["user_id"])
+            return httpx.Response(200, json=self._team(body["team_id"]))
+        return httpx.Response(404, json={"error": "Not Found"})
+
+    def _team(self, team_id: str) -> Dict[str, Any]:
+        team = self.teams[team_id]
+        return {
+            "team_id": team_id,
+            "team_alias": team["team_alias"],
+            "members_with_roles": [
+                {"user_id": uid, "user_email": self.users.get(uid, {}).get("user_email"), "role": "user"}
+                for uid in team["members"]
+            ],
+        }
+
+    def _list_users(self, params: httpx.QueryParams) -> Dict[str, Any]:
+        users: List[Dict[str, Any]] = list(self.users.values())
+        if "user_email" in params:
+            users = [u for u in users if params["user_email"] in (u.get("user_email") or "")]
+        page, page_size = int(params.get("page", 1)), int(params.get("page_size", 25))
+        return {
+            "users": users[(page - 1) * page_size : page * page_size],
+            "total": len(users),
+            "page": page,
+            "page_size": page_size,
+            "total_pages": max(math.ceil(len(users) / page_size), 1),
+        }
@@ -0,0 +1,103 @@
+"""In-process OpenWebUI API stand-in served through ``httpx.MockTransport``."""
+
+from __future__ import annotations
+
+from collections import Counter
+import json
+import re
+from typing import Any, Dict, List
+
+import httpx
+
+from sync_service.utils.synthetic import SyntheticDataset
+
+# Path templates matching config/config.yaml for the owui service
+PATH_TEMPLATES = {
+    "add_user_to_group": "/api/v1/groups/id/{group_id}/users/add",
+    "group_users": "/api/v1/groups/",
+    "list_groups": "/api/v1/groups/",
+    "list_users": "/api/v1/users/",
+    "remove_user_from_group": "/api/v1/groups/id/{group_id}/users/{user_id}/remove",
+    "update_group": "/api/v1/groups/id/{group_id}/update",
+}
+
+_GROUP_ROUTE = re.compile(r"^/api/v1/groups/id/(?P<group_id>[^/]+)/(?P<action>update|users/add)$")
+
+
+class OpenWebUIStandIn:
+    """Serves the OpenWebUI endpoints the adapter uses from an in-memory dataset.
+
+    Requests are counted per path-template name in ``requests`` and the
+    payload sizes are accumulated, so benchmarks can assert on call volume.
+    """
+
+    def __init__(self, dataset: SyntheticDataset, page_size: int = 100) -> None:
+        self.page_size = page_size
+        self.users: Dict[str, Dict[str, Any]] = {u["id"]: dict(u) for u in dataset.target_users}
+        self.groups: Dict[str, Dict[str, Any]] = {
+            g["id"]: dict(g, user_ids=list(g["user_ids"])) for g in dataset.target_groups
+        }
+        self.requests: Counter[str] = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    def client(self) -> httpx.Client:
+        return httpx.Client(transport=self.transport())
+
+    def reset_counters(self) -> None:
+        self.requests.clear()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.bytes_received += len(request.content)
+        response = self._route(request)
+        self.bytes_sent += len(response.content)
+        return response
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "GET" and path == PATH_TEMPLATES["list_users"]:
+            self.requests["list_users"] += 1
+            return self._json(self._list_users(request.url.params))
+        if request.method == "GET" and path == PATH_TEMPLATES["list_groups"]:
+            self.requests["list_groups"] += 1
+            return self._json(list(self.groups.values()))
+        match = _GROUP_ROUTE.match(path)
+        if request.method == "POST" and match:
+            group = self.groups.get(match["group_id"])
+            if group is None:
+                return self._json({"detail": "Group not found"}, status_code=404)
+            body = json.loads(request.content or b"{}")
+            if match["action"] == "update":
+                self.requests["update_group"] += 1
+                group.update(
+                    name=body.get("name", group["name"]),
+                    description=body.get("description", group.get("description", "")),
+                    user_ids=list(body.get("user_ids", [])),
+                )
+            else:
+                self.requests["add_user_to_group"] += 1
+                known = set(group["user_ids"])
+                group["user_ids"].extend(u for u in body.get("user_ids", []) if u not in known)
+            return self._json(group)
+        self.requests["unknown"] += 1
+        return self._json({"detail": "Not Found"}, status_code=404)
+
+    def _list_users(self, params: httpx.QueryParams) -> Dict[str, Any]:
+        users: List[Dict[str, Any]] = list(self.users.values())
+        order_by = params.get("order_by")
+        if order_by:
+            users.sort(key=lambda u: u.get(order_by) or 0, reverse=params.get("direction") == "desc")
+        if "page" in params:
+            start = (int(params["page"]) - 1) * self.page_size
+            page = users[start : start + self.page_size]
+            return {"users": page, "total": len(users)}
+        return {"users": users, "total": len(users)}
+
+    @staticmethod
+    def _json(payload: Any, status_code: int = 200) -> httpx.Response:
+        return httpx.Response(status_code, content=json.dumps(payload).encode(), headers={"content-type": "application/json"})
@@ -1,78 +1,237 @@
 #!/usr/bin/env python3
-"""Mock API server for testing OpenWebUI endpoints."""
+"""Mock API server for testing OpenWebUI endpoints.
 
-from fastapi import FastAPI, HTTPException
-from typing import List, Dict, Any
+Without options it serves a small demo dataset. For load testing it can
+generate users and groups and inject latency, jitter, errors and 429s:
+
+    python scripts/mock_api.py --users 100000 --groups 500 --group-size 2000 \
+        --latency-ms 20 --jitter-ms 10 --error-rate 0.01 --rate-limit-rate 0.02
+
+Every option can also be set through the matching ``MOCK_*`` environment
+variable (e.g. ``MOCK_USERS``). ``GET /_mock/requests`` returns per-operation
+call counts so benchmarks can assert exact request volumes; ``DELETE`` resets
+them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, fields
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastapi import Body, FastAPI, HTTPException, Query
 import uvicorn
 
-app = FastAPI(title="Mock OpenWebUI API")
-
-# Mock data
-mock_groups = [
-    {"id": "1", "name": "Demo Group A", "description": "Demo group for testing"},
-    {"id": "2", "name": "Demo Group B", "description": "Another demo group"},
-]
-
-mock_users = [
-    {"id": "1", "email": "demo@example.com", "name": "Demo User"},
-]
-
-mock_group_users = {
-    "1": [{"id": "1", "email": "demo@example.com", "name": "Demo User"}],
-    "2": [],
-}
-
-@app.get("/api/v1/groups")
-async def list_groups() -> List[Dict[str, Any]]:
-    """List all groups."""
-    print(f"Received request for groups: {mock_groups}")
-    return mock_groups
-
-@app.get("/api/v1/users")
-async def list_users() -> List[Dict[str, Any]]:
-    """List all users."""
-    return mock_users
-
-@app.get("/api/v1/groups/{group_id}/users")
-async def list_group_users(group_id: str) -> List[Dict[str, Any]]:
-    """List users in a group."""
-    if group_id not in mock_group_users:
-        raise HTTPException(status_code=404, detail="Group not found")
-    return mock_group_users[group_id]
-
-@app.post("/api/v1/groups/{group_id}/users/add")
-async def add_user_to_group(group_id: str, user_data: Dict[str, Any]):
-    """Add user to group."""
-    if group_id not in mock_group_users:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    user_id = user_data.get("user_id")
-    if not user_id:
-        raise HTTPException(status_code=400, detail="user_id is required")
-    
-    # Mock: add user to group
-    if user_id not in [u["id"] for u in mock_group_users[group_id]]:
-        user = next((u for u in mock_users if u["id"] == user_id), None)
-        if user:
-            mock_group_users[group_id].append(user)
-    
-    return {"message": "User added to group"}
-
-@app.delete("/api/v1/groups/{group_id}/users/{user_id}/remove")
-async def remove_user_from_group(group_id: str, user_id: str):
-    """Remove user from group."""
-    if group_id not in mock_group_users:
-        raise HTTPException(status_code=404, detail="Group not found")
-    
-    # Mock: remove user from group
-    mock_group_users[group_id] = [u for u in mock_group_users[group_id] if u["id"] != user_id]
-    
-    return {"message": "User removed from group"}
-
-@app.get("/health")
-async def health():
-    """Health check endpoint."""
-    return {"status": "ok"}
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from sync_service.utils.synthetic import generate_dataset  # noqa: E402
+
+
+@dataclass
+class MockSettings:
+    users: int = 0
+    groups: int = 0
+    group_size: int = 0
+    missing_ratio: float = 0.0
+    seed: int = 0
+    page_size: int = 100
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_seconds: int = 1
+
+    @classmethod
+    def from_env(cls) -> "MockSettings":
+        values = {}
+        for f in fields(cls):
+            raw = os.getenv(f"MOCK_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = type(f.default)(raw)
+        return cls(**values)
+
+
+class MockState:
+    """In-memory users, groups and the request log."""
+
+    def __init__(self, settings: MockSettings) -> None:
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        if settings.users:
+            dataset = generate_dataset(
+                users=settings.users,
+                groups=settings.groups,
+                group_size=settings.group_size,
+                missing_ratio=settings.missing_ratio,
+                seed=settings.seed,
+            )
+            users = dataset.target_users
+            groups = dataset.target_groups
+        else:
+            users = [{"id": "1", "email": "demo@example.com", "name": "Demo User"}]
+            groups = [
+                {"id": "1", "name": "Demo Group A", "description": "Demo group for testing", "user_ids": ["1"]},
+                {"id": "2", "name": "Demo Group B", "description": "Another demo group", "user_ids": []},
+            ]
+        self.users: Dict[str, Dict[str, Any]] = {u["id"]: u for u in users}
+        self.groups: Dict[str, Dict[str, Any]] = {g["id"]: g for g in groups}
+        self.requests: Counter[str] = Counter()
+        self.statuses: Counter[str] = Counter()
+        self.started = time.time()
+
+    async def simulate(self, operation: str) -> None:
+        """Log the call, then apply injected latency and failures."""
+        settings = self.settings
+        self.requests[operation] += 1
+        delay = settings.latency_ms + self.rng.uniform(-settings.jitter_ms, settings.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = self.rng.random()
+        if roll < settings.rate_limit_rate:
+            self.statuses["429"] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(settings.retry_after_seconds)},
+            )
+        if roll < settings.rate_limit_rate + settings.error_rate:
+            self.statuses["500"] += 1
+            raise HTTPException(status_code=500, detail="Injected error")
+        self.statuses["200"] += 1
+
+    def group(self, group_id: str) -> Dict[str, Any]:
+        group = self.groups.get(group_id)
+        if group is None:
+            raise HTTPException(status_code=404, detail="Group not found")
+        return group
+
+
+def create_app(settings: MockSettings) -> FastAPI:
+    app = FastAPI(title="Mock OpenWebUI API")
+    state = MockState(settings)
+    app.state.mock = state
+
+    # Both the mock service templates and the real OpenWebUI ones from
+    # config/config.yaml are served.
+    @app.get("/api/v1/groups", name="list_groups")
+    @app.get("/api/v1/groups/", include_in_schema=False)
+    async def list_groups() -> List[Dict[str, Any]]:
+        """List all groups."""
+        await state.simulate("list_groups")
+        return list(state.groups.values())
+
+    @app.get("/api/v1/users", name="list_users")
+    @app.get("/api/v1/users/", include_in_schema=False)
+    async def list_users(
+        page: int | None = Query(None, ge=1),
+        order_by: str | None = None,
+        direction: str = "asc",
+        query: str | None = None,
+    ) -> Dict[str, Any]:
+        """List users, optionally filtered, ordered and paginated like OpenWebUI."""
+        await state.simulate("list_users")
+        users = list(state.users.values())
+        if query:
+            needle = query.lower()
+            users = [u for u in users if needle in u["email"].lower() or needle in u.get("name", "").lower()]
+        if order_by:
+            users.sort(key=lambda u: u.get(order_by) or 0, reverse=direction == "desc")
+        total = len(users)
+        if page is not None:
+            start = (page - 1) * settings.page_size
+            users = users[start : start + settings.page_size]
+        return {"users": users, "total": total}
+
+    @app.get("/api/v1/groups/{group_id}/users", name="group_users")
+    async def list_group_users(group_id: str) -> List[Dict[str, Any]]:
+        """List users in a group."""
+        await state.simulate("group_users")
+        group = state.group(group_id)
+        return [state.users[u] for u in group["user_ids"] if u in state.users]
+
+    @app.post("/api/v1/groups/{group_id}/users/add", name="add_user_to_group")
+    @app.post("/api/v1/groups/id/{group_id}/users/add", include_in_schema=False)
+    async def add_user_to_group(group_id: str, user_data: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+        """Add users to group; accepts ``user_ids`` or a single ``user_id``."""
+        await state.simulate("add_user_to_group")
+        group = state.group(group_id)
+        user_ids = user_data.get("user_ids") or ([user_data["user_id"]] if user_data.get("user_id") else [])
+        if not user_ids:
+            raise HTTPException(status_code=400, detail="user_ids is required")
+        current = set(group["user_ids"])
+        group["user_ids"].extend(u for u in user_ids if u in state.users and u not in current)
+        return group
+
+    @app.delete("/api/v1/groups/{group_id}/users/{user_id}/remove", name="remove_user_from_group")
+    @app.delete("/api/v1/groups/id/{group_id}/users/{user_id}/remove", include_in_schema=False)
+    async def remove_user_from_group(group_id: str, user_id: str) -> Dict[str, str]:
+        """Remove user from group."""
+        await state.simulate("remove_user_from_group")
+        group = state.group(group_id)
+        group["user_ids"] = [u for u in group["user_ids"] if u != user_id]
+        return {"message": "User removed from group"}
+
+    @app.post("/api/v1/groups/{group_id}", name="update_group")
+    @app.post("/api/v1/groups/id/{group_id}/update", include_in_schema=False)
+    async def update_group(group_id: str, form: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
+        """Replace a group's name, description and member list."""
+        await state.simulate("update_group")
+        group = state.group(group_id)
+        group["name"] = form.get("name", group["name"])
+        group["description"] = form.get("description", group.get("description", ""))
+        if "user_ids" in form:
+            group["user_ids"] = list(dict.fromkeys(form["user_ids"]))
+        return group
+
+    @app.get("/_mock/requests")
+    async def request_log() -> Dict[str, Any]:
+        """Per-operation request counts since start or the last reset."""
+        return {
+            "requests": dict(state.requests),
+            "statuses": dict(state.statuses),
+            "total": sum(state.requests.values()),
+            "since": state.started,
+        }
+
+    @app.delete("/_mock/requests")
+    async def reset_request_log() -> Dict[str, str]:
+        state.requests.clear()
+        state.statuses.clear()
+        state.started = time.time()
+        return {"status": "reset"}
+
+    @app.get("/health")
+    async def health():
+        """Health check endpoint."""
+        return {"status": "ok"}
+
+    return app
+
+
+app = create_app(MockSettings.from_env())
+
+
+def main(argv: List[str] | None = None) -> None:
+    defaults = MockSettings.from_env()
+    parser = argparse.ArgumentParser(description="Mock OpenWebUI API")
+    for f in fields(MockSettings):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}", type=type(f.default), default=getattr(defaults, f.name)
+        )
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args(argv)
+    settings = MockSettings(**{f.name: getattr(args, f.name) for f in fields(MockSettings)})
+    uvicorn.run(create_app(settings), host="0.0.0.0", port=args.port)
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8081)
+    main()
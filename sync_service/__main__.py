@@ -0,0 +1,7 @@
+"""Allow ``python -m sync_service``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+from ..domain.identity import IdentityTable
 
 
 class DirectoryProvider(ABC):
@@ -13,18 +15,76 @@ class DirectoryProvider(ABC):
     def get_group_members(self, group_dn: str) -> Iterable[str]:
         """Return iterable of member emails for given group DN."""
 
+    def connect(self) -> None:
+        """Open connections ahead of the first query; a no-op by default."""
+
+    def close(self) -> None:
+        """Release connections when the provider is discarded; a no-op by default."""
+
+
+# Capabilities a target adapter can declare
+SET_MEMBERS = "set_members"  # replace a group's member list in one call
+ADD_MEMBERS = "add_members"  # add many members in one call
+REMOVE_MEMBERS = "remove_members"  # remove many members in one call
+ADD_MEMBER = "add_member"  # add one member per call
+REMOVE_MEMBER = "remove_member"  # remove one member per call
+PAGINATION = "pagination"  # user listings are fetched page by page
+CONDITIONAL_GET = "conditional_get"  # listings are revalidated with ETag/Last-Modified
+USER_SEARCH = "user_search"  # individual users can be looked up by email
+
+# Payload size, in ids, that one extra round trip is worth; write plans and
+# user resolution are priced in ids sent or received plus this per request
+REQUEST_COST = 500
+
 
 class ServiceAdapter(ABC):
-    """Abstract interface for target services."""
+    """Abstract interface for target services.
 
-    @abstractmethod
-    def list_group_members(self, group_id: str) -> Iterable[str]:
-        """Return member emails for group."""
+    Members are target user ids. Adapters keep an index of target users in
+    ``identities`` (bumping ``users_version`` when it changes) and declare
+    which write operations they support in ``capabilities``; the engine only
+    calls the operations declared there and picks the cheapest plan among
+    them. Unsupported operations raise NotImplementedError.
+    """
+
+    capabilities: FrozenSet[str] = frozenset()
+    identities: IdentityTable
+    users_version: int
 
     @abstractmethod
-    def add_user_to_group(self, group_id: str, email: str) -> None:
-        """Add user to group by email."""
+    def refresh_users(self) -> List[Dict[str, Any]]:
+        """Update the user index; return users new or changed since the last refresh."""
 
     @abstractmethod
-    def remove_user_from_group(self, group_id: str, email: str) -> None:
-        """Remove user from group by email."""
+    def list_groups(self) -> List[Dict[str, Any]]:
+        """Return groups as dicts with ``id``, ``name``, ``description`` and ``user_ids``."""
+
+    def update_group_users(
+        self, group_id: str, user_ids: Iterable[str], group_name: str, group_description: str = ""
+    ) -> None:
+        """Replace a group's members (``set_members``)."""
+        raise NotImplementedError(SET_MEMBERS)
+
+    def add_group_members(self, group_id: str, user_ids: List[str]) -> None:
+        """Add several members (``add_members``)."""
+        raise NotImplementedError(ADD_MEMBERS)
+
+    def remove_group_members(self, group_id: str, user_ids: List[str]) -> None:
+        """Remove several members (``remove_members``)."""
+        raise NotImplementedError(REMOVE_MEMBERS)
+
+    def add_user_to_group(self, group_id: str, user_id: str) -> None:
+        """Add one member (``add_member``)."""
+        raise NotImplementedError(ADD_MEMBER)
+
+    def remove_user_from_group(self, group_id: str, user_id: str) -> None:
+        """Remove one member (``remove_member``)."""
+        raise NotImplementedError(REMOVE_MEMBER)
+
+    def find_user(self, email: str) -> Dict[str, Any] | None:
+        """Look up one user by email without listing all users (``user_search``)."""
+        raise NotImplementedError(USER_SEARCH)
+
+    def index_users(self, users: List[Dict[str, Any]]) -> None:
+        """Add users found by ``find_user`` to the index (``user_search``)."""
+        raise NotImplementedError(USER_SEARCH)
@@ -4,8 +4,11 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
+from .litellm_adapter import LiteLLMAdapter
 from .openwebui_adapter import OpenWebUIAdapter
 from .mock_adapter import MockAdapter
+from ..utils.http import PoolSettings
+from ..utils.synthetic import generate_dataset
 
 
 def create_service_adapter(cfg: Dict[str, Any]) -> Any:
@@ -16,15 +19,36 @@ def create_service_adapter(cfg: Dict[str, Any]) -> Any:
             base_url=cfg["base_url"],
             api_key=cfg["auth"]["api_key"],
             path_templates=cfg.get("path_templates"),
-            timeout=cfg.get("http", {}).get("request_timeout_seconds", 10),
-            verify_tls=cfg.get("http", {}).get("verify_tls", False),
+            timeout=(cfg.get("http") or {}).get("request_timeout_seconds", 10),
+            verify_tls=(cfg.get("http") or {}).get("verify_tls", False),
+            full_user_refresh_seconds=(cfg.get("sync") or {}).get(
+                "full_user_refresh_seconds", 3600
+            ),
+            pool=PoolSettings.from_config(cfg.get("http")),
+            stream_json=(cfg.get("http") or {}).get("stream_json", False),
+            compress_requests=(cfg.get("http") or {}).get("compress_requests", False),
+            snapshot_max_age_seconds=(cfg.get("sync") or {}).get("target_snapshot_max_age_seconds", 5),
+        )
+    elif adapter_type == "litellm":
+        return LiteLLMAdapter(
+            base_url=cfg["base_url"],
+            api_key=cfg["auth"]["api_key"],
+            path_templates=cfg.get("path_templates"),
+            timeout=(cfg.get("http") or {}).get("request_timeout_seconds", 10),
+            verify_tls=(cfg.get("http") or {}).get("verify_tls", False),
+            team_role=(cfg.get("litellm") or {}).get("team_role", "user"),
+            pool=PoolSettings.from_config(cfg.get("http")),
         )
     elif adapter_type == "mock":
+        mock_cfg = cfg.get("mock") or {}
+        generate = mock_cfg.get("generate")
         return MockAdapter(
             base_url=cfg["base_url"],
             api_key=cfg["auth"]["api_key"],
             path_templates=cfg.get("path_templates"),
-            timeout=cfg.get("http", {}).get("request_timeout_seconds", 10),
-            verify_tls=cfg.get("http", {}).get("verify_tls", False),
+            timeout=(cfg.get("http") or {}).get("request_timeout_seconds", 10),
+            verify_tls=(cfg.get("http") or {}).get("verify_tls", False),
+            dataset=generate_dataset(**generate) if generate else None,
+            dataset_path=mock_cfg.get("dataset_path"),
         )
     raise ValueError(f"Unsupported adapter type: {adapter_type}")
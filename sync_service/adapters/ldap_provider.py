@@ -2,17 +2,27 @@
 
 from __future__ import annotations
 
+from contextlib import contextmanager
 import ssl
-from typing import Iterable, List
+import threading
+from typing import Iterator, List
 
 from ldap3 import Connection, Server, Tls
+from ldap3.core.exceptions import LDAPBindError  # type: ignore[import-untyped]
 
 from .base import DirectoryProvider
 from ..metrics import ldap_lookup_errors_total, track_external_request
 
 
 class LDAPProvider(DirectoryProvider):
-    """Directory provider for Active Directory via LDAP."""
+    """Directory provider for Active Directory via LDAP.
+
+    Searches borrow a bound connection from a pool of at most
+    ``max_connections``, so several pipeline fetch workers can search
+    concurrently and the connection bound during warm-up is reused.
+    :meth:`close` unbinds them. An injected connection is used instead of
+    the pool, by one thread at a time.
+    """
 
     def __init__(
         self,
@@ -27,50 +37,92 @@ class LDAPProvider(DirectoryProvider):
         verify_tls: bool = False,
         timeout: int = 10,
         connection: Connection | None = None,
+        max_connections: int = 4,
     ) -> None:
         self.base_dn = base_dn
         self.group_object_class = group_object_class
         self.membership_attr = membership_attr
         self.user_filter = user_filter
         self.identity_attr = identity_attr
-        if connection is not None:
-            self.conn = connection
-        else:
-            tls_config = Tls(
-                validate=ssl.CERT_REQUIRED if verify_tls else ssl.CERT_NONE
-            )
-            server = Server(url, use_ssl=url.startswith("ldaps"), tls=tls_config)
-            self.conn = Connection(
-                server,
-                user=bind_dn,
-                password=bind_password,
-                receive_timeout=timeout,
-                auto_bind=True,
-            )
+        # Injected connections are bound by the caller
+        self.conn = connection
+        self._bind_dn = bind_dn
+        self._bind_password = bind_password
+        self._timeout = timeout
+        tls_config = Tls(
+            validate=ssl.CERT_REQUIRED if verify_tls else ssl.CERT_NONE
+        )
+        self._server = Server(url, use_ssl=url.startswith("ldaps"), tls=tls_config)
+        self._slots = threading.BoundedSemaphore(1 if connection is not None else max_connections)
+        self._lock = threading.Lock()
+        self._idle: List[Connection] = []
+
+    @contextmanager
+    def _connection(self) -> Iterator[Connection]:
+        """Borrow a bound connection; one that fails mid-use is unbound rather than returned."""
+        with self._slots:
+            if self.conn is not None:
+                yield self.conn
+                return
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = Connection(
+                    self._server,
+                    user=self._bind_dn,
+                    password=self._bind_password,
+                    receive_timeout=self._timeout,
+                )
+            try:
+                if not conn.bound and not conn.bind():
+                    raise LDAPBindError(f"LDAP bind failed: {conn.result}")
+                yield conn
+            except BaseException:
+                conn.unbind()
+                raise
+            with self._lock:
+                self._idle.append(conn)
+
+    def connect(self) -> None:
+        """Bind a pooled connection ahead of the first search."""
+        with self._connection():
+            pass
+
+    def close(self) -> None:
+        """Unbind the pooled connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.unbind()
+
+    def get_group_members(self, group_dn: str) -> Iterator[str]:
+        """Yield member emails for given group DN as they are looked up.
+
+        The pooled connection is held until the iterator is exhausted or closed.
+        """
+        with self._connection() as conn:
+            yield from self._search_members(conn, group_dn)
 
-    def get_group_members(self, group_dn: str) -> Iterable[str]:
-        """Return iterable of member emails for given group DN."""
-        emails: List[str] = []
-        with track_external_request("ldap"):
-            self.conn.search(
+    def _search_members(self, conn: Connection, group_dn: str) -> Iterator[str]:
+        with track_external_request("ldap", "group_search"):
+            conn.search(
                 search_base=group_dn,
                 search_filter=f"(objectClass={self.group_object_class})",
                 attributes=[self.membership_attr],
             )
-        if not self.conn.entries:
-            return emails
-        members = self.conn.entries[0][self.membership_attr].values
+        if not conn.entries:
+            return
+        members = conn.entries[0][self.membership_attr].values
         for dn in members:
-            with track_external_request("ldap"):
-                self.conn.search(
+            with track_external_request("ldap", "member_lookup"):
+                conn.search(
                     search_base=dn,
                     search_filter=self.user_filter,
                     attributes=[self.identity_attr],
                 )
-            if not self.conn.entries:
+            if not conn.entries:
                 ldap_lookup_errors_total.inc()
                 continue
-            mail = self.conn.entries[0][self.identity_attr].value
+            mail = conn.entries[0][self.identity_attr].value
             if mail:
-                emails.append(str(mail))
-        return emails
+                yield str(mail)
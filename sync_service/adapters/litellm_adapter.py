@@ -1,5 +1,136 @@
-"""Stub adapter for LiteLLM."""
+"""LiteLLM proxy adapter: LDAP groups are synced to team memberships."""
 
+from __future__ import annotations
 
-class LiteLLMAdapter:
-    pass
+from typing import Any, Dict, List
+
+import httpx
+
+from ..domain.identity import IdentityTable, UserRecord
+from ..metrics import sync_errors_total, track_external_request
+from ..utils.http import PoolSettings, ServiceClient
+from .base import ADD_MEMBERS, PAGINATION, REMOVE_MEMBER, USER_SEARCH, ServiceAdapter
+
+
+class LiteLLMAdapter(ServiceAdapter):
+    """Adapter for the LiteLLM proxy management API.
+
+    Teams are the target groups, named by ``team_alias``, and members are
+    LiteLLM user ids. Members are added in bulk with ``member_add`` and
+    removed one at a time with ``member_delete``; users are listed page by
+    page and can be looked up by email.
+    """
+
+    capabilities = frozenset({ADD_MEMBERS, REMOVE_MEMBER, PAGINATION, USER_SEARCH})
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        path_templates: Dict[str, str] | None = None,
+        timeout: float = 10.0,
+        verify_tls: bool = False,
+        users_page_size: int = 100,
+        team_role: str = "user",
+        pool: PoolSettings | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.users_page_size = users_page_size
+        # Role given to members added by the sync
+        self.team_role = team_role
+        self.path_templates = {
+            "list_groups": "/team/list",
+            "list_users": "/user/list",
+            "add_members": "/team/member_add",
+            "remove_member": "/team/member_delete",
+        }
+        if path_templates:
+            self.path_templates.update(path_templates)
+        self.client = ServiceClient(
+            self.base_url,
+            pool or PoolSettings(verify=verify_tls),
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+        )
+        self.identities = IdentityTable()
+        self.users_by_id: Dict[str, UserRecord] = {}
+        # Bumped whenever the cached user set changes
+        self.users_version = 0
+
+    def _request(self, operation: str, method: str, **kwargs: Any) -> httpx.Response:
+        with track_external_request("litellm", operation):
+            resp = self.client.request(method, self.base_url + self.path_templates[operation], **kwargs)
+        if resp.is_error:
+            sync_errors_total.labels(target="litellm", kind="http").inc()
+            resp.raise_for_status()
+        return resp
+
+    def list_groups(self) -> List[Dict[str, Any]]:
+        teams = self._request("list_groups", "GET").json()
+        return [
+            {
+                "id": team["team_id"],
+                "name": team.get("team_alias") or team["team_id"],
+                "description": "",
+                "user_ids": [m["user_id"] for m in team.get("members_with_roles") or () if m.get("user_id")],
+            }
+            for team in teams
+        ]
+
+    def list_users(self) -> List[Dict[str, Any]]:
+        """All users, one page at a time."""
+        users: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            params = {"page": page, "page_size": self.users_page_size}
+            data = self._request("list_users", "GET", params=params).json()
+            batch = data.get("users") or []
+            users.extend(batch)
+            if len(batch) < self.users_page_size or page >= data.get("total_pages", page + 1):
+                return users
+            page += 1
+
+    def refresh_users(self) -> List[Dict[str, Any]]:
+        """Re-index all users; returns the ones new or changed since the last refresh."""
+        users = {u["user_id"]: u for u in self.list_users()}
+        removed = self.users_by_id.keys() - users.keys()
+        changed = [u for uid, u in users.items() if self._is_changed(uid, u)]
+        for uid in removed:
+            del self.users_by_id[uid]
+            self.identities.unbind(uid)
+        for user in changed:
+            self._index_user(user)
+        if changed or removed:
+            self.users_version += 1
+        return changed
+
+    def _is_changed(self, user_id: str, user: Dict[str, Any]) -> bool:
+        cached = self.users_by_id.get(user_id)
+        return cached is None or cached.email != (user.get("user_email") or "")
+
+    def _index_user(self, user: Dict[str, Any]) -> None:
+        record = UserRecord(user["user_id"], user.get("user_email") or "")
+        self.users_by_id[record.id] = record
+        if record.email:
+            self.identities.bind(record.email, record.id)
+        else:
+            self.identities.unbind(record.id)
+
+    def find_user(self, email: str) -> Dict[str, Any] | None:
+        """Look up a user by exact email; the listing filter also matches partially."""
+        data = self._request("list_users", "GET", params={"user_email": email, "page": 1}).json()
+        return next((u for u in data.get("users") or () if u.get("user_email") == email), None)
+
+    def index_users(self, users: List[Dict[str, Any]]) -> None:
+        changed = [u for u in users if self._is_changed(u["user_id"], u)]
+        for user in changed:
+            self._index_user(user)
+        if changed:
+            self.users_version += 1
+
+    def add_group_members(self, group_id: str, user_ids: List[str]) -> None:
+        members = [{"role": self.team_role, "user_id": user_id} for user_id in user_ids]
+        self._request("add_members", "POST", json={"team_id": group_id, "member": members})
+
+    def remove_user_from_group(self, group_id: str, user_id: str) -> None:
+        self._request("remove_member", "POST", json={"team_id": group_id, "user_id": user_id})
@@ -2,16 +2,28 @@
 
 from __future__ import annotations
 
+from collections import Counter
+import json
 import logging
-from typing import Any, Dict, List, Iterable
+from pathlib import Path
+from typing import Any, Dict, List, Iterable, Set
 
-from .base import ServiceAdapter
+from .base import ADD_MEMBER, REMOVE_MEMBER, SET_MEMBERS, ServiceAdapter
+from ..domain.identity import IdentityTable, UserRecord
+from ..utils.synthetic import SyntheticDataset, generate_dataset
 
 logger = logging.getLogger(__name__)
 
 
 class MockAdapter(ServiceAdapter):
-    """Mock adapter for testing purposes."""
+    """Indexed in-memory target for tests and benchmarks.
+
+    Users and groups are kept in dicts keyed by id and memberships as sets,
+    so every operation is O(1) per user regardless of dataset size. Calls are
+    counted per operation in ``calls``.
+    """
+
+    capabilities = frozenset({SET_MEMBERS, ADD_MEMBER, REMOVE_MEMBER})
 
     def __init__(
         self,
@@ -20,21 +32,68 @@ class MockAdapter(ServiceAdapter):
         path_templates: Dict[str, str] | None = None,
         timeout: int = 10,
         verify_tls: bool = False,
+        dataset: SyntheticDataset | None = None,
+        dataset_path: str | None = None,
     ) -> None:
         self.base_url = base_url
         self.api_key = api_key
         self.path_templates = path_templates or {}
         self.timeout = timeout
         self.verify_tls = verify_tls
-        
-        # Mock data
-        self.mock_groups = [
-            {"id": "mock-group-1", "name": "Mock Group 1", "user_ids": []},
-            {"id": "mock-group-2", "name": "Mock Group 2", "user_ids": []},
-        ]
-        self.mock_users = [
-            {"id": "mock-user-1", "email": "demo@example.com"},
-        ]
+
+        self.calls: Counter[str] = Counter()
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.members: Dict[str, Set[str]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        # Cached user index as seen by the engine, maintained by refresh_users()
+        self.identities = IdentityTable()
+        self.users_by_id: Dict[str, UserRecord] = {}
+        self.users_version = 0
+        self._dirty_user_ids: Set[str] = set()
+
+        if dataset is not None:
+            self.seed(dataset.target_users, dataset.target_groups)
+        elif dataset_path:
+            self.load(Path(dataset_path))
+        else:
+            # Mock data
+            self.seed(
+                users=[{"id": "mock-user-1", "email": "demo@example.com"}],
+                groups=[
+                    {"id": "mock-group-1", "name": "Mock Group 1", "user_ids": []},
+                    {"id": "mock-group-2", "name": "Mock Group 2", "user_ids": []},
+                ],
+            )
+
+    @classmethod
+    def generated(cls, users: int, groups: int, group_size: int, seed: int = 0, **kwargs: Any) -> "MockAdapter":
+        """Create an adapter seeded with a synthetic dataset."""
+        dataset = generate_dataset(users=users, groups=groups, group_size=group_size, seed=seed)
+        return cls(base_url=kwargs.pop("base_url", "mock://"), api_key=kwargs.pop("api_key", ""), dataset=dataset, **kwargs)
+
+    def seed(self, users: Iterable[Dict[str, Any]], groups: Iterable[Dict[str, Any]]) -> None:
+        """Replace all data with ``users`` and ``groups`` in OpenWebUI API shape."""
+        self.users = {u["id"]: dict(u) for u in users}
+        self.groups = {}
+        self.members = {}
+        for group in groups:
+            self.groups[group["id"]] = {k: v for k, v in group.items() if k != "user_ids"}
+            self.members[group["id"]] = set(group.get("user_ids", []))
+        self._dirty_user_ids = set(self.users)
+
+    def load(self, path: Path) -> None:
+        """Seed from a recorded JSON file with ``users`` and ``groups`` lists."""
+        data = json.loads(path.read_text())
+        self.seed(data.get("users", []), data.get("groups", []))
+
+    def dump(self, path: Path) -> None:
+        """Record the current data in the format accepted by ``load``."""
+        path.write_text(json.dumps({"users": list(self.users.values()), "groups": self.list_groups()}))
+
+    def add_user(self, user: Dict[str, Any]) -> None:
+        """Create or replace a target user account."""
+        self.users[user["id"]] = dict(user)
+        self._dirty_user_ids.add(user["id"])
 
     def _url(self, key: str, **params: Any) -> str:
         """Build URL from template."""
@@ -43,48 +102,63 @@ class MockAdapter(ServiceAdapter):
 
     def list_groups(self) -> List[Dict[str, Any]]:
         """List all groups."""
-        logger.info("Mock: listing groups")
-        return self.mock_groups
+        self.calls["list_groups"] += 1
+        logger.debug(f"Mock: listing {len(self.groups)} groups")
+        return [dict(g, user_ids=list(self.members[gid])) for gid, g in self.groups.items()]
 
     def list_users(self) -> List[Dict[str, Any]]:
         """List all users."""
-        logger.info("Mock: listing users")
-        return self.mock_users
+        self.calls["list_users"] += 1
+        logger.debug(f"Mock: listing {len(self.users)} users")
+        return list(self.users.values())
+
+    def refresh_users(self) -> List[Dict[str, Any]]:
+        """Update the user index and return users added or changed since the last refresh."""
+        self.calls["refresh_users"] += 1
+        removed = self.users_by_id.keys() - self.users.keys()
+        changed = [self.users[uid] for uid in self._dirty_user_ids if uid in self.users]
+        self._dirty_user_ids = set()
+        for uid in removed:
+            del self.users_by_id[uid]
+            self.identities.unbind(uid)
+        for user in changed:
+            self.users_by_id[user["id"]] = UserRecord(user["id"], user["email"])
+            self.identities.bind(user["email"], user["id"])
+        if changed or removed:
+            self.users_version += 1
+        return changed
 
     def list_group_users(self, group_id: str) -> List[Dict[str, Any]]:
         """List users in a group."""
-        logger.info(f"Mock: listing users for group {group_id}")
-        group = next((g for g in self.mock_groups if g["id"] == group_id), None)
-        if group:
-            return [u for u in self.mock_users if u["id"] in group["user_ids"]]
-        return []
+        self.calls["group_users"] += 1
+        return [self.users[uid] for uid in self.members.get(group_id, ()) if uid in self.users]
 
     def list_group_members(self, group_id: str) -> Iterable[str]:
         """Return member emails for group."""
-        logger.info(f"Mock: listing group members for group {group_id}")
-        group = next((g for g in self.mock_groups if g["id"] == group_id), None)
-        if group:
-            return [u["email"] for u in self.mock_users if u["id"] in group["user_ids"]]
-        return []
+        self.calls["list_group_members"] += 1
+        return [self.users[uid]["email"] for uid in self.members.get(group_id, ()) if uid in self.users]
 
     def add_user_to_group(self, group_id: str, user_id: str) -> None:
         """Add user to group."""
-        logger.info(f"Mock: adding user {user_id} to group {group_id}")
-        group = next((g for g in self.mock_groups if g["id"] == group_id), None)
-        if group and user_id not in group["user_ids"]:
-            group["user_ids"].append(user_id)
+        self.calls["add_user_to_group"] += 1
+        logger.debug(f"Mock: adding user {user_id} to group {group_id}")
+        if group_id in self.members:
+            self.members[group_id].add(user_id)
 
     def remove_user_from_group(self, group_id: str, user_id: str) -> None:
         """Remove user from group."""
-        logger.info(f"Mock: removing user {user_id} from group {group_id}")
-        group = next((g for g in self.mock_groups if g["id"] == group_id), None)
-        if group and user_id in group["user_ids"]:
-            group["user_ids"].remove(user_id)
+        self.calls["remove_user_from_group"] += 1
+        logger.debug(f"Mock: removing user {user_id} from group {group_id}")
+        if group_id in self.members:
+            self.members[group_id].discard(user_id)
 
-    def update_group_users(self, group_id: str, user_ids: List[str], group_name: str, group_description: str = "") -> None:
+    def update_group_users(self, group_id: str, user_ids: Iterable[str], group_name: str, group_description: str = "") -> None:
         """Update group with new user list."""
-        logger.info(f"Mock: updating group {group_id} with users {user_ids}")
-        group = next((g for g in self.mock_groups if g["id"] == group_id), None)
-        if group:
-            group["user_ids"] = user_ids
+        self.calls["update_group"] += 1
+        members = set(user_ids)
+        logger.debug(f"Mock: updating group {group_id} with {len(members)} users")
+        group = self.groups.get(group_id)
+        if group is not None:
+            self.members[group_id] = members
             group["name"] = group_name
+            group["description"] = group_description
@@ -2,16 +2,51 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import gzip
+import hashlib
+import json
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+import zlib
 
 import httpx
 
-from ..metrics import owui_http_errors_total, track_external_request
+from ..domain.identity import IdentityTable, UserRecord
+from .base import (
+    ADD_MEMBERS,
+    CONDITIONAL_GET,
+    PAGINATION,
+    SET_MEMBERS,
+    ServiceAdapter,
+)
+from ..metrics import owui_http_errors_total, target_cache_requests_total, track_external_request
+from ..utils.http import PoolSettings, ServiceClient
+from ..utils.jsonstream import dumps, iter_array_items, loads
+from .snapshot import TargetSnapshot
 
 
-class OpenWebUIAdapter:
+class _Listing:
+    """Validators and content digest of the last response for a listing URL."""
+
+    __slots__ = ("etag", "last_modified", "digest", "data")
+
+    def __init__(self, etag: str | None, last_modified: str | None, digest: bytes, data: Any) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.data = data
+
+    def without_data(self) -> "_Listing":
+        return _Listing(self.etag, self.last_modified, self.digest, None)
+
+
+class OpenWebUIAdapter(ServiceAdapter):
     """Adapter to interact with Open WebUI API."""
 
+    # Per-member add/remove are not declared: OpenWebUI's removal endpoint answers
+    # 405, so deletes always go through the group update API (see DECISIONS.md)
+    capabilities = frozenset({SET_MEMBERS, ADD_MEMBERS, PAGINATION, CONDITIONAL_GET})
+
     def __init__(
         self,
         base_url: str,
@@ -19,9 +54,23 @@ class OpenWebUIAdapter:
         path_templates: Dict[str, str] | None = None,
         timeout: float = 10.0,
         verify_tls: bool = False,
+        full_user_refresh_seconds: float = 3600.0,
+        pool: PoolSettings | None = None,
+        stream_json: bool = False,
+        compress_requests: bool = False,
+        snapshot: TargetSnapshot | None = None,
+        snapshot_max_age_seconds: float = 5.0,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
+        self.full_user_refresh_seconds = full_user_refresh_seconds
+        # Index full user listings while they download instead of parsing them first
+        self.stream_json = stream_json
+        # gzip request bodies; only for targets that decode Content-Encoding
+        self.compress_requests = compress_requests
+        # Listings shared with other adapters for the same target, reused while fresh
+        self.snapshot = snapshot
+        self.snapshot_max_age_seconds = snapshot_max_age_seconds
         self.path_templates = {
             "list_groups": "/api/v1/groups",
             "group_users": "/api/v1/groups/{group_id}/users",
@@ -31,40 +80,282 @@ class OpenWebUIAdapter:
         }
         if path_templates:
             self.path_templates.update(path_templates)
-        self.client = httpx.Client(
-            timeout=timeout,
-            verify=verify_tls,
+        # Connections are shared with other adapters for the same host and pool settings
+        self.client = ServiceClient(
+            self.base_url,
+            pool or PoolSettings(verify=verify_tls),
             headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
         )
+        # Cached user index maintained by refresh_users()
+        self.identities = IdentityTable()
+        self.users_by_id: Dict[str, UserRecord] = {}
+        self.user_watermark: float = 0.0
+        # Bumped whenever the cached user set changes
+        self.users_version = 0
+        # Whether the last list_groups() returned the cached, unchanged listing
+        self.groups_unchanged = False
+        self._last_full_user_refresh: float | None = None
+        # Last response seen per listing URL, for conditional GETs
+        self._listings: Dict[str, _Listing] = {}
 
     def _url(self, key: str, **params: Any) -> str:
         template = self.path_templates[key]
         return self.base_url + template.format(**params)
 
-    def list_groups(self) -> List[Dict[str, Any]]:
-        with track_external_request("owui"):
-            resp = self.client.get(self._url("list_groups"))
+    def _get_listing(
+        self,
+        operation: str,
+        url: str,
+        params: Dict[str, Any] | None = None,
+        keep: bool | Callable[[Any], Any] = True,
+    ) -> Tuple[Any, bool]:
+        """GET a listing conditionally; returns ``(data, unchanged)``.
+
+        The last ETag/Last-Modified are sent back as ``If-None-Match`` and
+        ``If-Modified-Since``. When the server ignores them, an identical body
+        (by sha256) also counts as unchanged and is not parsed again. The
+        parsed body is cached only with ``keep``, or as ``keep(body)`` when it
+        is a function; otherwise ``data`` is None when unchanged.
+
+        With a shared snapshot the listing is fetched at most once per
+        ``snapshot_max_age_seconds`` by any adapter of the target, and
+        unchanged means unchanged since this adapter's previous call. Without
+        ``keep`` the shared body is dropped once it is older than that.
+        """
+        key = _listing_key(url, params)
+        previous = self._listings.get(key)
+        snapshot = self.snapshot
+        if snapshot is None:
+            entry, data = self._fetch_listing(operation, url, params, previous, keep)
+        else:
+            entry, fetched = snapshot.get(
+                key,
+                # A listing whose body was dropped cannot answer a 304, so fetch it whole
+                lambda cached: self._fetch_listing(
+                    operation, url, params, cached if cached is not None and cached.data is not None else None, True
+                )[0],
+                self.snapshot_max_age_seconds,
+                expire=None if keep else _Listing.without_data,
+            )
+            if not fetched:
+                _count_listing(operation, "shared")
+            data = entry.data
+            if not keep:
+                entry = entry.without_data()
+        self._listings[key] = entry
+        return data, previous is not None and entry.digest == previous.digest
+
+    def _fetch_listing(
+        self,
+        operation: str,
+        url: str,
+        params: Dict[str, Any] | None,
+        cached: _Listing | None,
+        keep: bool | Callable[[Any], Any],
+    ) -> Tuple[_Listing, Any]:
+        """Conditional GET against ``cached``; returns the current entry and parsed body."""
+        with track_external_request("owui", operation):
+            resp = self.client.get(url, params=params, headers=_validators(cached))
+        if resp.status_code == 304 and cached is not None:
+            _count_listing(operation, "not_modified")
+            return cached, cached.data
         if resp.is_error:
             owui_http_errors_total.inc()
             resp.raise_for_status()
-        print(f"Response status: {resp.status_code}")
-        print(f"Response text: {resp.text}")
-        return resp.json()
+        digest = hashlib.sha256(resp.content).digest()
+        same = _same_body(operation, cached, resp, digest)
+        if same is not None:
+            return same, same.data
+        data = loads(resp.content)
+        kept = data if keep is True else keep(data) if keep else None
+        return self._new_listing(operation, resp, digest, kept), data
+
+    def _stream_listing(self, operation: str, url: str, key: str, consume: Callable[[Iterator[Any]], None]) -> bool:
+        """Conditionally GET a listing and pass its items to ``consume`` as they arrive.
+
+        ``key`` names the array in an object body. Returns True when the
+        target answered 304 (``consume`` is not called) or the body matched
+        the previous one.
+        """
+        cache_key = _listing_key(url)
+        cached = self._listings.get(cache_key)
+        digest = hashlib.sha256()
+
+        def body(resp: httpx.Response) -> Iterator[bytes]:
+            for chunk in resp.iter_bytes():
+                digest.update(chunk)
+                yield chunk
+
+        with track_external_request("owui", operation):
+            with self.client.stream("GET", url, headers=_validators(cached)) as resp:
+                if resp.status_code == 304 and cached is not None:
+                    _count_listing(operation, "not_modified")
+                    return True
+                if resp.is_error:
+                    resp.read()
+                    owui_http_errors_total.inc()
+                    resp.raise_for_status()
+                chunks = body(resp)
+                consume(iter_array_items(chunks, key))
+                for _ in chunks:  # hash whatever follows the array
+                    pass
+        same = _same_body(operation, cached, resp, digest.digest())
+        if same is not None:
+            self._listings[cache_key] = same
+            return True
+        self._listings[cache_key] = self._new_listing(operation, resp, digest.digest(), None)
+        return False
+
+    @staticmethod
+    def _new_listing(operation: str, resp: httpx.Response, digest: bytes, data: Any) -> _Listing:
+        _count_listing(operation, "miss")
+        return _Listing(resp.headers.get("etag"), resp.headers.get("last-modified"), digest, data)
+
+    def list_groups(self) -> List[Dict[str, Any]]:
+        """All target groups; the same cached list object is returned while they are unchanged.
+
+        Member lists are only cached in a shared snapshot: otherwise the
+        unchanged listing comes back without ``user_ids``, and callers keep
+        the members they read when it changed.
+        """
+        groups, self.groups_unchanged = self._get_listing(
+            "list_groups", self._url("list_groups"), keep=_without_members
+        )
+        return groups
 
     def list_users(self) -> List[Dict[str, Any]]:
-        with track_external_request("owui"):
+        with track_external_request("owui", "list_users"):
             resp = self.client.get(self._url("list_users"))
         if resp.is_error:
             owui_http_errors_total.inc()
             resp.raise_for_status()
-        data = resp.json()
-        # OpenWebUI returns {"users": [...], "total": N} format
-        if isinstance(data, dict) and "users" in data:
-            return data["users"]
-        return data
+        return _users_from(loads(resp.content))
+
+    def refresh_users(self) -> List[Dict[str, Any]]:
+        """Update the cached user index and return users new or changed since last refresh.
+
+        Only users at or above the ``created_at``/``updated_at`` watermark are
+        fetched; the complete listing is re-read every
+        ``full_user_refresh_seconds`` to pick up deletions. Listings the
+        target reports as unchanged leave the index untouched.
+        """
+        last_full = self._last_full_user_refresh
+        if last_full is None or monotonic() - last_full >= self.full_user_refresh_seconds:
+            # A shared listing must be parsed whole so other adapters can reuse it
+            if self.stream_json and self.snapshot is None:
+                changed = self._stream_all_users()
+                self._last_full_user_refresh = monotonic()
+                return changed
+            data, unchanged = self._get_listing("list_users", self._url("list_users"), keep=False)
+            self._last_full_user_refresh = monotonic()
+            if unchanged:
+                return []
+            users = _users_from(data)
+            changed = [u for u in users if self._is_changed(u)]
+            if changed or len(users) != len(self.users_by_id):
+                self.users_version += 1
+            self.users_by_id = {}
+            self.identities.unbind_all()
+            for user in users:
+                self._index_user(user)
+            return changed
+
+        changed = [u for u in self._list_users_since(self.user_watermark) if self._is_changed(u)]
+        for user in changed:
+            self._index_user(user)
+        if changed:
+            self.users_version += 1
+            # The index now differs from the last full listing, so it must not count as unchanged
+            self._listings.pop(_listing_key(self._url("list_users")), None)
+        return changed
+
+    def _stream_all_users(self) -> List[Dict[str, Any]]:
+        """Rebuild the user index from a streamed full listing; returns changed users.
+
+        If the download fails midway the previous index is restored.
+        """
+        previous = self.users_by_id
+        changed: List[Dict[str, Any]] = []
+
+        def index(users: Iterator[Dict[str, Any]]) -> None:
+            self.users_by_id = {}
+            self.identities.unbind_all()
+            for user in users:
+                if self._is_changed(user, previous):
+                    changed.append(user)
+                self._index_user(user)
+
+        try:
+            unchanged = self._stream_listing("list_users", self._url("list_users"), "users", index)
+        except Exception:
+            self.users_by_id = previous
+            self.identities.unbind_all()
+            for record in previous.values():
+                if record.email:
+                    self.identities.bind(record.email, record.id)
+            raise
+        if not unchanged and (changed or len(self.users_by_id) != len(previous)):
+            self.users_version += 1
+        return [] if unchanged else changed
+
+    def _list_users_since(self, watermark: float) -> List[Dict[str, Any]]:
+        """Page through users newest first until reaching the watermark.
+
+        The server's page size is unknown, so only an empty page, a user
+        older than the watermark or a page without new users ends the walk.
+        Servers that ignore the ordering parameters return older users on the
+        first page, which ends it too; the result is filtered client side.
+        Nothing is indexed, so the watermark does not move, unless the walk
+        completes.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        page = 1
+        while True:
+            params = {"order_by": "updated_at", "direction": "desc", "page": page}
+            if page == 1:
+                # An unchanged first page means nobody was created or updated
+                data, unchanged = self._get_listing("list_users", self._url("list_users"), params, keep=False)
+                if unchanged:
+                    return []
+            else:
+                with track_external_request("owui", "list_users"):
+                    resp = self.client.get(self._url("list_users"), params=params)
+                if resp.is_error:
+                    owui_http_errors_total.inc()
+                    resp.raise_for_status()
+                data = loads(resp.content)
+            users = _users_from(data)
+            reached_watermark = not users
+            seen_before = len(found)
+            for user in users:
+                if _user_timestamp(user) < watermark:
+                    reached_watermark = True
+                else:
+                    found[user["id"]] = user
+            if reached_watermark or len(found) == seen_before:
+                return list(found.values())
+            page += 1
+
+    def _is_changed(self, user: Dict[str, Any], known: Dict[str, UserRecord] | None = None) -> bool:
+        cached = (self.users_by_id if known is None else known).get(user["id"])
+        return (
+            cached is None
+            or cached.email != (user.get("email") or "")
+            or _user_timestamp(user) > cached.timestamp
+        )
+
+    def _index_user(self, user: Dict[str, Any]) -> None:
+        record = UserRecord(user["id"], user.get("email") or "", _user_timestamp(user))
+        self.users_by_id[record.id] = record
+        if record.email:
+            self.identities.bind(record.email, record.id)
+        else:
+            self.identities.unbind(record.id)
+        self.user_watermark = max(self.user_watermark, record.timestamp)
 
     def list_group_users(self, group_id: str) -> List[Dict[str, Any]]:
-        with track_external_request("owui"):
+        with track_external_request("owui", "group_users"):
             resp = self.client.get(self._url("group_users", group_id=group_id))
         if resp.is_error:
             owui_http_errors_total.inc()
@@ -72,31 +363,143 @@ class OpenWebUIAdapter:
         return resp.json()
 
     def add_user_to_group(self, group_id: str, user_id: str) -> None:
+        self.add_group_members(group_id, [user_id])
+
+    def add_group_members(self, group_id: str, user_ids: List[str]) -> None:
         url = self._url("add_user_to_group", group_id=group_id)
-        with track_external_request("owui"):
-            resp = self.client.post(url, json={"user_ids": [user_id]})
+        with track_external_request("owui", "add_user_to_group"):
+            resp = self.client.post(url, json={"user_ids": user_ids})
         if resp.is_error:
             owui_http_errors_total.inc()
             resp.raise_for_status()
+        added = set(user_ids)
+        self._patch_group(group_id, lambda ids: [i for i in ids if i not in added] + user_ids)
 
     def remove_user_from_group(self, group_id: str, user_id: str) -> None:
         url = self._url("remove_user_from_group", group_id=group_id, user_id=user_id)
-        with track_external_request("owui"):
+        with track_external_request("owui", "remove_user_from_group"):
             resp = self.client.delete(url)
         if resp.is_error:
             owui_http_errors_total.inc()
             resp.raise_for_status()
+        self._patch_group(group_id, lambda ids: [i for i in ids if i != user_id])
+
+    def update_group_users(
+        self, group_id: str, user_ids: Iterable[str], group_name: str, group_description: str = ""
+    ) -> None:
+        """Update the entire user list for a group.
 
-    def update_group_users(self, group_id: str, user_ids: List[str], group_name: str, group_description: str = "") -> None:
-        """Update the entire user list for a group."""
+        A list is sent as a regular JSON body; any other iterable is streamed
+        so very large member lists are never held in memory at once. Bodies
+        are gzipped when ``compress_requests`` is set.
+        """
         url = self._url("update_group", group_id=group_id)
-        data = {
-            "name": group_name,
-            "description": group_description,
-            "user_ids": user_ids
-        }
-        with track_external_request("owui"):
-            resp = self.client.post(url, json=data)
+        headers = {"Content-Type": "application/json"}
+        if isinstance(user_ids, list):
+            data = {"name": group_name, "description": group_description, "user_ids": user_ids}
+            content: bytes | Iterator[bytes] = dumps(data)
+        else:
+            content = _stream_group_form(group_name, group_description, user_ids)
+        if self.compress_requests:
+            headers["Content-Encoding"] = "gzip"
+            content = gzip.compress(content) if isinstance(content, bytes) else _gzip_chunks(content)
+        with track_external_request("owui", "update_group"):
+            resp = self.client.post(url, content=content, headers=headers)
         if resp.is_error:
             owui_http_errors_total.inc()
             resp.raise_for_status()
+        if isinstance(user_ids, list):
+            self._patch_group(group_id, lambda ids: list(user_ids))
+        elif (snapshot := self.snapshot) is not None:
+            # Streamed members are gone; let the next reader fetch the group listing
+            snapshot.invalidate(_listing_key(self._url("list_groups")))
+
+    def _patch_group(self, group_id: str, change: Callable[[List[str]], List[str]]) -> None:
+        """Apply a successful write to the shared group listing, copy-on-write."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return
+
+        def patched(entry: _Listing) -> _Listing:
+            groups = list(entry.data)
+            for i, group in enumerate(groups):
+                if group["id"] == group_id:
+                    groups[i] = group = dict(group, user_ids=change(group.get("user_ids") or []))
+                    break
+            else:
+                return entry
+            # A new digest tells every adapter, the writer included, that the listing changed
+            digest = hashlib.sha256(entry.digest + dumps(group)).digest()
+            return _Listing(entry.etag, entry.last_modified, digest, groups)
+
+        snapshot.patch(_listing_key(self._url("list_groups")), patched)
+
+
+def _stream_group_form(name: str, description: str, user_ids: Iterable[str], batch: int = 10000) -> Iterator[bytes]:
+    """Encode an update_group body incrementally, ``batch`` ids per chunk."""
+    yield json.dumps({"name": name, "description": description})[:-1].encode() + b', "user_ids": ['
+    separator = ""
+    chunk: List[str] = []
+    for user_id in user_ids:
+        chunk.append(json.dumps(user_id))
+        if len(chunk) >= batch:
+            yield (separator + ", ".join(chunk)).encode()
+            separator, chunk = ", ", []
+    if chunk:
+        yield (separator + ", ".join(chunk)).encode()
+    yield b"]}"
+
+
+def _gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _validators(cached: _Listing | None) -> Dict[str, str]:
+    """Conditional request headers for a previously fetched listing."""
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def _same_body(operation: str, cached: _Listing | None, resp: httpx.Response, digest: bytes) -> _Listing | None:
+    """If a 200 body equals the cached one, return a copy of it with the response's validators.
+
+    The cached entry may be published in a shared snapshot, so it is not changed.
+    """
+    if cached is None or cached.digest != digest:
+        return None
+    _count_listing(operation, "hash_match")
+    return _Listing(resp.headers.get("etag"), resp.headers.get("last-modified"), cached.digest, cached.data)
+
+
+def _without_members(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: v for k, v in group.items() if k != "user_ids"} for group in groups]
+
+
+def _count_listing(operation: str, result: str) -> None:
+    target_cache_requests_total.labels(target="owui", operation=operation, result=result).inc()
+
+
+def _listing_key(url: str, params: Dict[str, Any] | None = None) -> str:
+    return str(httpx.URL(url, params=params))
+
+
+def _users_from(data: Any) -> List[Dict[str, Any]]:
+    # OpenWebUI returns {"users": [...], "total": N} format
+    if isinstance(data, dict) and "users" in data:
+        return data["users"]
+    return data
+
+
+def _user_timestamp(user: Dict[str, Any]) -> float:
+    """Return the newest of a user's ``created_at``/``updated_at`` epochs."""
+    return float(max(user.get("created_at") or 0, user.get("updated_at") or 0))
@@ -0,0 +1,132 @@
+"""Resolving LDAP emails to target users without listing every user.
+
+Between full listings, :class:`UserResolver` looks up the emails the index
+cannot resolve one by one through the adapter's ``find_user``, several at a
+time. Each batch is priced like a write plan: a lookup costs one request, a
+full listing one request per page plus every user in it. Lookups are used
+while cheaper and below ``max_lookups``; otherwise the complete listing is
+fetched, which also resolves everything else. Emails a lookup did not find
+are not looked up again for ``recheck_seconds``; emails a listing did not find
+not until the next full refresh. New-user checks pass ``listing=False``: they
+look up at most ``max_lookups`` emails and never list.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from math import ceil
+from time import monotonic
+from typing import Any, Dict, Iterable, List
+
+from ..metrics import user_resolutions_total
+from .base import PAGINATION, REQUEST_COST, USER_SEARCH, ServiceAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class UserResolver:
+    """Cost-based choice between per-email lookups and the full user listing."""
+
+    def __init__(
+        self,
+        adapter: ServiceAdapter,
+        name: str = "default",
+        max_lookups: int = 200,
+        concurrency: int = 8,
+        full_refresh_seconds: float = 3600.0,
+        recheck_seconds: float = 300.0,
+    ) -> None:
+        if USER_SEARCH not in adapter.capabilities:
+            raise ValueError(f"{type(adapter).__name__} does not support user search")
+        self.adapter = adapter
+        self.name = name
+        self.max_lookups = max_lookups
+        self.concurrency = concurrency
+        # The complete listing is still read at this interval to pick up deletions
+        self.full_refresh_seconds = full_refresh_seconds
+        self.recheck_seconds = recheck_seconds
+        self._last_full_refresh: float | None = None
+        # Emails known to have no account, with the time they may be looked up
+        # again, and whether all users were listed this round
+        self._missing: Dict[str, float] = {}
+        self._listed = False
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Start a round; lists all users if the index is cold or due for a full refresh.
+
+        Returns the users new or changed by the listing.
+        """
+        self._listed = False
+        last_full = self._last_full_refresh
+        if last_full is not None and monotonic() - last_full < self.full_refresh_seconds:
+            return []
+        return self._list_all()
+
+    def unchecked(self, emails: Iterable[str]) -> List[str]:
+        """Return the unresolved ``emails`` not known to be missing."""
+        identities = self.adapter.identities
+        now = monotonic()
+        return [e for e in dict.fromkeys(emails) if identities.target_id(e) is None and self._missing.get(e, now) <= now]
+
+    def resolve(self, emails: Iterable[str], listing: bool = True) -> List[Dict[str, Any]]:
+        """Make ``emails`` resolvable through the adapter's index if they exist.
+
+        Emails known to be missing are skipped. Without ``listing``, a batch
+        too large for lookups is cut to ``max_lookups`` instead of fetching
+        the full listing; the rest wait for later calls. Returns the users
+        found, or the changed users when the full listing was fetched.
+        """
+        wanted = self.unchecked(emails)
+        if self._listed:
+            # All users were listed this round, so these have no account
+            self._unlisted(wanted)
+            return []
+        if not wanted:
+            return []
+        if len(wanted) > self.max_lookups or len(wanted) * (REQUEST_COST + 1) >= self._listing_cost():
+            if listing:
+                logger.info("Resolving %d emails from the full user listing", len(wanted))
+                return self._list_all(wanted)
+            wanted = wanted[: self.max_lookups]
+            if not wanted:
+                return []
+        self._missing.update(dict.fromkeys(wanted, monotonic() + self.recheck_seconds))
+        user_resolutions_total.labels(engine=self.name, method="lookup").inc()
+        found = [user for user in self._lookup(wanted) if user is not None]
+        logger.info("Looked up %d emails, %d found", len(wanted), len(found))
+        self.adapter.index_users(found)
+        return found
+
+    def _list_all(self, wanted: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        user_resolutions_total.labels(engine=self.name, method="listing").inc()
+        changed = self.adapter.refresh_users()
+        self._last_full_refresh = monotonic()
+        identities = self.adapter.identities
+        missing = [e for e in (*self._missing, *wanted) if identities.target_id(e) is None]
+        self._missing = {}
+        self._unlisted(missing)
+        self._listed = True
+        return changed
+
+    def _unlisted(self, emails: Iterable[str]) -> None:
+        """Keep emails the listing did not find from being looked up before the next one."""
+        last_full = self._last_full_refresh
+        until = (monotonic() if last_full is None else last_full) + self.full_refresh_seconds
+        self._missing.update(dict.fromkeys(emails, until))
+
+    def _listing_cost(self) -> int:
+        population = self.adapter.identities.bound_count
+        pages = 1
+        if PAGINATION in self.adapter.capabilities:
+            pages = max(ceil(population / getattr(self.adapter, "users_page_size", population or 1)), 1)
+        return pages * REQUEST_COST + population
+
+    def _lookup(self, emails: List[str]) -> List[Dict[str, Any] | None]:
+        if len(emails) == 1 or self.concurrency <= 1:
+            return [self.adapter.find_user(email) for email in emails]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(emails)), thread_name_prefix="lookup") as pool:
+            # Each lookup runs in a copy of this context so requests are counted and traced
+            futures = [pool.submit(contextvars.copy_context().run, self.adapter.find_user, e) for e in emails]
+            return [future.result() for future in futures]
@@ -0,0 +1,127 @@
+"""Target listings shared by adapters that talk to the same service.
+
+Several configured services may point at one target with the same
+credentials, each with its own mappings. Their adapters share a
+:class:`TargetSnapshot`, so a listing is downloaded once per
+``max_age_seconds`` however many engines read it. Fetches are single-flight:
+while one adapter refreshes a listing the others wait for its result.
+Published entries are never mutated; writes replace them with patched
+copies, so readers always see a consistent listing.
+"""
+
+from __future__ import annotations
+
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+Fetch = Callable[[Any], Any]
+
+
+class TargetSnapshot:
+    """Fetched listings by request key, with their fetch time."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        # Keys whose entry is shrunk once it expires: (fetch time, expiry time, shrink)
+        self._expiring: Dict[str, Tuple[float, float, Callable[[Any], Any]]] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(
+        self, key: str, fetch: Fetch, max_age_seconds: float, expire: Optional[Callable[[Any], Any]] = None
+    ) -> Tuple[Any, bool]:
+        """Return ``(entry, fetched)`` for ``key``.
+
+        The published entry is reused while younger than ``max_age_seconds``;
+        otherwise ``fetch(previous entry or None)`` produces the new one.
+        With ``expire``, a fetched entry is replaced by ``expire(entry)`` once
+        it is too old to be reused, so large bodies are not kept until the
+        next fetch.
+        """
+        self._shrink_expired()
+        with self._key_lock(key):
+            current = self._entries.get(key)
+            if current is not None and monotonic() - current[0] < max_age_seconds:
+                return current[1], False
+            entry = fetch(None if current is None else current[1])
+            fetched_at = monotonic()
+            self._entries[key] = (fetched_at, entry)
+            with self._lock:
+                if expire is None:
+                    self._expiring.pop(key, None)
+                else:
+                    self._expiring[key] = (fetched_at, fetched_at + max_age_seconds, expire)
+            return entry, True
+
+    def _shrink_expired(self) -> None:
+        now = monotonic()
+        with self._lock:
+            due = [(key, expiry) for key, expiry in self._expiring.items() if expiry[1] <= now]
+            for key, _ in due:
+                del self._expiring[key]
+        for key, (fetched_at, at, shrink) in due:
+            lock = self._key_lock(key)
+            # Never wait behind a fetch of another key; try again on the next read
+            if not lock.acquire(blocking=False):
+                with self._lock:
+                    self._expiring.setdefault(key, (fetched_at, at, shrink))
+                continue
+            try:
+                current = self._entries.get(key)
+                # Only the entry that expired, not one fetched since
+                if current is not None and current[0] == fetched_at:
+                    self._entries[key] = (current[0], shrink(current[1]))
+            finally:
+                lock.release()
+
+    def patch(self, key: str, change: Callable[[Any], Any]) -> None:
+        """Publish ``change(entry)`` in place of the current entry, keeping its age."""
+        with self._key_lock(key):
+            current = self._entries.get(key)
+            if current is not None:
+                self._entries[key] = (current[0], change(current[1]))
+
+    def invalidate(self, key: str) -> None:
+        """Make the next read of ``key`` fetch again; the entry is kept for revalidation."""
+        with self._key_lock(key):
+            current = self._entries.get(key)
+            if current is not None:
+                self._entries[key] = (float("-inf"), current[1])
+
+
+class SnapshotRegistry:
+    """Reference-counted snapshots keyed by target, e.g. ``(base_url, api_key)``."""
+
+    def __init__(self) -> None:
+        self._snapshots: Dict[Hashable, TargetSnapshot] = {}
+        self._refs: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> TargetSnapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                snapshot = self._snapshots[key] = TargetSnapshot()
+            self._refs[key] = self._refs.get(key, 0) + 1
+            return snapshot
+
+    def release(self, snapshot: TargetSnapshot) -> None:
+        """Drop a reference; the snapshot is forgotten when no adapter uses it."""
+        with self._lock:
+            for key, candidate in self._snapshots.items():
+                if candidate is snapshot:
+                    break
+            else:
+                return
+            self._refs[key] -= 1
+            if self._refs[key] <= 0:
+                del self._refs[key]
+                del self._snapshots[key]
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
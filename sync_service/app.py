@@ -8,11 +8,12 @@ import logging
 from pathlib import Path
 from typing import AsyncIterator
 
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, HTTPException, Query, Response
 
 from .settings import load_config
-from .metrics import export_metrics, last_sync_timestamp_seconds, sync_iterations_total
+from .metrics import export_metrics, last_sync_timestamp_seconds, mark_process_dead, sync_iterations_total
 from .logging_conf import configure_logging
+from .services.config_watcher import ConfigWatcher
 from .services.engine_manager import EngineManager
 
 config_path = Path("config/config.yaml")
@@ -34,10 +35,19 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     await engine_manager.start()
     ready = True
 
+    reload_cfg = app_config.reload or {}
+    watcher = None
+    if reload_cfg.get("enabled", True):
+        watcher = ConfigWatcher(config_path, engine_manager, reload_cfg.get("interval_seconds", 10))
+        watcher.start()
+
     try:
         yield
     finally:
+        if watcher is not None:
+            await watcher.stop()
         await engine_manager.stop()
+        mark_process_dead()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -49,8 +59,13 @@ async def healthz() -> dict[str, str]:
 
 
 @app.get("/readyz")
-async def readyz() -> dict[str, str]:
-    return {"ready": str(ready).lower()}
+async def readyz(response: Response) -> dict:
+    """Ready once every engine finished warming up; 503 with per-engine phases until then."""
+    engines = engine_manager.get_readiness()
+    is_ready = ready and all(e["ready"] for e in engines.values())
+    if not is_ready:
+        response.status_code = 503
+    return {"ready": str(is_ready).lower(), "engines": engines}
 
 
 @app.get("/metrics")
@@ -67,3 +82,34 @@ async def version() -> dict[str, str]:
 async def engines_status() -> dict[str, str]:
     """Get status of all sync engines."""
     return engine_manager.get_engine_status()
+
+
+@app.get("/engines/{name}/pending")
+async def engine_pending(
+    name: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> dict:
+    """List LDAP members that have no account in the engine's target yet."""
+    page = engine_manager.get_pending(name, offset=offset, limit=limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"Engine '{name}' not found")
+    return page
+
+
+@app.get("/engines/{name}/schedule")
+async def engine_schedule(name: str) -> dict:
+    """Current adaptive interval of each of the engine's mappings and when it is next due."""
+    schedule = engine_manager.get_schedule(name)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail=f"Engine '{name}' not found")
+    return schedule
+
+
+@app.get("/debug/engines/{name}/traces")
+async def engine_traces(name: str) -> list:
+    """Span trees of the engine's most recent iterations, newest first."""
+    traces = engine_manager.get_traces(name)
+    if traces is None:
+        raise HTTPException(status_code=404, detail=f"Engine '{name}' not found")
+    return traces
@@ -0,0 +1,100 @@
+"""Command line interface.
+
+``python -m sync_service sync --once`` runs every engine once in parallel,
+prints a JSON summary to stdout and exits with:
+
+- 0 when every mapping was synced
+- 1 when some mappings failed
+- 2 on invalid usage or config, or an unknown engine or mapping
+- 3 when an engine could not be built or its iteration failed
+
+``python -m sync_service serve`` starts the HTTP service. The web stack is
+only imported for ``serve``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+from typing import Any, Dict, List
+
+EXIT_OK = 0
+EXIT_MAPPING_FAILED = 1
+EXIT_USAGE = 2
+EXIT_ENGINE_FAILED = 3
+
+
+def _sync_once(args: argparse.Namespace) -> int:
+    from .logging_conf import configure_logging
+    from .services.engine_manager import EngineManager
+    from .settings import load_config
+
+    configure_logging()
+    try:
+        config = load_config(Path(args.config))
+    except Exception as e:
+        return _finish({"error": f"invalid config {args.config}: {e}"}, EXIT_USAGE)
+
+    names = [s.name for s in config.services]
+    if args.engine:
+        unknown = sorted(set(args.engine) - set(names))
+        if unknown:
+            return _finish({"error": f"unknown engine(s): {', '.join(unknown)}"}, EXIT_USAGE)
+        names = [n for n in names if n in args.engine]
+
+    manager = EngineManager(config)
+    build_failures = manager.build_engines(names)
+    engines: Dict[str, Any] = manager.run_once(mapping=args.mapping)
+    if args.mapping and not engines and not build_failures:
+        return _finish({"error": f"no engine has mapping '{args.mapping}'"}, EXIT_USAGE)
+    for name, error in build_failures.items():
+        engines[name] = {"status": "failed", "error": error}
+
+    statuses = [e["status"] for e in engines.values()]
+    if "failed" in statuses:
+        code = EXIT_ENGINE_FAILED
+    elif "partial" in statuses:
+        code = EXIT_MAPPING_FAILED
+    else:
+        code = EXIT_OK
+    return _finish({"engines": engines}, code)
+
+
+def _finish(summary: Dict[str, Any], code: int) -> int:
+    summary["exit_code"] = code
+    print(json.dumps(summary, indent=2, sort_keys=True))
+    return code
+
+
+def _serve(args: argparse.Namespace) -> int:  # pragma: no cover - thin wrapper
+    from .main import run
+
+    run()
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m sync_service", description="LDAP group sync")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="reconcile group memberships")
+    sync.add_argument("--once", action="store_true", required=True, help="run one iteration and exit")
+    sync.add_argument("--config", default="config/config.yaml", help="config file (default: %(default)s)")
+    sync.add_argument("--engine", action="append", help="only run this engine; may be repeated")
+    sync.add_argument("--mapping", help="only sync mappings with this target group name or LDAP DN")
+    sync.set_defaults(func=_sync_once)
+
+    serve = commands.add_parser("serve", help="run the HTTP service with periodic sync")
+    serve.set_defaults(func=_serve)
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
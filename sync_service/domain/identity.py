@@ -0,0 +1,146 @@
+"""Compact identity representation for large membership sets.
+
+Every email seen by an engine is interned once to a dense integer ("ident").
+Target user ids are bound to idents, so memberships can be held as sorted
+``array('I')`` values instead of lists and sets of strings. Emails whose
+account went away keep their ident until :meth:`IdentityTable.compact`.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    from ..services.spill import SpilledIdents
+
+
+class IdentityTable:
+    """Interns emails and target user ids to dense integers."""
+
+    def __init__(self) -> None:
+        self.emails: List[str] = []
+        self.target_ids: List[str | None] = []
+        self._by_email: Dict[str, int] = {}
+        self._by_target: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def intern(self, email: str) -> int:
+        """Return the ident for ``email``, allocating one if needed."""
+        ident = self._by_email.get(email)
+        if ident is None:
+            ident = len(self.emails)
+            self.emails.append(email)
+            self.target_ids.append(None)
+            self._by_email[email] = ident
+        return ident
+
+    def lookup(self, email: str) -> int | None:
+        return self._by_email.get(email)
+
+    def for_target(self, target_id: str) -> int | None:
+        """Return the ident bound to a target user id."""
+        return self._by_target.get(target_id)
+
+    def target_id(self, email: str) -> str | None:
+        """Return the target user id for ``email``, if it has an account."""
+        ident = self._by_email.get(email)
+        return None if ident is None else self.target_ids[ident]
+
+    def bind(self, email: str, target_id: str) -> int:
+        """Associate ``email`` with a target account, replacing older bindings."""
+        self.unbind(target_id)
+        ident = self.intern(email)
+        previous = self.target_ids[ident]
+        if previous is not None:
+            self._by_target.pop(previous, None)
+        self.target_ids[ident] = target_id
+        self._by_target[target_id] = ident
+        return ident
+
+    def unbind(self, target_id: str) -> None:
+        """Forget a target account; its email stays interned."""
+        ident = self._by_target.pop(target_id, None)
+        if ident is not None:
+            self.target_ids[ident] = None
+
+    def unbind_all(self) -> None:
+        self._by_target.clear()
+        self.target_ids = [None] * len(self.emails)
+
+    @property
+    def bound_count(self) -> int:
+        """Number of idents with a target account."""
+        return len(self._by_target)
+
+    def compact(self) -> array:
+        """Drop every ident without a target account and renumber the rest.
+
+        Returns the old-to-new ident map, -1 for dropped idents. Relative
+        order is kept, so sorted ident arrays stay sorted once remapped.
+        """
+        remap = array("q", [-1]) * len(self.emails)
+        emails: List[str] = []
+        target_ids: List[str | None] = []
+        for ident, target_id in enumerate(self.target_ids):
+            if target_id is not None:
+                remap[ident] = len(emails)
+                emails.append(self.emails[ident])
+                target_ids.append(target_id)
+        self.emails = emails
+        self.target_ids = target_ids
+        self._by_email = {email: ident for ident, email in enumerate(emails)}
+        self._by_target = {target_id: ident for ident, target_id in enumerate(target_ids) if target_id is not None}
+        return remap
+
+    def members_from_targets(self, target_ids: Iterable[str]) -> array:
+        """Sorted idents for target user ids; unknown ids are dropped."""
+        by_target = self._by_target
+        return array("I", sorted({by_target[t] for t in target_ids if t in by_target}))
+
+    def members_from_emails(self, emails: Iterable[str]) -> array:
+        """Sorted idents for emails, interning new ones."""
+        intern = self.intern
+        return array("I", sorted({intern(e) for e in emails}))
+
+
+class UserRecord:
+    """A target user account as cached by an adapter."""
+
+    __slots__ = ("id", "email", "timestamp")
+
+    def __init__(self, id: str, email: str, timestamp: float = 0.0) -> None:
+        self.id = id
+        self.email = email
+        self.timestamp = timestamp
+
+
+class GroupRecord:
+    """A target group with members held as sorted idents, on disk for very large groups."""
+
+    __slots__ = ("id", "name", "description", "members", "unknown")
+
+    def __init__(
+        self, id: str, name: str, description: str, members: "array | SpilledIdents", unknown: int = 0
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.description = description
+        self.members = members
+        # Member ids without a known target user; only a full member list write drops them
+        self.unknown = unknown
+
+    @classmethod
+    def from_api(cls, group: Dict[str, Any], identities: IdentityTable) -> "GroupRecord":
+        """Build from an API group dict, mapping ``user_ids`` through ``identities``."""
+        user_ids = group.get("user_ids") or ()
+        members = identities.members_from_targets(user_ids)
+        return cls(
+            id=group["id"],
+            name=group["name"],
+            description=group.get("description", ""),
+            members=members,
+            unknown=len(user_ids) - len(members),
+        )
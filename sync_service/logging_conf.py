@@ -1,11 +1,201 @@
-"""Logging configuration utilities."""
+"""Logging configuration utilities.
 
+Hot paths log collections through :func:`capped` (count plus a small sample)
+and expensive values through :func:`lazy`, so nothing large is formatted
+unless a record is actually emitted. Records carrying a ``sample_key`` extra
+are sampled per key, and output is formatted and written by a background
+thread fed through a queue.
+"""
+
+from __future__ import annotations
+
+import atexit
+from collections.abc import Sized
+from datetime import datetime, timezone
+from itertools import islice
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+MAX_SAMPLE_ITEMS = int(os.getenv("LOG_MAX_ITEMS", "5"))
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class Capped:
+    """Size-capped view of a collection: its length and the first few items."""
+
+    __slots__ = ("count", "sample")
+
+    def __init__(self, items: Iterable[Any], limit: int = MAX_SAMPLE_ITEMS, count: int | None = None) -> None:
+        if isinstance(items, dict):
+            items = items.items()
+        if count is None and isinstance(items, Sized):
+            count = len(items)
+        self.count = count
+        self.sample = [_plain(item) for item in islice(items, limit)]
+
+    def to_log(self) -> Dict[str, Any]:
+        return {"count": self.count, "sample": self.sample}
+
+    def __str__(self) -> str:
+        sample = ", ".join(map(str, self.sample))
+        if self.count is not None and self.count > len(self.sample):
+            sample += ", ..."
+        return f"{self.count} [{sample}]"
+
+
+class Lazy:
+    """Value computed only when the record is formatted."""
+
+    __slots__ = ("func",)
+
+    def __init__(self, func: Callable[[], Any]) -> None:
+        self.func = func
+
+    def to_log(self) -> Any:
+        return _plain(self.func())
+
+    def __str__(self) -> str:
+        return str(self.func())
+
+
+def capped(items: Iterable[Any], limit: int = MAX_SAMPLE_ITEMS, count: int | None = None) -> Capped:
+    """Log a collection as its count plus at most ``limit`` items.
+
+    Pass ``count`` when ``items`` is a lazy iterable such as a generator.
+    """
+    return Capped(items, limit, count)
+
+
+def lazy(func: Callable[[], Any]) -> Lazy:
+    """Defer computing a log value until the record is emitted."""
+    return Lazy(func)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def _render(value: Any) -> Any:
+    to_log = getattr(value, "to_log", None)
+    if to_log is not None:
+        return to_log()
+    if isinstance(value, (set, frozenset)):
+        return Capped(value).to_log()
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in payload:
+                payload[key] = _render(value)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Let through the first ``first`` records per ``sample_key``, then one in ``every``.
+
+    Passing records get a ``suppressed`` field with the number dropped since
+    the previous one for that key.
+    """
+
+    def __init__(self, first: int = 10, every: int = 1000) -> None:
+        super().__init__()
+        self.first = first
+        self.every = max(every, 1)
+        self._seen: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None:
+            return True
+        with self._lock:
+            seen = self._seen[key] = self._seen.get(key, 0) + 1
+            if seen <= self.first or seen % self.every == 0:
+                dropped = self._dropped.pop(key, 0)
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            self._dropped[key] = self._dropped.get(key, 0) + 1
+            return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are, leaving all formatting to the listener's handler.
+
+    The stdlib handler formats the message (and any traceback) in the
+    emitting thread before queueing it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_listener() -> None:
+    """Flush and stop the background writer, if running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
 
 
 def configure_logging() -> None:
-    fmt = "%(asctime)s %(levelname)s %(name)s %(message)s"
+    """Configure the root logger from ``LOG_*`` environment variables.
+
+    ``LOG_FORMAT`` (json|text), ``LOG_LEVEL``, ``LOG_QUEUE`` (write from a
+    background thread, default true), ``LOG_SAMPLE_FIRST``/``LOG_SAMPLE_EVERY``
+    for sampled per-item logs and ``LOG_MAX_ITEMS`` for collection samples.
+    """
+    global _listener
+    _stop_listener()
+
+    output = logging.StreamHandler()
     if os.getenv("LOG_FORMAT", "json") == "json":
-        fmt = "%(message)s"
-    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format=fmt)
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    handler: logging.Handler = output
+    if os.getenv("LOG_QUEUE", "true").lower() == "true":
+        handler = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+        _listener.start()
+    handler.addFilter(
+        SamplingFilter(
+            first=int(os.getenv("LOG_SAMPLE_FIRST", "10")),
+            every=int(os.getenv("LOG_SAMPLE_EVERY", "1000")),
+        )
+    )
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO"))
@@ -1,9 +1,19 @@
-"""Prometheus metrics registry and helpers."""
+"""Prometheus metrics registry and helpers.
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set before startup, every process
+writes its samples to files in that directory and ``/metrics`` aggregates
+them, so any worker can serve a complete scrape. Gauges declare how their
+values combine across processes.
+"""
 
 from __future__ import annotations
 
 from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import threading
 import time
+from typing import Iterator
 
 from prometheus_client import (
     CollectorRegistry,
@@ -11,25 +21,58 @@ from prometheus_client import (
     Gauge,
     Histogram,
     generate_latest,
+    multiprocess,
 )
 
+from .tracing import start_span
+from .utils.http import PoolCollector
+
 registry = CollectorRegistry()
 
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Aggregated multiprocess output is reused for this long to keep scrapes cheap
+SCRAPE_CACHE_SECONDS = float(os.getenv("METRICS_SCRAPE_CACHE_SECONDS", "1.0"))
+
+# http_pool_connections{pool,state} and http_pool_max_connections{pool}
+registry.register(PoolCollector())
+
+# Mapping label used for phases that cover every mapping of an engine
+ALL_MAPPINGS = "all"
+
 sync_iterations_total = Counter(
     "sync_iterations_total",
     "Total sync iterations",
+    labelnames=("engine",),
     registry=registry,
 )
 
 sync_iteration_seconds = Histogram(
     "sync_iteration_seconds",
     "Sync iteration duration in seconds",
+    labelnames=("engine",),
     registry=registry,
 )
 
 last_sync_timestamp_seconds = Gauge(
     "last_sync_timestamp_seconds",
     "Timestamp of last sync",
+    labelnames=("engine",),
+    multiprocess_mode="max",
+    registry=registry,
+)
+
+sync_phase_seconds = Histogram(
+    "sync_phase_seconds",
+    "Duration of sync phases (ldap_fetch, target_fetch, diff, write) in seconds",
+    labelnames=("engine", "mapping", "phase"),
+    registry=registry,
+)
+
+sync_external_calls = Histogram(
+    "sync_external_calls",
+    "External requests made per sync iteration",
+    labelnames=("engine",),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
     registry=registry,
 )
 
@@ -64,10 +107,77 @@ owui_http_errors_total = Counter(
     registry=registry,
 )
 
+pending_users = Gauge(
+    "pending_users",
+    "LDAP members without an account in the target service",
+    labelnames=("engine",),
+    multiprocess_mode="livemax",
+    registry=registry,
+)
+
 external_request_seconds = Histogram(
     "external_request_seconds",
     "Duration of external requests",
-    labelnames=("target",),
+    labelnames=("target", "operation"),
+    registry=registry,
+)
+
+sync_mappings_skipped_total = Counter(
+    "sync_mappings_skipped_total",
+    "Mappings left for the next iteration because the iteration deadline passed",
+    labelnames=("engine",),
+    registry=registry,
+)
+
+sync_write_plans_total = Counter(
+    "sync_write_plans_total",
+    "Group writes by plan: set_members, or the add/remove operations of a delta",
+    labelnames=("engine", "plan"),
+    registry=registry,
+)
+
+user_resolutions_total = Counter(
+    "user_resolutions_total",
+    "Target user resolutions by method: per-email lookups or the full listing",
+    labelnames=("engine", "method"),
+    registry=registry,
+)
+
+target_cache_requests_total = Counter(
+    "target_cache_requests_total",
+    "Target listings by result (not_modified, hash_match, miss or shared)",
+    labelnames=("target", "operation", "result"),
+    registry=registry,
+)
+
+sync_mapping_interval_seconds = Gauge(
+    "sync_mapping_interval_seconds",
+    "Current adaptive sync interval of a mapping",
+    labelnames=("engine", "mapping"),
+    multiprocess_mode="livemax",
+    registry=registry,
+)
+
+sync_stage_queue_depth = Gauge(
+    "sync_stage_queue_depth",
+    "Items waiting in front of a sync pipeline stage",
+    labelnames=("engine", "stage"),
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+
+sync_stage_busy_seconds_total = Counter(
+    "sync_stage_busy_seconds_total",
+    "Time sync pipeline stage workers spent processing items",
+    labelnames=("engine", "stage"),
+    registry=registry,
+)
+
+sync_stage_utilization = Gauge(
+    "sync_stage_utilization",
+    "Busy share of a sync pipeline stage's workers during the last run",
+    labelnames=("engine", "stage"),
+    multiprocess_mode="livemax",
     registry=registry,
 )
 
@@ -75,22 +185,137 @@ inflight_requests = Gauge(
     "inflight_requests",
     "Number of inflight external requests",
     labelnames=("target",),
+    multiprocess_mode="livesum",
     registry=registry,
 )
 
 
+config_reload_seconds = Histogram(
+    "config_reload_seconds",
+    "Time to validate and apply a changed config file",
+    labelnames=("result",),
+    registry=registry,
+)
+
+
+shard_members = Gauge(
+    "shard_members",
+    "Replicas holding a live shard lease",
+    multiprocess_mode="livemax",
+    registry=registry,
+)
+
+shard_owned_mappings = Gauge(
+    "shard_owned_mappings",
+    "Mappings assigned to this replica",
+    labelnames=("engine",),
+    multiprocess_mode="livesum",
+    registry=registry,
+)
+
+shard_rebalances_total = Counter(
+    "shard_rebalances_total",
+    "Shard membership changes seen by this replica",
+    registry=registry,
+)
+
+
+_external_calls: ContextVar["CallCounter | None"] = ContextVar("external_calls", default=None)
+
+
+class CallCounter:
+    """Number of external requests made while counting is active.
+
+    Pipeline workers share the counter of the iteration that started them.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def increment(self) -> None:
+        with self._lock:
+            self.count += 1
+
+
+class _MultiProcessExporter:
+    """Aggregates the multiprocess directory, caching the result briefly."""
+
+    def __init__(self, path: str, cache_seconds: float) -> None:
+        self.registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(self.registry, path=path)
+        # Pool gauges are read live from this process, not from the directory
+        self.registry.register(PoolCollector(per_process=True))
+        self.cache_seconds = cache_seconds
+        self._output = b""
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def export(self) -> bytes:
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._expires:
+                self._output = generate_latest(self.registry)
+                self._expires = now + self.cache_seconds
+            return self._output
+
+
+_multiprocess_exporter = (
+    _MultiProcessExporter(MULTIPROC_DIR, SCRAPE_CACHE_SECONDS) if MULTIPROC_DIR else None
+)
+
+
 def export_metrics() -> bytes:
+    if _multiprocess_exporter is not None:
+        return _multiprocess_exporter.export()
     return generate_latest(registry)
 
 
+def mark_process_dead(pid: int | None = None) -> None:
+    """Drop a finished process's live gauges from multiprocess aggregation."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROC_DIR)
+
+
+@contextmanager
+def count_external_calls() -> Iterator[CallCounter]:
+    """Count external requests made in the current context."""
+    counter = CallCounter()
+    token = _external_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _external_calls.reset(token)
+
+
+@contextmanager
+def time_phase(engine: str, mapping: str, phase: str) -> Iterator[None]:
+    """Record the duration of a sync phase, as a metric and a trace span."""
+    start = time.perf_counter()
+    try:
+        with start_span(phase, mapping=mapping):
+            yield
+    finally:
+        sync_phase_seconds.labels(engine=engine, mapping=mapping, phase=phase).observe(
+            time.perf_counter() - start
+        )
+
+
 @contextmanager
-def track_external_request(target: str):
-    """Context manager to record external request metrics."""
+def track_external_request(target: str, operation: str = "unknown"):
+    """Context manager to record external request metrics.
+
+    ``operation`` is the path-template name (or LDAP operation) being called.
+    """
+    counter = _external_calls.get()
+    if counter is not None:
+        counter.increment()
     inflight_requests.labels(target=target).inc()
     start = time.perf_counter()
     try:
-        yield
+        with start_span(f"{target}.{operation}", target=target, operation=operation):
+            yield
     finally:
         duration = time.perf_counter() - start
-        external_request_seconds.labels(target=target).observe(duration)
+        external_request_seconds.labels(target=target, operation=operation).observe(duration)
         inflight_requests.labels(target=target).dec()
@@ -0,0 +1,96 @@
+"""Hot reload of the config file."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+import hashlib
+import logging
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List
+
+from ..metrics import config_reload_seconds
+from ..settings import load_config
+from .engine_manager import EngineManager
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """Polls the config file and applies changes through an :class:`EngineManager`.
+
+    The file is re-read only when its mtime or size changed, and applied only
+    when its content did. An invalid file is logged and ignored; the running
+    config stays in place.
+    """
+
+    def __init__(self, path: Path, manager: EngineManager, interval_seconds: float = 10.0) -> None:
+        self.path = path
+        self.manager = manager
+        self.interval_seconds = interval_seconds
+        self._stat = self._read_stat()
+        self._digest = self._read_digest()
+        self._task: asyncio.Task | None = None
+
+    def _read_stat(self) -> tuple | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read_digest(self) -> str | None:
+        try:
+            return hashlib.sha256(self.path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+
+    async def check(self) -> Dict[str, List[str]] | None:
+        """Reload if the file changed; returns the manager's actions when applied."""
+        stat = self._read_stat()
+        if stat is None or stat == self._stat:
+            return None
+        self._stat = stat
+        digest = self._read_digest()
+        if digest == self._digest:
+            return None
+        self._digest = digest
+        return await self.reload()
+
+    async def reload(self) -> Dict[str, List[str]] | None:
+        """Validate the file and apply it."""
+        start = perf_counter()
+        try:
+            config = load_config(self.path)
+        except Exception as e:
+            config_reload_seconds.labels(result="invalid").observe(perf_counter() - start)
+            logger.error("Ignoring invalid config %s: %s", self.path, e)
+            return None
+        if config == self.manager.config:
+            config_reload_seconds.labels(result="unchanged").observe(perf_counter() - start)
+            return None
+        actions = await self.manager.apply_config(config)
+        duration = perf_counter() - start
+        config_reload_seconds.labels(result="failed" if actions["failed"] else "applied").observe(duration)
+        logger.info("Reloaded config %s in %.3f seconds", self.path, duration)
+        return actions
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Config reload failed: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="config-watcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
@@ -4,15 +4,24 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterable, List
 
 from .sync_engine import SyncEngine
+from ..adapters.base import USER_SEARCH, DirectoryProvider
 from ..adapters.ldap_provider import LDAPProvider
 from ..adapters.factory import create_service_adapter
+from ..adapters.openwebui_adapter import OpenWebUIAdapter
+from ..adapters.resolver import UserResolver
+from ..adapters.snapshot import SnapshotRegistry
 from ..domain.models import GroupMapping
-from ..settings import AppConfig
+from ..settings import AppConfig, ServiceConfig
 from ..metrics import sync_iterations_total, last_sync_timestamp_seconds
+from ..tracing import create_tracer
+from .schedule import MappingSchedule
+from .sharding import ShardCoordinator, create_coordinator
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +33,24 @@ class EngineManager:
         self.config = config
         self.engines: Dict[str, SyncEngine] = {}
         self.tasks: Dict[str, asyncio.Task] = {}
+        # Worker-thread call (warm-up or iteration) each engine task is waiting on
+        self._calls: Dict[str, asyncio.Future] = {}
         self.running = False
+        # Created with the engines so importing the app touches no files
+        self.shard: ShardCoordinator | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+        # Engines pointing at the same target share one snapshot of its listings;
+        # an engine with a target of its own has none
+        self.target_snapshots = SnapshotRegistry()
 
-    def _build_engine_for_service(self, service_config) -> SyncEngine:
-        """Build a sync engine for a specific service."""
-        service_name = service_config.name
-        
-        # Create LDAP provider (shared across all engines)
+    def _build_directory(self, max_connections: int = 1) -> LDAPProvider:
+        """Create an LDAP provider from the ``ldap`` and ``identity`` config.
+
+        ``max_connections`` should match the engine's fetch workers.
+        """
         ldap_cfg = self.config.ldap
         identity_attr = self.config.identity["user_attribute"]
-        ldap_provider = LDAPProvider(
+        return LDAPProvider(
             url=ldap_cfg["url"],
             bind_dn=ldap_cfg["bind_dn"],
             bind_password=ldap_cfg["bind_password"],
@@ -43,32 +60,65 @@ class EngineManager:
             user_filter=ldap_cfg["user_filter"],
             identity_attr=identity_attr,
             verify_tls=ldap_cfg.get("tls", {}).get("verify", False),
+            max_connections=max_connections,
         )
 
+    @staticmethod
+    def _sync_settings(service_config: ServiceConfig) -> Dict[str, Any]:
+        """Validate a service's ``sync`` section and return SyncEngine tuning arguments."""
+        sync_cfg = getattr(service_config, 'sync', None)
+        if not sync_cfg:
+            raise ValueError(f"Service '{service_config.name}' must have sync configuration")
+        return {
+            "retries": sync_cfg.get("retries", 3),
+            "backoff_base_seconds": sync_cfg.get("backoff_base_seconds", 0.5),
+            "max_backoff_seconds": sync_cfg.get("max_backoff_seconds", 10.0),
+            "spill_threshold": sync_cfg.get("spill_threshold", 1_000_000),
+            "spill_dir": sync_cfg.get("spill_dir"),
+            "group_ttl_seconds": sync_cfg.get("group_discovery_ttl_seconds", 300),
+            "iteration_deadline_seconds": sync_cfg.get("iteration_deadline_seconds", 0),
+            "fetch_workers": sync_cfg.get("fetch_workers", 1),
+            "write_workers": sync_cfg.get("write_workers", 1),
+            "queue_size": sync_cfg.get("pipeline_queue_size", 4),
+        }
+
+    def _build_engine_for_service(self, service_config, directory: DirectoryProvider | None = None) -> SyncEngine:
+        """Build a sync engine for a specific service, optionally reusing an LDAP provider."""
+        service_name = service_config.name
+        settings = self._sync_settings(service_config)
+
         # Create service adapter
         adapter = create_service_adapter(service_config.model_dump())
-        
+
         # Create group mappings
         mappings = [GroupMapping(**m) for m in service_config.group_mappings]
-        
-        # Get sync configuration (required for each service)
-        sync_cfg = getattr(service_config, 'sync', None)
-        if not sync_cfg:
-            raise ValueError(f"Service '{service_name}' must have sync configuration")
-        
-        return SyncEngine(
-            directory=ldap_provider,
+
+        engine = SyncEngine(
+            directory=directory or self._build_directory(settings["fetch_workers"]),
             adapter=adapter,
             mappings=mappings,
-            retries=sync_cfg.get("retries", 3),
-            backoff_base_seconds=sync_cfg.get("backoff_base_seconds", 0.5),
-            max_backoff_seconds=sync_cfg.get("max_backoff_seconds", 10.0),
+            name=service_name,
+            tracer=create_tracer(service_name, self.config.tracing),
+            shard=self.shard,
+            **settings,
         )
+        _apply_resolver_settings(engine, service_config)
+        _apply_schedule_settings(engine, service_config)
+        return engine
+
+    def build_engines(self, names: Iterable[str] | None = None) -> Dict[str, str]:
+        """Build engines for all configured services, or only ``names``.
 
-    def build_engines(self) -> None:
-        """Build engines for all configured services."""
+        Returns the error message for each service whose engine failed to build.
+        """
+        wanted = set(names) if names is not None else None
+        failures: Dict[str, str] = {}
+        if self.shard is None:
+            self.shard = create_coordinator(self.config.sharding)
         for service_config in self.config.services:
             service_name = service_config.name
+            if wanted is not None and service_name not in wanted:
+                continue
             logger.info(f"Building engine for service: {service_name}")
             
             try:
@@ -77,6 +127,25 @@ class EngineManager:
                 logger.info(f"Successfully built engine for service: {service_name}")
             except Exception as e:
                 logger.error(f"Failed to build engine for service {service_name}: {e}")
+                failures[service_name] = str(e)
+        self._share_snapshots()
+        return failures
+
+    def _share_snapshots(self) -> None:
+        """Give a shared snapshot to adapters whose target other engines use too, and take it from the rest."""
+        by_target: Dict[Any, List[OpenWebUIAdapter]] = {}
+        for engine in self.engines.values():
+            adapter = engine.adapter
+            if isinstance(adapter, OpenWebUIAdapter):
+                by_target.setdefault((adapter.base_url, adapter.api_key), []).append(adapter)
+        for target, adapters in by_target.items():
+            shared = len(adapters) > 1
+            for adapter in adapters:
+                if shared and adapter.snapshot is None:
+                    adapter.snapshot = self.target_snapshots.acquire(target)
+                elif not shared and adapter.snapshot is not None:
+                    self.target_snapshots.release(adapter.snapshot)
+                    adapter.snapshot = None
 
     async def _run_engine_loop(self, service_name: str, engine: SyncEngine) -> None:
         """Run sync loop for a specific engine."""
@@ -85,19 +154,54 @@ class EngineManager:
         if not sync_cfg:
             raise ValueError(f"Service '{service_name}' must have sync configuration")
         interval = sync_cfg.get("interval_seconds", 60)
-        
+        if engine.schedule is not None:
+            # Mappings carry their own intervals; wake up often enough for the busiest
+            interval = engine.schedule.min_seconds
+        # Optional faster cadence for syncing users that just appeared in the target
+        new_user_interval = sync_cfg.get("new_user_check_seconds")
+
+        if not engine.ready:
+            # Warm-up blocks on the network, so engines warm up concurrently in threads
+            await self._in_thread(service_name, engine.warm_up)
+
         logger.info(f"Starting sync loop for service: {service_name} (interval: {interval}s)")
-        
+
+        next_full_sync = 0.0
         while self.running:
-            try:
-                sync_iterations_total.inc()
-                engine.run_iteration()
-                last_sync_timestamp_seconds.set_to_current_time()
-                logger.debug(f"Completed sync iteration for service: {service_name}")
-            except Exception as exc:
-                logger.error(f"Sync iteration failed for service {service_name}: {exc}")
-            
-            await asyncio.sleep(interval)
+            now = time.monotonic()
+            if now >= next_full_sync:
+                next_full_sync = now + interval
+                try:
+                    # Iterations block on the network; keep the event loop free for other engines and HTTP
+                    results = await self._in_thread(service_name, engine.run_iteration)
+                    # With per-mapping schedules most ticks have nothing due; those are not iterations
+                    if results:
+                        sync_iterations_total.labels(engine=service_name).inc()
+                        last_sync_timestamp_seconds.labels(engine=service_name).set_to_current_time()
+                    logger.debug(f"Completed sync iteration for service: {service_name}")
+                except Exception as exc:
+                    logger.error(f"Sync iteration failed for service {service_name}: {exc}")
+            else:
+                try:
+                    await self._in_thread(service_name, engine.sync_new_users)
+                except Exception as exc:
+                    logger.error(f"New user sync failed for service {service_name}: {exc}")
+
+            sleep_for = next_full_sync - time.monotonic()
+            if new_user_interval:
+                sleep_for = min(sleep_for, new_user_interval)
+            await asyncio.sleep(max(sleep_for, 0))
+
+    async def _in_thread(self, service_name: str, func: Callable[[], Any]) -> Any:
+        """Run ``func`` in a worker thread that :meth:`_stop_engine` can wait for.
+
+        Cancelling the engine task cannot interrupt the thread, so the call is
+        shielded and kept until it finishes; otherwise a restarted task would
+        warm up or sync the same engine concurrently.
+        """
+        call = asyncio.ensure_future(asyncio.to_thread(func))
+        self._calls[service_name] = call
+        return await asyncio.shield(call)
 
     async def start(self) -> None:
         """Start all engines."""
@@ -108,13 +212,115 @@ class EngineManager:
         self.running = True
         logger.info(f"Starting {len(self.engines)} sync engines")
 
-        for service_name, engine in self.engines.items():
-            task = asyncio.create_task(
-                self._run_engine_loop(service_name, engine),
-                name=f"sync-{service_name}"
-            )
-            self.tasks[service_name] = task
-            logger.info(f"Started sync task for service: {service_name}")
+        if self.shard is not None:
+            await asyncio.to_thread(self.shard.refresh)
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop(self.shard), name="shard-heartbeat")
+
+        for service_name in self.engines:
+            self._start_engine(service_name)
+
+    async def _heartbeat_loop(self, shard: ShardCoordinator) -> None:
+        """Renew the shard lease and pick up membership changes."""
+        interval = shard.lease_ttl_seconds / 3
+        while self.running:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(shard.refresh)
+
+    def _start_engine(self, service_name: str) -> None:
+        self.tasks[service_name] = asyncio.create_task(
+            self._run_engine_loop(service_name, self.engines[service_name]),
+            name=f"sync-{service_name}"
+        )
+        logger.info(f"Started sync task for service: {service_name}")
+
+    async def _stop_engine(self, service_name: str) -> None:
+        task = self.tasks.pop(service_name, None)
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            logger.info(f"Cancelled sync task for service: {service_name}")
+        call = self._calls.pop(service_name, None)
+        if call is not None:
+            # Errors were reported by the loop, or belong to a call nobody waits for anymore
+            with suppress(Exception):
+                await call
+
+    async def apply_config(self, config: AppConfig) -> Dict[str, List[str]]:
+        """Switch to a new config, touching only the engines it changes.
+
+        Engines whose service connection settings changed (or all of them,
+        when ``ldap``/``identity`` changed) are rebuilt; engines whose
+        mappings, ``sync`` settings or tracing changed are reconfigured in
+        place, keeping their adapter caches and connections. Changes to
+        ``sharding`` and ``reload`` are not applied; they are logged as needing
+        a restart. Returns engine names by action.
+        """
+        old = self.config
+        for section in ("sharding", "reload"):
+            if getattr(old, section) != getattr(config, section):
+                logger.warning("Config section '%s' changed; restart the service to apply it", section)
+        old_services = {s.name: s for s in old.services}
+        new_services = {s.name: s for s in config.services}
+        directory_changed = old.ldap != config.ldap or old.identity != config.identity
+        tracing_changed = old.tracing != config.tracing
+        actions: Dict[str, List[str]] = {
+            "added": [], "removed": [], "rebuilt": [], "reconfigured": [], "unchanged": [], "failed": []
+        }
+        self.config = config
+
+        for name in old_services.keys() - new_services.keys():
+            await self._stop_engine(name)
+            removed = self.engines.pop(name, None)
+            if removed is not None:
+                _close_adapter(removed.adapter, self.target_snapshots)
+                removed.directory.close()
+                removed.tracer.close()
+            actions["removed"].append(name)
+
+        to_start: List[str] = []
+        for name, service in new_services.items():
+            previous = old_services.get(name)
+            engine = self.engines.get(name)
+            try:
+                if engine is None or directory_changed or _connection_fields(previous) != _connection_fields(service):
+                    directory = None if engine is None or directory_changed else engine.directory
+                    new_engine = self._build_engine_for_service(service, directory=directory)
+                    await self._stop_engine(name)
+                    self.engines[name] = new_engine
+                    if engine is not None:
+                        _close_adapter(engine.adapter, self.target_snapshots)
+                        if engine.directory is not new_engine.directory:
+                            engine.directory.close()
+                        engine.tracer.close()
+                    actions["added" if engine is None else "rebuilt"].append(name)
+                elif previous != service or tracing_changed:
+                    settings = self._sync_settings(service)
+                    await self._stop_engine(name)
+                    engine.reconfigure(
+                        mappings=[GroupMapping(**m) for m in service.group_mappings],
+                        tracer=create_tracer(name, config.tracing) if tracing_changed else None,
+                        **settings,
+                    )
+                    _apply_adapter_settings(engine.adapter, service)
+                    _apply_resolver_settings(engine, service)
+                    _apply_schedule_settings(engine, service)
+                    actions["reconfigured"].append(name)
+                else:
+                    actions["unchanged"].append(name)
+                    continue
+            except Exception as e:
+                logger.error(f"Failed to apply new config for service {name}, keeping the old engine: {e}")
+                actions["failed"].append(name)
+                continue
+            to_start.append(name)
+        self._share_snapshots()
+        if self.running:
+            for name in to_start:
+                self._start_engine(name)
+
+        logger.info("Applied new config: %s", {k: v for k, v in actions.items() if v})
+        return actions
 
     async def stop(self) -> None:
         """Stop all engines."""
@@ -124,6 +330,15 @@ class EngineManager:
         logger.info("Stopping all sync engines")
         self.running = False
 
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._heartbeat_task
+            self._heartbeat_task = None
+        if self.shard is not None:
+            # Let the remaining replicas take over without waiting for expiry
+            await asyncio.to_thread(self.shard.release)
+
         # Cancel all tasks
         for service_name, task in self.tasks.items():
             task.cancel()
@@ -133,6 +348,9 @@ class EngineManager:
         if self.tasks:
             await asyncio.gather(*self.tasks.values(), return_exceptions=True)
             self.tasks.clear()
+        if self._calls:
+            await asyncio.gather(*self._calls.values(), return_exceptions=True)
+            self._calls.clear()
 
         logger.info("All sync engines stopped")
 
@@ -147,3 +365,143 @@ class EngineManager:
             else:
                 status[service_name] = "running"
         return status
+
+    def run_once(self, mapping: str | None = None) -> Dict[str, Dict[str, Any]]:
+        """Run one iteration of every built engine in parallel threads.
+
+        ``mapping`` restricts each engine to mappings whose target group name
+        or LDAP DN matches; engines without such a mapping are not run.
+        Returns per-engine summaries with ``status`` ok, partial or failed.
+        """
+        if self.shard is not None:
+            # Register, then only sync what the ring assigns to this replica
+            self.shard.refresh()
+        selected: Dict[str, SyncEngine] = {}
+        for name, engine in self.engines.items():
+            if mapping is not None:
+                engine.mappings = [
+                    m for m in engine.mappings if mapping in (m.target_group_name, m.ldap_group_dn)
+                ]
+                if not engine.mappings:
+                    continue
+            selected[name] = engine
+
+        def run(name: str, engine: SyncEngine) -> Dict[str, Any]:
+            start = time.monotonic()
+            summary: Dict[str, Any] = {"status": "ok"}
+            try:
+                results = engine.run_iteration()
+                if results:
+                    sync_iterations_total.labels(engine=name).inc()
+                    last_sync_timestamp_seconds.labels(engine=name).set_to_current_time()
+                summary["mappings"] = results
+                if any(r["status"] in ("failed", "skipped") for r in results.values()):
+                    summary["status"] = "partial"
+            except Exception as exc:
+                logger.error(f"Sync iteration failed for service {name}: {exc}")
+                summary.update(status="failed", error=str(exc))
+            summary["pending_users"] = len(engine.pending)
+            summary["duration_seconds"] = round(time.monotonic() - start, 3)
+            return summary
+
+        if not selected:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(selected), thread_name_prefix="sync") as pool:
+            futures = {name: pool.submit(run, name, engine) for name, engine in selected.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def get_readiness(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-engine warm-up progress."""
+        return {
+            name: {"ready": engine.ready, "phases": dict(engine.warmup)}
+            for name, engine in self.engines.items()
+        }
+
+    def get_pending(self, service_name: str, offset: int = 0, limit: int = 100) -> Dict[str, Any] | None:
+        """Get a page of users pending in the target for an engine, or None if unknown."""
+        engine = self.engines.get(service_name)
+        if engine is None:
+            return None
+        return engine.pending.page(offset=offset, limit=limit)
+
+    def get_schedule(self, service_name: str) -> Dict[str, Any] | None:
+        """Get the adaptive interval of each of an engine's mappings, or None if unknown."""
+        engine = self.engines.get(service_name)
+        if engine is None:
+            return None
+        if engine.schedule is None:
+            return {"adaptive": False, "mappings": {}}
+        names = [m.target_group_name for m in engine.mappings]
+        return {"adaptive": True, "mappings": engine.schedule.describe(names, time.monotonic())}
+
+    def get_traces(self, service_name: str) -> List[Dict[str, Any]] | None:
+        """Get span trees of an engine's recent iterations, or None if unknown."""
+        engine = self.engines.get(service_name)
+        if engine is None:
+            return None
+        return engine.tracer.recent_traces()
+
+
+# Service settings that require a new adapter when changed
+CONNECTION_FIELDS = ("type", "base_url", "auth", "http", "path_templates", "mock", "litellm")
+
+
+def _connection_fields(service: ServiceConfig | None) -> Dict[str, Any] | None:
+    if service is None:
+        return None
+    return {field: getattr(service, field) for field in CONNECTION_FIELDS}
+
+
+def _apply_adapter_settings(adapter: Any, service: ServiceConfig) -> None:
+    """Update adapter options that live in the ``sync`` section."""
+    if hasattr(adapter, "full_user_refresh_seconds"):
+        adapter.full_user_refresh_seconds = (service.sync or {}).get("full_user_refresh_seconds", 3600)
+    if hasattr(adapter, "snapshot_max_age_seconds"):
+        adapter.snapshot_max_age_seconds = (service.sync or {}).get("target_snapshot_max_age_seconds", 5)
+
+
+def _apply_resolver_settings(engine: SyncEngine, service: ServiceConfig) -> None:
+    """Give the engine a user resolver when the adapter can search users and lookups are enabled."""
+    sync_cfg = service.sync or {}
+    settings = {
+        "max_lookups": sync_cfg.get("user_lookup_max", 200),
+        "concurrency": sync_cfg.get("user_lookup_concurrency", 8),
+        "full_refresh_seconds": sync_cfg.get("full_user_refresh_seconds", 3600),
+        "recheck_seconds": sync_cfg.get("user_lookup_recheck_seconds", 300),
+    }
+    if USER_SEARCH not in engine.adapter.capabilities or not settings["max_lookups"]:
+        engine.resolver = None
+    elif engine.resolver is None:
+        engine.resolver = UserResolver(engine.adapter, name=engine.name, **settings)
+    else:
+        # Keep the resolver's full-refresh timestamp and lookups across reloads
+        for key, value in settings.items():
+            setattr(engine.resolver, key, value)
+
+
+def _apply_schedule_settings(engine: SyncEngine, service: ServiceConfig) -> None:
+    """Enable adaptive per-mapping intervals when the service sets both bounds."""
+    sync_cfg = service.sync or {}
+    min_seconds = sync_cfg.get("mapping_min_interval_seconds")
+    max_seconds = sync_cfg.get("mapping_max_interval_seconds")
+    if not min_seconds or not max_seconds:
+        engine.schedule = None
+        return
+    initial = sync_cfg.get("interval_seconds", 60)
+    if engine.schedule is None:
+        engine.schedule = MappingSchedule(min_seconds, max_seconds, initial, engine=engine.name)
+    else:
+        # Keep the intervals learned so far; the next sync clamps them to the new bounds
+        engine.schedule.min_seconds = min_seconds
+        engine.schedule.max_seconds = max_seconds
+        engine.schedule.initial_seconds = initial
+
+
+def _close_adapter(adapter: Any, snapshots: SnapshotRegistry | None = None) -> None:
+    """Close the HTTP client of an adapter that is being replaced and release its snapshot."""
+    client = getattr(adapter, "client", None)
+    if client is not None:
+        client.close()
+    snapshot = getattr(adapter, "snapshot", None)
+    if snapshots is not None and snapshot is not None:
+        snapshots.release(snapshot)
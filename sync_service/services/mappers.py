@@ -1,14 +1,65 @@
 """Set diff logic for group membership reconciliation."""
 
-from typing import Iterable, Set
+from array import array
+from typing import Dict, Hashable, Iterable, Mapping, Set, Tuple, TypeVar
+
+try:
+    import numpy as np  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+T = TypeVar("T", bound=Hashable)
+K = TypeVar("K", bound=Hashable)
+
+# Below this size set operations beat the numpy conversion overhead
+NUMPY_MIN_MEMBERS = 4096
 
 
 def diff_members(
-    ldap_emails: Iterable[str], target_emails: Iterable[str]
-) -> tuple[Set[str], Set[str]]:
-    """Compute adds and deletes given two iterables of emails."""
+    ldap_emails: Iterable[T], target_emails: Iterable[T]
+) -> tuple[Set[T], Set[T]]:
+    """Compute adds and deletes given two iterables of emails (or interned idents)."""
     ldap_set = set(ldap_emails)
     target_set = set(target_emails)
     adds = ldap_set - target_set
     deletes = target_set - ldap_set
     return adds, deletes
+
+
+def bulk_diff(memberships: Mapping[K, Tuple[array, array]]) -> Dict[K, Tuple[array, array]]:
+    """Diff the desired and current members of many groups in one pass.
+
+    ``memberships`` maps a group key to ``(desired, current)`` sorted
+    ``array('I')`` idents. Returns ``(adds, deletes)`` as sorted arrays for the
+    groups that changed only. Unchanged groups are detected by comparing the
+    arrays directly, without building any sets; large changed groups use
+    numpy sorted-array operations when numpy is installed.
+    """
+    deltas: Dict[K, Tuple[array, array]] = {}
+    for key, (desired, current) in memberships.items():
+        if desired == current:
+            continue
+        if np is not None and len(desired) + len(current) >= NUMPY_MIN_MEMBERS:
+            deltas[key] = _diff_sorted_numpy(desired, current)
+        else:
+            desired_set = set(desired)
+            current_set = set(current)
+            deltas[key] = (
+                array("I", sorted(desired_set - current_set)),
+                array("I", sorted(current_set - desired_set)),
+            )
+    return deltas
+
+
+def _diff_sorted_numpy(desired: array, current: array) -> Tuple[array, array]:
+    want = np.frombuffer(desired, dtype=np.uint32)
+    have = np.frombuffer(current, dtype=np.uint32)
+    adds = np.setdiff1d(want, have, assume_unique=True)
+    deletes = np.setdiff1d(have, want, assume_unique=True)
+    return _to_array(adds), _to_array(deletes)
+
+
+def _to_array(values) -> array:
+    result = array("I")
+    result.frombytes(values.tobytes())
+    return result
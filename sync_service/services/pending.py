@@ -0,0 +1,91 @@
+"""Registry of directory identities that have no account in the target yet."""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set
+
+
+@dataclass
+class PendingUser:
+    """An LDAP member waiting for a target account."""
+
+    email: str
+    groups: Set[str] = field(default_factory=set)
+    first_seen: float = field(default_factory=time.time)
+
+
+class PendingRegistry:
+    """Negative cache of identities missing from the target service.
+
+    Each group remembers the target user set version it was last checked
+    against, so pending identities are only looked up again after the
+    target users change.
+    """
+
+    def __init__(self) -> None:
+        self._users: Dict[str, PendingUser] = {}
+        self._by_group: Dict[str, Set[str]] = {}
+        self._checked_versions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, email: object) -> bool:
+        return email in self._users
+
+    def add(self, email: str, group: str) -> bool:
+        """Record that ``group`` wants ``email``; return True if it was not pending before."""
+        user = self._users.get(email)
+        is_new = user is None
+        if user is None:
+            user = self._users[email] = PendingUser(email=email)
+        user.groups.add(group)
+        self._by_group.setdefault(group, set()).add(email)
+        return is_new
+
+    def resolve(self, email: str, group: str) -> None:
+        """Forget that ``group`` is waiting for ``email``."""
+        user = self._users.get(email)
+        if user is None:
+            return
+        user.groups.discard(group)
+        members = self._by_group.get(group)
+        if members is not None:
+            members.discard(email)
+        if not user.groups:
+            del self._users[email]
+
+    def groups_for(self, email: str) -> Set[str]:
+        """Return group names waiting for ``email``."""
+        user = self._users.get(email)
+        return set(user.groups) if user else set()
+
+    def emails(self) -> List[str]:
+        """Return every pending email."""
+        return list(self._users)
+
+    def emails_for(self, group: str) -> Set[str]:
+        """Return emails ``group`` is waiting for."""
+        return self._by_group.get(group, set())
+
+    def is_fresh(self, group: str, users_version: int) -> bool:
+        """Return True if ``group`` was already checked against this target user set."""
+        return self._checked_versions.get(group) == users_version
+
+    def mark_checked(self, group: str, users_version: int) -> None:
+        self._checked_versions[group] = users_version
+
+    def page(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Return a page of pending users ordered by email."""
+        emails = sorted(self._users)[offset : offset + limit]
+        items: List[Dict[str, Any]] = [
+            {
+                "email": email,
+                "groups": sorted(self._users[email].groups),
+                "first_seen": self._users[email].first_seen,
+            }
+            for email in emails
+        ]
+        return {"total": len(self._users), "offset": offset, "limit": limit, "items": items}
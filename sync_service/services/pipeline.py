@@ -0,0 +1,134 @@
+"""Stages connected by bounded queues, each with its own worker threads.
+
+A :class:`Pipeline` passes items through its stages in order. Each stage
+reads from a bounded input queue, so a slow stage blocks the one before it
+instead of letting work pile up in memory. A stage function returns the
+item for the next stage, or None to drop it. A ``batch`` stage instead takes
+every item waiting in its queue at once and returns the list of items to
+pass on, for work that is cheaper in bulk. Workers run in a copy of the
+caller's context, so external calls and trace spans are attributed to the
+iteration that started the pipeline.
+
+The first exception raised by a stage stops the pipeline: remaining items
+are drained without being processed and the exception is re-raised by
+:meth:`Pipeline.run`.
+"""
+
+from __future__ import annotations
+
+import contextvars
+from dataclasses import dataclass
+import queue
+import threading
+from time import perf_counter
+from typing import Any, Callable, Iterable, List
+
+from ..metrics import sync_stage_busy_seconds_total, sync_stage_queue_depth, sync_stage_utilization
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    batch: bool = False
+
+
+class Pipeline:
+    """Runs items through ``stages`` with at most ``queue_size`` items waiting per stage."""
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4, engine: str = "default") -> None:
+        self.stages = stages
+        self.queue_size = queue_size
+        self.engine = engine
+
+    def run(self, items: Iterable[Any]) -> None:
+        queues: List["queue.Queue[Any]"] = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        busy = [0.0] * len(self.stages)
+        remaining = [stage.workers for stage in self.stages]
+        errors: List[BaseException] = []
+        lock = threading.Lock()
+
+        def depth(index: int) -> None:
+            sync_stage_queue_depth.labels(engine=self.engine, stage=self.stages[index].name).set(queues[index].qsize())
+
+        def put(index: int, item: Any) -> None:
+            queues[index].put(item)
+            depth(index)
+
+        def work(index: int) -> None:
+            stage = self.stages[index]
+            last = index == len(self.stages) - 1
+            stopping = False
+            while not stopping:
+                item = queues[index].get()
+                if item is _DONE:
+                    depth(index)
+                    break
+                items = [item]
+                while stage.batch:
+                    try:
+                        item = queues[index].get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _DONE:
+                        stopping = True
+                        break
+                    items.append(item)
+                depth(index)
+                if errors:
+                    continue
+                started = perf_counter()
+                try:
+                    results = stage.func(items) if stage.batch else [stage.func(items[0])]
+                except BaseException as exc:
+                    with lock:
+                        errors.append(exc)
+                    continue
+                finally:
+                    elapsed = perf_counter() - started
+                    with lock:
+                        busy[index] += elapsed
+                    sync_stage_busy_seconds_total.labels(engine=self.engine, stage=stage.name).inc(elapsed)
+                if not last:
+                    for result in results:
+                        if result is not None:
+                            put(index + 1, result)
+            # The last worker of a stage tells every worker of the next one to stop
+            with lock:
+                remaining[index] -= 1
+                finished = remaining[index] == 0
+            if finished and not last:
+                for _ in range(self.stages[index + 1].workers):
+                    put(index + 1, _DONE)
+
+        start = perf_counter()
+        threads = [
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(work, index),
+                name=f"{self.engine}-{stage.name}-{n}",
+                daemon=True,
+            )
+            for index, stage in enumerate(self.stages)
+            for n in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for item in items:
+                if errors:
+                    break
+                put(0, item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                put(0, _DONE)
+            for thread in threads:
+                thread.join()
+        elapsed = max(perf_counter() - start, 1e-9)
+        for stage, seconds in zip(self.stages, busy):
+            sync_stage_utilization.labels(engine=self.engine, stage=stage.name).set(seconds / (stage.workers * elapsed))
+        if errors:
+            raise errors[0]
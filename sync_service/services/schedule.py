@@ -0,0 +1,66 @@
+"""Per-mapping sync intervals that adapt to how often each group changes.
+
+Every mapping starts at the service's ``interval_seconds``. A sync that
+changed members halves the mapping's interval and an unchanged one stretches
+it by half, within ``[min_seconds, max_seconds]``, so busy groups converge on
+the minimum and static ones on the maximum. A mapping is also never scheduled
+so often that syncing it would take more than ``MAX_SYNC_SHARE`` of its
+interval. Failed mappings are retried after the minimum interval.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+from ..metrics import sync_mapping_interval_seconds
+
+SHRINK = 0.5
+GROWTH = 1.5
+MAX_SYNC_SHARE = 0.1
+
+
+class MappingSchedule:
+    """Next due time and current interval of each mapping, by target group name."""
+
+    def __init__(
+        self, min_seconds: float, max_seconds: float, initial_seconds: float, engine: str = "default"
+    ) -> None:
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.initial_seconds = initial_seconds
+        self.engine = engine
+        self._intervals: Dict[str, float] = {}
+        self._next_due: Dict[str, float] = {}
+
+    def _clamp(self, seconds: float) -> float:
+        return min(max(seconds, self.min_seconds), self.max_seconds)
+
+    def interval(self, mapping: str) -> float:
+        return self._clamp(self._intervals.get(mapping, self.initial_seconds))
+
+    def due(self, mappings: Iterable[str], now: float) -> List[str]:
+        """Mappings whose next sync time has come; unseen mappings are due at once."""
+        return [m for m in mappings if now >= self._next_due.get(m, float("-inf"))]
+
+    def record(self, mapping: str, status: str, changes: int, duration: float, now: float) -> None:
+        """Reschedule a mapping after a sync that took ``duration`` seconds."""
+        if status == "skipped":
+            return
+        if status == "failed":
+            self._next_due[mapping] = now + self.min_seconds
+            return
+        interval = self.interval(mapping) * (SHRINK if changes else GROWTH)
+        interval = self._clamp(max(interval, duration / MAX_SYNC_SHARE))
+        self._intervals[mapping] = interval
+        self._next_due[mapping] = now + interval
+        sync_mapping_interval_seconds.labels(engine=self.engine, mapping=mapping).set(interval)
+
+    def describe(self, mappings: Iterable[str], now: float) -> Dict[str, Dict[str, Any]]:
+        """Interval and seconds until due of each mapping, for the status API."""
+        return {
+            m: {
+                "interval_seconds": round(self.interval(m), 3),
+                "due_in_seconds": round(max(self._next_due.get(m, now) - now, 0.0), 3),
+            }
+            for m in mappings
+        }
@@ -0,0 +1,165 @@
+"""Sharding of (engine, mapping) pairs across replicas.
+
+Replicas register in a lease backend and renew their lease periodically.
+Every replica builds the same consistent-hash ring from the live members and
+syncs only the mappings the ring assigns to it, so work is rebalanced as
+soon as a replica joins or its lease expires.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from bisect import bisect
+import hashlib
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Sequence
+
+from ..domain.models import GroupMapping
+from ..metrics import shard_members, shard_owned_mappings, shard_rebalances_total
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with ``vnodes`` points per member."""
+
+    def __init__(self, members: Sequence[str], vnodes: int = 64) -> None:
+        self.members = sorted(set(members))
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key: str) -> str | None:
+        """Member owning ``key``, or None for an empty ring."""
+        if not self._hashes:
+            return None
+        index = bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class LeaseBackend(ABC):
+    """Shared registry of live replicas."""
+
+    @abstractmethod
+    def heartbeat(self, replica_id: str, ttl_seconds: float) -> None:
+        """Create or renew ``replica_id``'s lease."""
+
+    @abstractmethod
+    def members(self) -> List[str]:
+        """Ids of replicas whose lease has not expired."""
+
+    @abstractmethod
+    def release(self, replica_id: str) -> None:
+        """Drop ``replica_id``'s lease so others take over at once."""
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Leases in a SQLite file, for replicas sharing a host or volume."""
+
+    def __init__(self, path: str, clock=time.time) -> None:
+        self.path = path
+        self.clock = clock
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (replica TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps the backend usable from any thread
+        return sqlite3.connect(self.path, timeout=10)
+
+    def heartbeat(self, replica_id: str, ttl_seconds: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO leases (replica, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(replica) DO UPDATE SET expires_at = excluded.expires_at",
+                (replica_id, self.clock() + ttl_seconds),
+            )
+
+    def members(self) -> List[str]:
+        with self._connect() as conn:
+            now = self.clock()
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+            rows = conn.execute("SELECT replica FROM leases ORDER BY replica").fetchall()
+        return [row[0] for row in rows]
+
+    def release(self, replica_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE replica = ?", (replica_id,))
+
+
+class ShardCoordinator:
+    """Decides which (engine, mapping) pairs this replica syncs."""
+
+    def __init__(
+        self,
+        backend: LeaseBackend,
+        replica_id: str,
+        lease_ttl_seconds: float = 30.0,
+        vnodes: int = 64,
+    ) -> None:
+        self.backend = backend
+        self.replica_id = replica_id
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.vnodes = vnodes
+        self.ring = HashRing([], vnodes)
+
+    def refresh(self) -> bool:
+        """Renew this replica's lease and rebuild the ring; returns True if membership changed.
+
+        If the backend is unreachable the replica owns nothing until it can
+        renew again, since its lease may already have been taken over.
+        """
+        try:
+            self.backend.heartbeat(self.replica_id, self.lease_ttl_seconds)
+            members = self.backend.members()
+        except Exception as e:
+            logger.error("Lease backend unavailable, pausing sharded work: %s", e)
+            members = []
+        shard_members.set(len(members))
+        if members == self.ring.members:
+            return False
+        logger.info(
+            "Shard membership changed: %s -> %s", self.ring.members, members, extra={"replica": self.replica_id}
+        )
+        self.ring = HashRing(members, self.vnodes)
+        shard_rebalances_total.inc()
+        return True
+
+    def release(self) -> None:
+        try:
+            self.backend.release(self.replica_id)
+        except Exception as e:
+            logger.warning("Failed to release lease for %s: %s", self.replica_id, e)
+
+    def owns(self, engine: str, mapping: GroupMapping) -> bool:
+        return self.ring.owner(f"{engine}\x00{mapping.target_group_name}") == self.replica_id
+
+    def owned(self, engine: str, mappings: List[GroupMapping]) -> List[GroupMapping]:
+        """The subset of ``mappings`` assigned to this replica."""
+        owned = [m for m in mappings if self.owns(engine, m)]
+        shard_owned_mappings.labels(engine=engine).set(len(owned))
+        return owned
+
+
+def create_coordinator(cfg: Dict | None) -> ShardCoordinator | None:
+    """Build a coordinator from the top-level ``sharding`` config, or None when disabled."""
+    cfg = cfg or {}
+    if not cfg.get("enabled"):
+        return None
+    backend_type = cfg.get("backend", "sqlite")
+    if backend_type != "sqlite":
+        raise ValueError(f"Unsupported lease backend: {backend_type}")
+    replica_id = cfg.get("replica_id")
+    if not replica_id:
+        raise ValueError("sharding.replica_id is required when sharding is enabled")
+    return ShardCoordinator(
+        SQLiteLeaseBackend(cfg.get("path", "leases.db")),
+        replica_id=str(replica_id),
+        lease_ttl_seconds=cfg.get("lease_ttl_seconds", 30),
+        vnodes=cfg.get("vnodes", 64),
+    )
@@ -0,0 +1,174 @@
+"""External-memory membership sets for groups too large to diff in memory.
+
+Idents are buffered in a fixed-size ``array('I')``; each full buffer is
+sorted, de-duplicated and written to a run file. Iterating merges the runs
+lazily, so only one block per run is held in memory at a time. LDAP member
+emails of such groups are streamed to a file by :func:`collect_members`
+instead of being held as a list.
+"""
+
+from __future__ import annotations
+
+from array import array
+import contextlib
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+DEFAULT_RUN_SIZE = 262_144
+READ_BLOCK = 16_384
+
+
+class SpilledIdents:
+    """Sorted, de-duplicated idents kept in run files on disk."""
+
+    def __init__(self, run_size: int = DEFAULT_RUN_SIZE, directory: str | None = None) -> None:
+        self.run_size = run_size
+        self._dir = tempfile.mkdtemp(prefix="sync-spill-", dir=directory)
+        self._runs: List[str] = []
+        self._buffer = array("I")
+        self._count: int | None = None
+
+    def add(self, ident: int) -> None:
+        self._buffer.append(ident)
+        if len(self._buffer) >= self.run_size:
+            self._flush()
+
+    def extend(self, idents: Iterable[int]) -> None:
+        for ident in idents:
+            self.add(ident)
+
+    def finish(self) -> "SpilledIdents":
+        """Write out any buffered idents; call before iterating."""
+        if self._buffer:
+            self._flush()
+        return self
+
+    def _flush(self) -> None:
+        run = array("I", sorted(set(self._buffer)))
+        path = os.path.join(self._dir, f"run-{len(self._runs):05d}")
+        with open(path, "wb") as fh:
+            run.tofile(fh)
+        self._runs.append(path)
+        self._buffer = array("I")
+        self._count = len(run) if len(self._runs) == 1 else None
+
+    def __len__(self) -> int:
+        """Number of unique idents; runs overlap, so more than one run is counted by merging."""
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        """Yield all idents in ascending order, each once."""
+        previous = -1
+        for ident in heapq.merge(*(_read_run(path) for path in self._runs)):
+            if ident != previous:
+                yield ident
+                previous = ident
+
+    def close(self) -> None:
+        """Remove the run files."""
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._runs = []
+
+    def __enter__(self) -> "SpilledIdents":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def _read_run(path: str) -> Iterator[int]:
+    with open(path, "rb") as fh:
+        while True:
+            block = array("I")
+            try:
+                block.fromfile(fh, READ_BLOCK)
+            except EOFError:
+                # fromfile keeps the items it could read before raising
+                yield from block
+                return
+            yield from block
+
+
+class SpilledEmails:
+    """Emails appended to a file and read back in order."""
+
+    def __init__(self, directory: str | None = None) -> None:
+        fd, self._path = tempfile.mkstemp(prefix="sync-members-", suffix=".txt", dir=directory)
+        self._file = os.fdopen(fd, "w+", encoding="utf-8")
+        self._count = 0
+
+    def extend(self, emails: Iterable[str]) -> None:
+        for email in emails:
+            self._file.write(email)
+            self._file.write("\n")
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        self._file.flush()
+        with open(self._path, encoding="utf-8") as fh:
+            for line in fh:
+                yield line[:-1]
+
+    def close(self) -> None:
+        """Remove the file."""
+        self._file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path)
+
+
+def collect_members(emails: Iterable[str], threshold: int, directory: str | None = None) -> Sequence[str] | SpilledEmails:
+    """Drain an email stream into a list, or into a :class:`SpilledEmails` once ``threshold`` are read."""
+    stream = iter(emails)
+    members: List[str] = []
+    if not threshold:
+        members.extend(stream)
+        return members
+    for email in stream:
+        members.append(email)
+        if len(members) >= threshold:
+            spilled = SpilledEmails(directory=directory)
+            try:
+                spilled.extend(members)
+                del members
+                spilled.extend(stream)
+            except BaseException:
+                spilled.close()
+                raise
+            return spilled
+    return members
+
+
+def merge_diff(desired: Iterable[int], current: Iterable[int]) -> Iterator[Tuple[int, bool]]:
+    """Merge-join two ascending streams of unique idents.
+
+    Yields ``(ident, True)`` for idents only in ``desired`` (adds) and
+    ``(ident, False)`` for idents only in ``current`` (deletes).
+    """
+    want = iter(desired)
+    have = iter(current)
+    w = next(want, None)
+    h = next(have, None)
+    while w is not None and h is not None:
+        if w == h:
+            w = next(want, None)
+            h = next(have, None)
+        elif w < h:
+            yield w, True
+            w = next(want, None)
+        else:
+            yield h, False
+            h = next(have, None)
+    while w is not None:
+        yield w, True
+        w = next(want, None)
+    while h is not None:
+        yield h, False
+        h = next(have, None)
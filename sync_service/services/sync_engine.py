@@ -2,24 +2,46 @@
 
 from __future__ import annotations
 
+from array import array
+from collections.abc import Sized
 import logging
-from time import perf_counter
-from typing import Dict, List
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
 
-from ..adapters.base import DirectoryProvider
-from ..adapters.openwebui_adapter import OpenWebUIAdapter
+from ..adapters.base import ADD_MEMBERS, REMOVE_MEMBERS, SET_MEMBERS, DirectoryProvider, ServiceAdapter
+from ..adapters.resolver import UserResolver
+from ..domain.identity import GroupRecord, IdentityTable
 from ..domain.models import GroupMapping
+from ..logging_conf import capped, lazy
 from ..metrics import (
+    ALL_MAPPINGS,
+    count_external_calls,
     owui_add_total,
     owui_delete_total,
+    pending_users,
     sync_errors_total,
+    sync_external_calls,
     sync_iteration_seconds,
+    sync_mappings_skipped_total,
+    sync_write_plans_total,
+    time_phase,
 )
 from ..retry import retry_on_exception
-from .mappers import diff_members
+from ..tracing import Tracer
+from .mappers import bulk_diff
+from .pending import PendingRegistry
+from .pipeline import Pipeline, Stage
+from .schedule import MappingSchedule
+from .write_plan import plan_write
+from .sharding import ShardCoordinator
+from .spill import SpilledEmails, SpilledIdents, collect_members, merge_diff
 
 logger = logging.getLogger(__name__)
 
+WARMUP_PHASES = ("directory", "groups", "users")
+# The identity table is compacted once it has at least this many idents without an account
+IDENTITY_COMPACT_MIN = 10_000
+
 
 class SyncEngine:
     """Coordinates group membership sync across mappings."""
@@ -27,125 +49,690 @@ class SyncEngine:
     def __init__(
         self,
         directory: DirectoryProvider,
-        adapter: OpenWebUIAdapter,
+        adapter: ServiceAdapter,
         mappings: List[GroupMapping],
         retries: int = 3,
         backoff_base_seconds: float = 0.5,
         max_backoff_seconds: float = 10.0,
+        name: str = "default",
+        tracer: Tracer | None = None,
+        spill_threshold: int = 1_000_000,
+        spill_dir: str | None = None,
+        group_ttl_seconds: float = 300.0,
+        iteration_deadline_seconds: float = 0.0,
+        fetch_workers: int = 1,
+        write_workers: int = 1,
+        queue_size: int = 4,
+        shard: ShardCoordinator | None = None,
+        resolver: UserResolver | None = None,
+        schedule: MappingSchedule | None = None,
     ) -> None:
+        self.name = name
+        # Per-mapping adaptive intervals; without one every mapping syncs each iteration
+        self.schedule = schedule
+        # Looks up unresolved members individually instead of listing all users
+        self.resolver = resolver
+        # When sharding, only the mappings assigned to this replica are synced
+        self.shard = shard
+        # LDAP groups with at least this many members are diffed on disk (0 disables)
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.tracer = tracer or Tracer(name)
         self.directory = directory
         self.adapter = adapter
         self.mappings = mappings
         self._retry = retry_on_exception(
             retries, backoff_base_seconds, max_backoff_seconds
         )
+        # Refreshed from target group listings when older than the TTL or
+        # when a mapped group is missing; no I/O happens at construction
+        self.group_ttl_seconds = group_ttl_seconds
+        # Mappings not started this long after an iteration began wait for the next one (0 disables)
+        self.iteration_deadline_seconds = iteration_deadline_seconds
+        # Monotonic time of each mapping's last successful sync, by target group name
+        self._last_success: Dict[str, float] = {}
+        # Concurrency of the directory-read and target-write pipeline stages, and
+        # how many mappings may wait in front of each stage
+        self.fetch_workers = fetch_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
         self.group_name_to_id: Dict[str, str] = {}
-        self._discover_groups()
+        self._groups_discovered_at: float | None = None
+        self.pending = PendingRegistry()
+        # (users_version, records) of the last listing conversion
+        self._group_cache: Tuple[int, Dict[str, GroupRecord]] | None = None
+        # Records of the last conversion, whose spilled members are removed with them
+        self._records: Dict[str, GroupRecord] = {}
+        self.warmup: Dict[str, str] = {phase: "pending" for phase in WARMUP_PHASES}
 
-    def _discover_groups(self) -> None:
-        """Populate mapping of group name to id from target service."""
-        try:
-            groups = self.adapter.list_groups()
-            logger.info(f"Discovered {len(groups)} groups: {[g['name'] for g in groups]}")
-            self.group_name_to_id = {g["name"]: g["id"] for g in groups}
-            logger.info(f"Group name to ID mapping created: {self.group_name_to_id}")
-        except Exception as e:
-            logger.error(f"Failed to discover groups during initialization: {e}")
-            logger.error(f"This will cause all sync iterations to fail until groups are discovered")
-            self.group_name_to_id = {}
+    @property
+    def ready(self) -> bool:
+        """True once every warm-up phase has completed."""
+        return all(status == "done" for status in self.warmup.values())
+
+    def warm_up(self) -> None:
+        """Connect to the directory, discover target groups and load the user cache.
+
+        Each phase's outcome is recorded in ``warmup``. Failed phases are
+        logged and completed later by regular iterations.
+        """
+        steps = (
+            ("directory", self.directory.connect),
+            ("groups", self._load_groups),
+            ("users", self._refresh_users),
+        )
+        for phase, step in steps:
+            if self.warmup[phase] == "done":
+                continue
+            self.warmup[phase] = "running"
+            try:
+                step()
+                self.warmup[phase] = "done"
+            except Exception as e:
+                self.warmup[phase] = "failed"
+                logger.warning("Warm-up phase '%s' failed: %s", phase, e, extra={"engine": self.name})
+
+    def reconfigure(
+        self,
+        mappings: List[GroupMapping],
+        retries: int = 3,
+        backoff_base_seconds: float = 0.5,
+        max_backoff_seconds: float = 10.0,
+        spill_threshold: int = 1_000_000,
+        spill_dir: str | None = None,
+        group_ttl_seconds: float = 300.0,
+        iteration_deadline_seconds: float = 0.0,
+        fetch_workers: int = 1,
+        write_workers: int = 1,
+        queue_size: int = 4,
+        tracer: Tracer | None = None,
+    ) -> None:
+        """Apply new mappings and tuning without dropping the adapter's caches or connections."""
+        self.mappings = mappings
+        self._retry = retry_on_exception(retries, backoff_base_seconds, max_backoff_seconds)
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.group_ttl_seconds = group_ttl_seconds
+        self.iteration_deadline_seconds = iteration_deadline_seconds
+        self.fetch_workers = fetch_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        if tracer is not None:
+            self.tracer.close()
+            self.tracer = tracer
+        # Groups for new mappings may have been created since the last discovery
+        self._groups_discovered_at = None
+
+    def _active_mappings(self) -> List[GroupMapping]:
+        """Mappings this replica is responsible for right now."""
+        if self.shard is None:
+            return self.mappings
+        return self.shard.owned(self.name, self.mappings)
+
+    def _by_staleness(self, mappings: List[GroupMapping]) -> List[GroupMapping]:
+        """Order mappings never synced first, then by oldest successful sync."""
+        return sorted(mappings, key=lambda m: self._last_success.get(m.target_group_name, float("-inf")))
+
+    def _due_mappings(self) -> List[GroupMapping]:
+        """Active mappings whose adaptive interval has elapsed, stalest first."""
+        mappings = self._active_mappings()
+        if self.schedule is not None:
+            due = set(self.schedule.due([m.target_group_name for m in mappings], monotonic()))
+            mappings = [m for m in mappings if m.target_group_name in due]
+        return self._by_staleness(mappings)
+
+    def _load_groups(self) -> None:
+        """List target groups, index their names and convert them to records."""
+        groups = self.adapter.list_groups()
+        self._discover_groups(groups)
+        self._group_records(groups)
+
+    def _discover_groups(self, groups: List[dict]) -> None:
+        """Rebuild the group name to id index from a group listing."""
+        self.group_name_to_id = {g["name"]: g["id"] for g in groups}
+        self._groups_discovered_at = monotonic()
+        self.warmup["groups"] = "done"
+        logger.info("Discovered %d groups: %s", len(groups), capped(self.group_name_to_id))
+
+    def _groups_stale(self, mappings: List[GroupMapping]) -> bool:
+        """True if the group index is past its TTL or misses a mapped group."""
+        if self._groups_discovered_at is None:
+            return True
+        if monotonic() - self._groups_discovered_at >= self.group_ttl_seconds:
+            return True
+        return any(m.target_group_name not in self.group_name_to_id for m in mappings)
+
+    def run_iteration(self) -> Dict[str, Dict[str, Any]]:
+        """Run one full reconciliation and return each mapping's outcome.
+
+        Outcomes are keyed by target group name, with ``status`` one of
+        ``updated``, ``unchanged``, ``failed`` or ``skipped`` plus add/delete
+        counts. Only mappings due under the adaptive schedule run, stalest
+        first; once ``iteration_deadline_seconds`` have passed, the ones not
+        yet started are skipped.
+        """
+        deadline = None
+        if self.iteration_deadline_seconds:
+            deadline = monotonic() + self.iteration_deadline_seconds
 
-    def run_iteration(self) -> None:
         @self._retry
-        def _run() -> None:
+        def _run() -> Dict[str, Dict[str, Any]]:
             start = perf_counter()
-            logger.info(f"Starting sync iteration with {len(self.mappings)} mappings")
-            
+            mappings = self._due_mappings()
+            if not mappings and self.schedule is not None:
+                logger.debug("No mappings due", extra={"engine": self.name})
+                return {}
+            logger.info("Starting sync iteration with %d mappings", len(mappings), extra={"engine": self.name})
+
+            with self.tracer.trace("iteration", mappings=len(mappings)), count_external_calls() as calls:
+                with time_phase(self.name, ALL_MAPPINGS, "target_fetch"):
+                    try:
+                        self._refresh_users()
+                        self.warmup["users"] = "done"
+                        logger.info("Found %d users", self.adapter.identities.bound_count)
+                    except Exception as e:
+                        logger.error("Failed to list users: %s", e)
+                        raise
+
+                    try:
+                        all_groups = self.adapter.list_groups()
+                        logger.info("Found %d groups", len(all_groups))
+                    except Exception as e:
+                        logger.error("Failed to list groups: %s", e)
+                        raise
+
+                logger.debug(
+                    "Group name to ID mapping: %s; target group names: %s",
+                    capped(self.group_name_to_id),
+                    lazy(lambda: capped([m.target_group_name for m in mappings])),
+                )
+
+                if self._groups_stale(mappings):
+                    self._discover_groups(all_groups)
+                groups_by_id = self._group_records(all_groups)
+                del all_groups
+                results = self._sync_mappings(mappings, groups_by_id, deadline)
+            duration = perf_counter() - start
+            sync_iteration_seconds.labels(engine=self.name).observe(duration)
+            sync_external_calls.labels(engine=self.name).observe(calls.count)
+            logger.info(
+                "Sync iteration completed in %.2f seconds with %d external calls",
+                duration,
+                calls.count,
+                extra={"engine": self.name, "duration": duration, "external_calls": calls.count},
+            )
+            return results
+
+        return _run()
+
+    def _refresh_users(self) -> List[Dict[str, Any]]:
+        if self.resolver is not None:
+            return self.resolver.refresh()
+        return self.adapter.refresh_users()
+
+    def sync_new_users(self) -> int:
+        """Reconcile only the groups waiting for users that just appeared in the target.
+
+        Fetches users created or updated since the adapter watermark, or looks
+        up the pending emails not known to be missing when a resolver is set
+        (never listing all users); mappings are synced only when a user
+        previously pending for them now resolves. Returns the number of
+        mappings reconciled.
+        """
+        changed = self._refresh_users()
+        if self.resolver is not None:
+            changed += self.resolver.resolve(self.resolver.unchecked(self.pending.emails()), listing=False)
+        identities = self.adapter.identities
+        wanted: Set[str] = set()
+        for email in self.pending.emails():
+            if identities.target_id(email) is not None:
+                wanted |= self.pending.groups_for(email)
+        mappings = [m for m in self._active_mappings() if m.target_group_name in wanted]
+        if not mappings:
+            return 0
+        logger.info("%d new or changed users, reconciling %d mappings", len(changed), len(mappings))
+        with self.tracer.trace("sync_new_users", changed_users=len(changed)):
+            with time_phase(self.name, ALL_MAPPINGS, "target_fetch"):
+                all_groups = self.adapter.list_groups()
+            if self._groups_stale(mappings):
+                self._discover_groups(all_groups)
+            groups_by_id = self._group_records(all_groups)
+            self._sync_mappings(mappings, groups_by_id)
+        return len(mappings)
+
+    def _group_records(self, groups: List[dict]) -> Dict[str, GroupRecord]:
+        """Convert API group dicts to compact records keyed by id.
+
+        The previous records are reused while the adapter reports the listing
+        as unchanged, which may then come without member lists; successful
+        writes keep their members current. When only the user index moved,
+        members that lost their target account count as unknown instead.
+        Groups of ``spill_threshold`` members or more keep them on disk.
+        """
+        users_version = self.adapter.users_version
+        identities = self.adapter.identities
+        cached = self._group_cache
+        if cached is not None and getattr(self.adapter, "groups_unchanged", False):
+            if cached[0] != users_version:
+                for record in cached[1].values():
+                    self._drop_unbound(record)
+                self._group_cache = (users_version, cached[1])
+            self._compact_identities(cached[1])
+            return cached[1]
+        records = {g["id"]: self._group_record(g, identities) for g in groups}
+        for record in self._records.values():
+            _close(record.members)
+        self._records = records
+        if hasattr(self.adapter, "groups_unchanged"):
+            self._group_cache = (users_version, records)
+        self._compact_identities(records)
+        return records
+
+    def _compact_identities(self, records: Dict[str, GroupRecord]) -> None:
+        """Compact the identity table once most of it is emails without an account.
+
+        Records only hold idents with an account at this point, so their
+        members are remapped and nothing else refers to the dropped idents.
+        """
+        identities = self.adapter.identities
+        unbound = len(identities) - identities.bound_count
+        if unbound < max(IDENTITY_COMPACT_MIN, identities.bound_count):
+            return
+        remap = identities.compact()
+        for record in records.values():
+            members = record.members
+            if isinstance(members, SpilledIdents):
+                record.members = SpilledIdents(directory=self.spill_dir)
+                record.members.extend(remap[i] for i in members)
+                record.members.finish()
+                members.close()
+            else:
+                record.members = array("I", (remap[i] for i in members))
+        logger.info(
+            "Compacted identity table, dropping %d emails without an account",
+            unbound,
+            extra={"engine": self.name, "identities": len(identities)},
+        )
+
+    def _group_record(self, group: Dict[str, Any], identities: IdentityTable) -> GroupRecord:
+        user_ids = group.get("user_ids") or ()
+        if not self.spill_threshold or len(user_ids) < self.spill_threshold:
+            return GroupRecord.from_api(group, identities)
+        members = SpilledIdents(directory=self.spill_dir)
+        members.extend(i for i in map(identities.for_target, user_ids) if i is not None)
+        members.finish()
+        return GroupRecord(group["id"], group["name"], group.get("description", ""), members, len(user_ids) - len(members))
+
+    def _drop_unbound(self, record: GroupRecord) -> None:
+        """Move members without a target account any more to ``record.unknown``."""
+        target_ids = self.adapter.identities.target_ids
+        members = record.members
+        kept: array | SpilledIdents
+        if isinstance(members, SpilledIdents):
+            kept = SpilledIdents(directory=self.spill_dir)
+            kept.extend(i for i in members if target_ids[i] is not None)
+            kept.finish()
+            members.close()
+        else:
+            kept = array("I", (i for i in members if target_ids[i] is not None))
+        record.unknown += len(members) - len(kept)
+        record.members = kept
+
+    def _sync_mappings(
+        self, mappings: List[GroupMapping], groups_by_id: Dict[str, GroupRecord], deadline: float | None = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Reconcile mappings through the fetch, resolve, diff and write stages.
+
+        The stages run concurrently, so the directory read of one mapping
+        overlaps the target write of another. The deadline is checked as each
+        mapping enters the fetch stage; the ones not started by then are
+        reported as skipped, while those already read are written.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        # Seconds spent in each mapping's stages, for the adaptive schedule
+        durations: Dict[str, float] = {}
+        skipped: List[str] = []
+        # Temporary files of the mappings in flight, removed however the run ends
+        spilled: List[SpilledEmails | SpilledIdents] = []
+
+        def fetch(job: _MappingJob) -> _MappingJob | None:
+            if deadline is not None and monotonic() >= deadline:
+                skipped.append(job.name)
+                results[job.name] = _outcome("skipped")
+                return None
+            if not self._fetch_mapping(job, groups_by_id):
+                results[job.name] = _outcome("failed")
+                return None
+            if isinstance(job.ldap_emails, SpilledEmails):
+                spilled.append(job.ldap_emails)
+            return job
+
+        def resolve(job: _MappingJob) -> _MappingJob:
+            with time_phase(self.name, job.name, "resolve"):
+                job.desired = self._resolve_members(job.name, job.ldap_emails)
+            if isinstance(job.ldap_emails, SpilledEmails):
+                job.ldap_emails.close()
+            job.ldap_emails = ()
+            if isinstance(job.desired, SpilledIdents):
+                spilled.append(job.desired)
+            return job
+
+        def diff(jobs: List[_MappingJob]) -> List[_MappingJob]:
+            started = perf_counter()
+            changed = self._diff_mappings(jobs)
+            for job in jobs:
+                durations[job.name] = durations.get(job.name, 0.0) + (perf_counter() - started) / len(jobs)
+                if job not in changed:
+                    logger.debug("No changes needed for group '%s'", job.name)
+                    results[job.name] = _outcome("unchanged")
+                    _close(job.desired)
+            return changed
+
+        def write(job: _MappingJob) -> None:
             try:
-                all_users = {u["email"]: u["id"] for u in self.adapter.list_users()}
-                logger.info(f"Found {len(all_users)} users: {list(all_users.keys())}")
-            except Exception as e:
-                logger.error(f"Failed to list users: {e}")
-                raise
-            
+                written = self._write_group(job.group_id, job.group, job.name, job.desired, job.adds, job.deletes)
+            finally:
+                # A written member list on disk becomes the group's current one
+                if job.group.members is not job.desired:
+                    _close(job.desired)
+            results[job.name] = _outcome("updated" if written else "failed", len(job.adds), len(job.deletes))
+
+        def timed(func: Callable[[_MappingJob], Any]) -> Callable[[_MappingJob], Any]:
+            def run(job: _MappingJob) -> Any:
+                started = perf_counter()
+                try:
+                    return func(job)
+                finally:
+                    durations[job.name] = durations.get(job.name, 0.0) + perf_counter() - started
+            return run
+
+        pipeline = Pipeline(
+            [
+                Stage("fetch", timed(fetch), self.fetch_workers),
+                # Resolving interns idents and updates the pending registry, which are not thread-safe
+                Stage("resolve", timed(resolve)),
+                # Mappings waiting here are diffed together in one bulk pass
+                Stage("diff", diff, batch=True),
+                Stage("write", timed(write), self.write_workers),
+            ],
+            queue_size=self.queue_size,
+            engine=self.name,
+        )
+        try:
+            pipeline.run(_MappingJob(m) for m in mappings)
+        finally:
+            adopted = {id(record.members) for record in groups_by_id.values()}
+            for files in spilled:
+                if id(files) not in adopted:
+                    files.close()
+        if skipped:
+            logger.warning(
+                "Iteration deadline reached, skipping %d mappings: %s",
+                len(skipped),
+                capped(skipped),
+                extra={"engine": self.name},
+            )
+            sync_mappings_skipped_total.labels(engine=self.name).inc(len(skipped))
+
+        now = monotonic()
+        for group_name, outcome in results.items():
+            if outcome["status"] in ("updated", "unchanged"):
+                self._last_success[group_name] = now
+            if self.schedule is not None:
+                changes = outcome["adds"] + outcome["deletes"]
+                self.schedule.record(group_name, outcome["status"], changes, durations.get(group_name, 0.0), now)
+        return results
+
+    def _fetch_mapping(self, job: _MappingJob, groups_by_id: Dict[str, GroupRecord]) -> bool:
+        """Find a mapping's target group and read its LDAP members into ``job``.
+
+        Returns False when the mapping cannot be synced this round.
+        """
+        mapping = job.mapping
+        logger.debug("Processing mapping: %s -> %s", mapping.ldap_group_dn, mapping.target_group_name)
+        group_id = self.group_name_to_id.get(mapping.target_group_name)
+        if not group_id:
+            logger.error(
+                "Group '%s' not found in OpenWebUI. Available groups: %s",
+                mapping.target_group_name,
+                capped(self.group_name_to_id),
+            )
+            sync_errors_total.labels(target="owui", kind="missing_group").inc()
+            return False
+
+        group = groups_by_id.get(group_id)
+        if not group:
+            logger.error("Group object not found for group_id: %s, target_group: %s", group_id, mapping.target_group_name)
+            sync_errors_total.labels(target="owui", kind="missing_group").inc()
+            return False
+
+        with time_phase(self.name, job.name, "ldap_fetch"):
             try:
-                all_groups = self.adapter.list_groups()
-                logger.info(f"Found {len(all_groups)} groups: {[g['name'] for g in all_groups]}")
+                job.ldap_emails = collect_members(
+                    self.directory.get_group_members(mapping.ldap_group_dn), self.spill_threshold, self.spill_dir
+                )
+                self.warmup["directory"] = "done"
+                members = job.ldap_emails
+                logger.debug(
+                    "LDAP group '%s' has members: %s",
+                    mapping.ldap_group_dn,
+                    capped(members if isinstance(members, list) else (), count=len(members)),
+                )
             except Exception as e:
-                logger.error(f"Failed to list groups: {e}")
-                raise
-            
-            logger.info(f"Group name to ID mapping: {self.group_name_to_id}")
-            logger.info(f"Available group names: {list(self.group_name_to_id.keys())}")
-            logger.info(f"Target group names from mappings: {[m.target_group_name for m in self.mappings]}")
-            
-            for mapping in self.mappings:
-                logger.info(f"Processing mapping: {mapping.ldap_group_dn} -> {mapping.target_group_name}")
-                group_id = self.group_name_to_id.get(mapping.target_group_name)
-                logger.info(f"Found group_id: {group_id} for group: {mapping.target_group_name}")
-                if not group_id:
-                    logger.error(f"Group '{mapping.target_group_name}' not found in OpenWebUI. Available groups: {list(self.group_name_to_id.keys())}")
-                    sync_errors_total.labels(target="owui", kind="missing_group").inc()
-                    continue
-                
-                # Find the group and get its user_ids
-                group = next((g for g in all_groups if g["id"] == group_id), None)
-                if not group:
-                    logger.error(f"Group object not found for group_id: {group_id}, target_group: {mapping.target_group_name}")
-                    sync_errors_total.labels(target="owui", kind="missing_group").inc()
-                    continue
-                
-                # Get user IDs in the group and map them to emails
-                group_user_ids = group.get("user_ids", [])
-                logger.info(f"Group '{mapping.target_group_name}' currently has user_ids: {group_user_ids}")
-                
-                target_emails = {u["email"] for u in self.adapter.list_users() if u["id"] in group_user_ids}
-                email_to_id = {u["email"]: u["id"] for u in self.adapter.list_users() if u["id"] in group_user_ids}
-                logger.info(f"Current users in group '{mapping.target_group_name}': {target_emails}")
-                
-                try:
-                    ldap_emails = self.directory.get_group_members(mapping.ldap_group_dn)
-                    logger.info(f"LDAP group '{mapping.ldap_group_dn}' has members: {ldap_emails}")
-                except Exception as e:
-                    logger.error(f"Failed to get LDAP group members for '{mapping.ldap_group_dn}': {e}")
-                    continue
-                
-                adds, deletes = diff_members(ldap_emails, target_emails)
-                logger.info(f"Sync plan for '{mapping.target_group_name}': add {adds}, remove {deletes}")
-                
-                if adds or deletes:
-                    # Calculate the desired user IDs for the group
-                    desired_user_ids = []
-                    for email in ldap_emails:
-                        user_id = all_users.get(email)
-                        if user_id:
-                            desired_user_ids.append(user_id)
-                        else:
-                            logger.info(f"User {email} not found in OpenWebUI, skipping")
-                    
-                    logger.info(f"Updating group '{mapping.target_group_name}' to have users: {desired_user_ids}")
-                    try:
-                        # Update the entire group with the correct user list
-                        self.adapter.update_group_users(
-                            group_id=group_id, 
-                            user_ids=desired_user_ids,
-                            group_name=mapping.target_group_name,
-                            group_description=group.get("description", "")
-                        )
-                        
-                        # Update metrics
-                        if adds:
-                            owui_add_total.inc(len(adds))
-                            logger.info(f"Successfully added {len(adds)} users to group {mapping.target_group_name}")
-                        if deletes:
-                            owui_delete_total.inc(len(deletes))
-                            logger.info(f"Successfully removed {len(deletes)} users from group {mapping.target_group_name}")
-                            
-                    except Exception as e:
-                        logger.error(f"Failed to update group {mapping.target_group_name}: {e}")
+                logger.error("Failed to get LDAP group members for '%s': %s", mapping.ldap_group_dn, e)
+                return False
+        job.group_id, job.group = group_id, group
+        return True
+
+    def _diff_mappings(self, jobs: List[_MappingJob]) -> List[_MappingJob]:
+        """Compute each job's ``adds``/``deletes``; returns the jobs whose group changed.
+
+        In-memory member lists are diffed in one bulk pass; oversized groups
+        are merge-joined from their sorted runs on disk. Pending members
+        cannot be added yet, so they are not in ``desired``.
+        """
+        changed: List[_MappingJob] = []
+        in_memory: Dict[int, Tuple[array, array]] = {}
+        for index, job in enumerate(jobs):
+            if isinstance(job.desired, SpilledIdents) or isinstance(job.group.members, SpilledIdents):
+                with time_phase(self.name, job.name, "diff"):
+                    # The delta is kept for delta write plans; it is small next to the group
+                    delta = (array("I"), array("I"))
+                    for ident, is_add in merge_diff(job.desired, job.group.members):
+                        delta[is_add].append(ident)
+                job.deletes, job.adds = delta
+                if job.adds or job.deletes:
+                    changed.append(job)
+            else:
+                in_memory[index] = (job.desired, job.group.members)
+        if in_memory:
+            with time_phase(self.name, ALL_MAPPINGS, "diff"):
+                deltas = bulk_diff(in_memory)
+            for index, (adds, deletes) in deltas.items():
+                jobs[index].adds, jobs[index].deletes = adds, deletes
+                changed.append(jobs[index])
+
+        identities = self.adapter.identities
+        for job in changed:
+            logger.info(
+                "Sync plan for '%s': add %s, remove %s%s",
+                job.name,
+                capped(map(identities.emails.__getitem__, job.adds), count=len(job.adds)),
+                capped(map(identities.emails.__getitem__, job.deletes), count=len(job.deletes)),
+                " (spilled to disk)" if isinstance(job.desired, SpilledIdents) else "",
+                extra={"engine": self.name, "mapping": job.name, "adds": len(job.adds), "deletes": len(job.deletes)},
+            )
+        return changed
+
+    def _write_group(
+        self,
+        group_id: str,
+        group: GroupRecord,
+        group_name: str,
+        desired: array | SpilledIdents,
+        adds: array,
+        deletes: array,
+    ) -> bool:
+        """Bring the target group to ``desired``; returns False on failure.
+
+        Uses the cheapest write plan the adapter supports: the whole member
+        list, or only ``adds`` and ``deletes``. Spilled member lists are
+        streamed to the adapter rather than built as a list.
+        """
+        plan = plan_write(self.adapter.capabilities, len(group.members), len(adds), len(deletes), group.unknown)
+        if plan is None:
+            logger.error("Adapter cannot apply changes to group %s: %s", group_name, sorted(self.adapter.capabilities))
+            return False
+        sync_write_plans_total.labels(engine=self.name, plan="+".join(plan)).inc()
+        target_ids = self.adapter.identities.target_ids
+        try:
+            with time_phase(self.name, group_name, "write"):
+                if plan == (SET_MEMBERS,):
+                    # Desired members are bound idents; the check only narrows the type
+                    bound = (user_id for ident in desired if (user_id := target_ids[ident]) is not None)
+                    if isinstance(desired, SpilledIdents):
+                        desired_user_ids: Iterable[str] = bound
+                    else:
+                        desired_user_ids = list(bound)
+                        logger.debug("Updating group '%s' to have %d users", group_name, len(desired_user_ids))
+                    self.adapter.update_group_users(
+                        group_id=group_id,
+                        user_ids=desired_user_ids,
+                        group_name=group_name,
+                        group_description=group.description,
+                    )
                 else:
-                    logger.info(f"No changes needed for group '{mapping.target_group_name}'")
-            duration = perf_counter() - start
-            sync_iteration_seconds.observe(duration)
-            logger.info(f"Sync iteration completed in {duration:.2f} seconds")
+                    self._write_delta(group_id, plan, [target_ids[i] for i in adds], [target_ids[i] for i in deletes])
+            if group.members is not desired:
+                _close(group.members)
+            group.members = desired
+            if plan == (SET_MEMBERS,):
+                group.unknown = 0
+
+            # Update metrics
+            if adds:
+                owui_add_total.inc(len(adds))
+                logger.info("Successfully added %d users to group %s", len(adds), group_name)
+            if deletes:
+                owui_delete_total.inc(len(deletes))
+                logger.info("Successfully removed %d users from group %s", len(deletes), group_name)
+            return True
+
+        except Exception as e:
+            logger.error("Failed to update group %s: %s", group_name, e)
+            return False
+
+    def _write_delta(self, group_id: str, plan: Tuple[str, ...], add_ids: List[str], remove_ids: List[str]) -> None:
+        """Apply a delta plan: adds first, then removals, bulk or one member at a time."""
+        if add_ids:
+            if ADD_MEMBERS in plan:
+                self.adapter.add_group_members(group_id, add_ids)
+            else:
+                for user_id in add_ids:
+                    self.adapter.add_user_to_group(group_id, user_id)
+        if remove_ids:
+            if REMOVE_MEMBERS in plan:
+                self.adapter.remove_group_members(group_id, remove_ids)
+            else:
+                for user_id in remove_ids:
+                    self.adapter.remove_user_from_group(group_id, user_id)
+
+    def _resolve_members(self, group_name: str, ldap_emails: Iterable[str]) -> array | SpilledIdents:
+        """Map LDAP member emails to idents with a target account, tracking the ones still pending.
+
+        Members already known to be missing are not looked up again until the
+        target users change. With a resolver, members without a target id
+        that were not pending yet are looked up together once the group is
+        read; pending ones are left to :meth:`sync_new_users`. Returns the
+        sorted idents of resolvable members, spilled to disk when the group
+        reaches ``spill_threshold``.
+        """
+        identities = self.adapter.identities
+        users_version = self.adapter.users_version
+        was_pending = set(self.pending.emails_for(group_name))
+        known_missing: Set[str] = set()
+        if self.pending.is_fresh(group_name, users_version):
+            known_missing = was_pending
+        still_pending: Set[str] = set()
+        desired: Set[int] | SpilledIdents = set()
+        if self.spill_threshold and isinstance(ldap_emails, Sized) and len(ldap_emails) >= self.spill_threshold:
+            logger.info("Group '%s' has %d members, diffing on disk", group_name, len(ldap_emails))
+            desired = SpilledIdents(directory=self.spill_dir)
+        newly_pending = 0
+        misses: List[str] = []
+        for email in ldap_emails:
+            if email in was_pending:
+                still_pending.add(email)
+            if email in known_missing:
+                continue
+            # Emails without an account are not interned; the pending registry keeps them
+            ident = identities.lookup(email)
+            bound = ident is not None and identities.target_ids[ident] is not None
+            if not bound and self.resolver is not None and email not in was_pending:
+                misses.append(email)
+            else:
+                newly_pending += self._place_member(group_name, email, ident, desired)
+        if misses and self.resolver is not None:
+            self.resolver.resolve(misses)
+            users_version = self.adapter.users_version
+            for email in misses:
+                newly_pending += self._place_member(group_name, email, identities.lookup(email), desired)
+        # Members that left the LDAP group are no longer waited for
+        for email in was_pending - still_pending:
+            self.pending.resolve(email, group_name)
+        self.pending.mark_checked(group_name, users_version)
+        pending_users.labels(engine=self.name).set(len(self.pending))
+        if known_missing or newly_pending:
+            logger.info(
+                "%d members of '%s' are pending in OpenWebUI (%d new)",
+                len(self.pending.emails_for(group_name)),
+                group_name,
+                newly_pending,
+            )
+        if isinstance(desired, SpilledIdents):
+            return desired.finish()
+        return array("I", sorted(desired))
+
+    def _place_member(
+        self, group_name: str, email: str, ident: int | None, desired: Set[int] | SpilledIdents
+    ) -> bool:
+        """Add a resolvable member to ``desired`` or mark it pending; True if newly pending."""
+        if ident is not None and self.adapter.identities.target_ids[ident] is not None:
+            desired.add(ident)
+            self.pending.resolve(email, group_name)
+            return False
+        if not self.pending.add(email, group_name):
+            return False
+        logger.info(
+            "User %s not found in OpenWebUI, skipping",
+            email,
+            extra={"sample_key": "user_not_found"},
+        )
+        return True
+
+
+class _MappingJob:
+    """A mapping's state as it moves through the sync pipeline."""
+
+    __slots__ = ("mapping", "name", "group_id", "group", "ldap_emails", "desired", "adds", "deletes")
+
+    # Set by the fetch stage, before any later stage sees the job
+    group_id: str
+    group: GroupRecord
+
+    def __init__(self, mapping: GroupMapping) -> None:
+        self.mapping = mapping
+        self.name = mapping.target_group_name
+        self.ldap_emails: Iterable[str] = ()
+        self.desired: array | SpilledIdents = array("I")
+        self.adds = array("I")
+        self.deletes = array("I")
+
+
+def _close(desired: array | SpilledIdents) -> None:
+    if isinstance(desired, SpilledIdents):
+        desired.close()
+
 
-        _run()
+def _outcome(status: str, adds: int = 0, deletes: int = 0) -> Dict[str, Any]:
+    return {"status": status, "adds": adds, "deletes": deletes}
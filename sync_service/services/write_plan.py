@@ -0,0 +1,54 @@
+"""Choosing how to write a group's new member list.
+
+A plan is either one ``set_members`` call with the complete list, or a
+delta of add and remove operations, bulk or one member per call. Plans are
+priced in ids sent plus ``REQUEST_COST`` per request, and the cheapest one
+the adapter supports wins; ties go to ``set_members``, which also corrects
+any drift the engine does not know about, and bulk operations win ties with
+per-member ones. Groups holding member ids the
+engine cannot resolve always get ``set_members`` when it is supported, since
+a delta cannot remove them.
+"""
+
+from __future__ import annotations
+
+from typing import Collection, List, Tuple
+
+from ..adapters.base import ADD_MEMBER, ADD_MEMBERS, REMOVE_MEMBER, REMOVE_MEMBERS, REQUEST_COST, SET_MEMBERS
+
+
+def plan_write(
+    capabilities: Collection[str], current: int, adds: int, deletes: int, unknown: int = 0
+) -> Tuple[str, ...] | None:
+    """Return the operations of the cheapest plan, or None if none is supported.
+
+    ``current`` is the group's member count before the change and
+    ``unknown`` the number of member ids that did not resolve to a user. A
+    delta plan lists the add operation first and only includes sides with
+    changes.
+    """
+    options: List[Tuple[int, int, Tuple[str, ...]]] = []
+    if SET_MEMBERS in capabilities:
+        if unknown:
+            return (SET_MEMBERS,)
+        options.append((REQUEST_COST + current + adds - deletes, 0, (SET_MEMBERS,)))
+
+    cost = 0
+    delta: List[str] = []
+    for count, bulk, single in ((adds, ADD_MEMBERS, ADD_MEMBER), (deletes, REMOVE_MEMBERS, REMOVE_MEMBER)):
+        if not count:
+            continue
+        choices = []
+        if bulk in capabilities:
+            choices.append((REQUEST_COST + count, 0, bulk))
+        if single in capabilities:
+            choices.append(((REQUEST_COST + 1) * count, 1, single))
+        if not choices:
+            break
+        side_cost, _, operation = min(choices)
+        cost += side_cost
+        delta.append(operation)
+    else:
+        if delta:
+            options.append((cost, 1, tuple(delta)))
+    return min(options)[2] if options else None
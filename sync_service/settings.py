@@ -18,6 +18,8 @@ class ServiceConfig(BaseModel):
     path_templates: dict | None = None
     group_mappings: list[dict]
     sync: dict | None = None
+    mock: dict | None = None
+    litellm: dict | None = None
 
 
 class AppConfig(BaseModel):
@@ -26,6 +28,9 @@ class AppConfig(BaseModel):
     ldap: dict
     services: list[ServiceConfig]
     sync: dict | None = None
+    tracing: dict | None = None
+    reload: dict | None = None
+    sharding: dict | None = None
 
 
 def load_config(path: Path) -> AppConfig:
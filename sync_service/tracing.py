@@ -0,0 +1,340 @@
+"""Lightweight in-process tracing of sync iterations.
+
+A span keeps at most ``max_children`` children. Further operations of the
+same name, such as one LDAP lookup per group member, are folded into one
+summary child carrying their count and total duration. Traces are exported
+from a background thread, several per request, so a slow collector never
+delays an iteration.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any, Deque, Dict, Iterator, List, Sequence
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+DEFAULT_MAX_CHILDREN = 50
+
+# Guards children and summary spans, which pipeline workers update concurrently
+_children_lock = threading.Lock()
+
+
+class Span:
+    """A timed operation within an iteration trace."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+        "children",
+        "max_children",
+        "summaries",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        attributes: Dict[str, Any],
+        max_children: int = DEFAULT_MAX_CHILDREN,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.attributes = attributes
+        self.error: str | None = None
+        self.children: List[Span] = []
+        self.max_children = max_children
+        # Summary child per name, once children reached max_children
+        self.summaries: Dict[str, Span] | None = None
+
+    def adopt(self, span: "Span") -> bool:
+        """Keep ``span`` as a child unless there are ``max_children`` already."""
+        with _children_lock:
+            if len(self.children) >= self.max_children:
+                return False
+            self.children.append(span)
+            return True
+
+    def summarize(self, span: "Span") -> None:
+        """Fold a finished child that was not kept into the summary span for its name."""
+        with _children_lock:
+            if self.summaries is None:
+                self.summaries = {}
+            summary = self.summaries.get(span.name)
+            if summary is None:
+                summary = Span(span.name, self.trace_id, self.span_id, {"aggregated": 0, "errors": 0})
+                summary.start_ns = span.start_ns
+                summary.end_ns = span.end_ns
+                self.summaries[span.name] = summary
+                self.children.append(summary)
+            attributes = summary.attributes
+            attributes["aggregated"] += 1
+            attributes["busy_seconds"] = round(attributes.get("busy_seconds", 0.0) + span.duration_seconds, 6)
+            summary.start_ns = min(summary.start_ns, span.start_ns)
+            summary.end_ns = max(summary.end_ns or 0, span.end_ns or 0)
+            if span.error:
+                attributes["errors"] += 1
+                summary.error = span.error
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    def walk(self) -> Iterator["Span"]:
+        """Yield this span and all descendants depth first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span tree as plain data for the debug endpoint."""
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "start": self.start_ns / 1e9,
+            "duration_seconds": round(self.duration_seconds, 6),
+            "attributes": self.attributes,
+            "error": self.error,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+@contextmanager
+def start_span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """Record a child span of the active span; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(name, parent.trace_id, parent.span_id, attributes, parent.max_children)
+    kept = parent.adopt(span)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if not kept:
+            parent.summarize(span)
+
+
+class OTLPJsonFileExporter:
+    """Append traces as OTLP/JSON export requests, one per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, separators=(",", ":"))
+        with self._lock, self.path.open("a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+
+
+class OTLPHttpExporter:
+    """POST traces as OTLP/JSON to a collector's ``/v1/traces`` endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 2.0) -> None:
+        self.endpoint = endpoint
+        self.client = httpx.Client(timeout=timeout)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        resp = self.client.post(self.endpoint, json=payload)
+        resp.raise_for_status()
+
+
+class BatchExporter:
+    """Exports finished traces from a background thread, up to ``max_batch`` per request.
+
+    At most ``max_queue`` traces wait for export; newer ones are dropped
+    while the exporter is behind.
+    """
+
+    def __init__(
+        self,
+        exporter: OTLPJsonFileExporter | OTLPHttpExporter,
+        service_name: str,
+        engine: str,
+        max_batch: int = 32,
+        max_queue: int = 256,
+    ) -> None:
+        self.exporter = exporter
+        self.service_name = service_name
+        self.engine = engine
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Span | None]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name=f"{engine}-trace-export", daemon=True)
+        self._thread.start()
+
+    def submit(self, root: Span) -> None:
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            logger.warning("Trace export queue full for engine %s, dropping a trace", self.engine)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Export what is queued and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            root = self._queue.get()
+            if root is None:
+                break
+            batch = [root]
+            while len(batch) < self.max_batch:
+                try:
+                    root = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if root is None:
+                    stopping = True
+                    break
+                batch.append(root)
+            try:
+                self.exporter.export(to_otlp(batch, self.service_name))
+            except Exception as exc:
+                logger.warning("Failed to export %d traces for engine %s: %s", len(batch), self.engine, exc)
+
+
+def to_otlp(roots: Span | Sequence[Span], service_name: str) -> Dict[str, Any]:
+    """Encode span trees as one OTLP/JSON ``ExportTraceServiceRequest``."""
+    if isinstance(roots, Span):
+        roots = [roots]
+    spans = []
+    for span in (span for root in roots for span in root.walk()):
+        encoded: Dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in span.attributes.items()],
+            "status": (
+                {"code": STATUS_ERROR, "message": span.error}
+                if span.error
+                else {"code": STATUS_OK}
+            ),
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        spans.append(encoded)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{"scope": {"name": "sync_service"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    encoded: Dict[str, Any]
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Tracer:
+    """Keeps span trees of the most recent iterations of one engine."""
+
+    def __init__(
+        self,
+        engine: str,
+        buffer_size: int = 20,
+        exporter: OTLPJsonFileExporter | OTLPHttpExporter | None = None,
+        service_name: str = "ldap-groups-sync",
+        max_children: int = DEFAULT_MAX_CHILDREN,
+    ) -> None:
+        self.engine = engine
+        self.exporter = exporter
+        self.service_name = service_name
+        self.max_children = max_children
+        self.recent: Deque[Span] = deque(maxlen=buffer_size)
+        self._batches = BatchExporter(exporter, service_name, engine) if exporter is not None else None
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Start a new trace rooted at ``name``; it is buffered and exported on exit."""
+        root = Span(name, os.urandom(16).hex(), None, {"engine": self.engine, **attributes}, self.max_children)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as exc:
+            root.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            root.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self.recent.append(root)
+            if self._batches is not None:
+                self._batches.submit(root)
+
+    def close(self) -> None:
+        """Export the traces still queued and stop the export thread."""
+        if self._batches is not None:
+            self._batches.close()
+
+    def recent_traces(self) -> List[Dict[str, Any]]:
+        """Return buffered traces, newest first."""
+        return [root.to_dict() for root in reversed(self.recent)]
+
+
+def create_tracer(engine: str, cfg: Dict[str, Any] | None) -> Tracer:
+    """Create a tracer from the app-level ``tracing`` config block."""
+    cfg = cfg or {}
+    otlp = cfg.get("otlp") or {}
+    exporter: OTLPJsonFileExporter | OTLPHttpExporter | None = None
+    if otlp.get("file"):
+        exporter = OTLPJsonFileExporter(otlp["file"])
+    elif otlp.get("endpoint"):
+        exporter = OTLPHttpExporter(otlp["endpoint"], timeout=otlp.get("timeout_seconds", 2.0))
+    return Tracer(
+        engine,
+        buffer_size=cfg.get("buffer_size", 20),
+        exporter=exporter,
+        service_name=cfg.get("service_name", "ldap-groups-sync"),
+        max_children=cfg.get("max_children_per_span", DEFAULT_MAX_CHILDREN),
+    )
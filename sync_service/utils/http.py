@@ -1,10 +1,207 @@
-"""HTTP client helpers."""
+"""HTTP client helpers.
+
+Adapters get their connections from a process-wide registry of
+``httpx.Client`` pools keyed by origin and pool settings, so engines that
+talk to the same host share keep-alive connections. Per-service headers and
+timeouts are applied per request by :class:`ServiceClient`.
+"""
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+import importlib.util
+import logging
+import os
+import threading
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
+
 import httpx
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool options from a service's ``http:`` block."""
+
+    verify: bool = True
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 5.0
+
+    @classmethod
+    def from_config(cls, http_cfg: Dict[str, Any] | None) -> "PoolSettings":
+        cfg = http_cfg or {}
+        return cls(
+            verify=cfg.get("verify_tls", False),
+            http2=cfg.get("http2", False),
+            max_connections=cfg.get("max_connections", 100),
+            max_keepalive_connections=cfg.get("max_keepalive_connections", 20),
+            keepalive_expiry=cfg.get("keepalive_expiry_seconds", 5.0),
+        )
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(settings: PoolSettings = PoolSettings(), timeout: float = 10.0) -> httpx.Client:
+    """Create an httpx.Client with the given pool settings.
+
+    HTTP/2 needs the optional ``h2`` package; without it the client falls
+    back to HTTP/1.1 with a warning.
+    """
+    http2 = settings.http2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        http2 = False
+    return httpx.Client(
+        timeout=timeout,
+        verify=settings.verify,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+    )
+
+
+def origin(base_url: str) -> str:
+    """``scheme://host[:port]`` of a URL."""
+    parts = urlsplit(base_url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class ClientRegistry:
+    """Shared, reference-counted clients keyed by (origin, pool settings)."""
+
+    def __init__(self, factory: Callable[[PoolSettings], httpx.Client] = create_http_client) -> None:
+        self.factory = factory
+        self._clients: Dict[Tuple[str, PoolSettings], httpx.Client] = {}
+        self._refs: Dict[Tuple[str, PoolSettings], int] = {}
+        # Metric label per pool: the origin, numbered when one origin has several pools
+        self._names: Dict[Tuple[str, PoolSettings], str] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, base_url: str, settings: PoolSettings) -> Tuple[Tuple[str, PoolSettings], httpx.Client]:
+        key = (origin(base_url), settings)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self.factory(settings)
+                self._names[key] = self._unique_name(key[0])
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key, client
+
+    def release(self, key: Tuple[str, PoolSettings]) -> None:
+        """Drop a reference; the pool is closed when nobody uses it."""
+        with self._lock:
+            self._refs[key] -= 1
+            if self._refs[key] > 0:
+                return
+            del self._refs[key]
+            del self._names[key]
+            client = self._clients.pop(key)
+        client.close()
+
+    def _unique_name(self, pool_origin: str) -> str:
+        taken = set(self._names.values())
+        name, n = pool_origin, 1
+        while name in taken:
+            n += 1
+            name = f"{pool_origin}#{n}"
+        return name
+
+    def items(self) -> Iterator[Tuple[str, PoolSettings, httpx.Client]]:
+        """``(name, settings, client)`` for every pool."""
+        with self._lock:
+            return iter([(self._names[key], key[1], client) for key, client in self._clients.items()])
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+http_clients = ClientRegistry()
+
+
+class ServiceClient:
+    """A service's view of a shared client: adds its headers and timeout to every request."""
+
+    def __init__(
+        self,
+        base_url: str,
+        settings: PoolSettings,
+        headers: Dict[str, str] | None = None,
+        timeout: float = 10.0,
+        registry: ClientRegistry = http_clients,
+    ) -> None:
+        self.headers = headers or {}
+        self.timeout = timeout
+        self._registry = registry
+        self._key, client = registry.acquire(base_url, settings)
+        self._client: httpx.Client | None = client
+
+    def _shared(self) -> httpx.Client:
+        if self._client is None:
+            raise RuntimeError("ServiceClient is closed")
+        return self._client
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        headers = {**self.headers, **(kwargs.pop("headers", None) or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        return self._shared().request(method, url, headers=headers, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs: Any) -> ContextManager[httpx.Response]:
+        """Like :meth:`request`, but the body is read lazily inside the ``with`` block."""
+        headers = {**self.headers, **(kwargs.pop("headers", None) or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        return self._shared().stream(method, url, headers=headers, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._registry.release(self._key)
+            self._client = None
+
+
+class PoolCollector(Collector):
+    """Reports connection pool utilization of the shared clients at scrape time.
+
+    With ``per_process``, samples carry a ``pid`` label, since pools belong
+    to the process serving the scrape.
+    """
 
+    def __init__(self, registry: ClientRegistry = http_clients, per_process: bool = False) -> None:
+        self.registry = registry
+        self.per_process = per_process
 
-def create_http_client(timeout: float = 10.0, verify: bool = True) -> httpx.Client:
-    """Create a configured httpx.Client."""
-    return httpx.Client(timeout=timeout, verify=verify)
+    def collect(self) -> Iterable[Metric]:
+        process = [str(os.getpid())] if self.per_process else []
+        extra = ["pid"] if self.per_process else []
+        connections = GaugeMetricFamily(
+            "http_pool_connections", "Pooled connections by state", labels=["pool", "state", *extra]
+        )
+        limit = GaugeMetricFamily("http_pool_max_connections", "Connection limit of a pool", labels=["pool", *extra])
+        for name, settings, client in self.registry.items():
+            # httpx does not expose pool statistics; read them from the httpcore pool
+            pool = getattr(client._transport, "_pool", None)
+            conns = list(getattr(pool, "connections", ()))
+            idle = sum(1 for c in conns if c.is_idle())
+            connections.add_metric([name, "active", *process], len(conns) - idle)
+            connections.add_metric([name, "idle", *process], idle)
+            limit.add_metric([name, *process], settings.max_connections)
+        yield connections
+        yield limit
@@ -0,0 +1,127 @@
+"""JSON helpers for large API payloads.
+
+``iter_array_items`` yields the elements of a JSON array, either the whole
+document or the value of one key of the top-level object, from an iterable
+of byte chunks. A listing can then be indexed while it downloads instead of
+being parsed into one document first. ``loads``/``dumps`` use orjson when it
+is installed and the standard library otherwise.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None  # type: ignore[assignment]
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+_decoder = json.JSONDecoder()
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+class _Reader:
+    """Text buffer over byte chunks that only keeps the unparsed tail."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk; returns False once the input is exhausted."""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.text = self.text[self.pos :] + text
+                self.pos = 0
+                return True
+        self.text = self.text[self.pos :] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or ``""`` at the end of input."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value: retry with the next chunk, fail at the end of input
+                if not self.fill():
+                    raise
+                continue
+            # A number running up to the end of the buffer may continue in the next chunk
+            if isinstance(obj, (int, float)) and not self.eof:
+                tail = end
+                while tail < len(self.text) and self.text[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(self.text) and self.fill():
+                    continue
+            self.pos = end
+            return obj
+
+
+def iter_array_items(chunks: Iterable[bytes], key: str | None = None) -> Iterator[Any]:
+    """Yield the elements of a JSON array as its bytes arrive.
+
+    With ``key`` the document may also be an object holding the array under
+    that key; other keys before it are parsed and skipped. Only one element
+    (plus a chunk of input) is held in memory at a time.
+    """
+    reader = _Reader(chunks)
+    if key is not None and reader.peek() == "{":
+        reader.pos += 1
+        while True:
+            if reader.peek() == "}":
+                raise ValueError(f"JSON object has no {key!r} key")
+            name = reader.value()
+            reader.expect(":")
+            if name == key:
+                break
+            reader.value()
+            if reader.peek() == ",":
+                reader.pos += 1
+    reader.expect("[")
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        if reader.peek() == "]":
+            return
+        reader.expect(",")
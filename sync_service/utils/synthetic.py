@@ -0,0 +1,129 @@
+"""Deterministic synthetic directory and target datasets for load testing."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+BASE_DN = "dc=example,dc=com"
+BASE_TIMESTAMP = 1_700_000_000
+
+
+@dataclass
+class SyntheticDataset:
+    """Matching LDAP and OpenWebUI state for ``users`` people and ``groups`` groups.
+
+    ``target_users``/``target_groups`` use the OpenWebUI API shape;
+    ``ldap_groups`` maps each group DN to its member DNs.
+    """
+
+    directory_users: Dict[str, str] = field(default_factory=dict)
+    ldap_groups: Dict[str, List[str]] = field(default_factory=dict)
+    target_users: List[Dict[str, Any]] = field(default_factory=list)
+    target_groups: List[Dict[str, Any]] = field(default_factory=list)
+    mappings: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def membership_count(self) -> int:
+        return sum(len(members) for members in self.ldap_groups.values())
+
+
+def user_dn(index: int) -> str:
+    return f"cn=user{index:07d},ou=users,{BASE_DN}"
+
+
+def user_email(index: int) -> str:
+    return f"user{index:07d}@example.com"
+
+
+def group_dn(index: int) -> str:
+    return f"cn=group{index:05d},ou=groups,{BASE_DN}"
+
+
+def group_name(index: int) -> str:
+    return f"Group {index:05d}"
+
+
+def generate_dataset(
+    users: int = 1000,
+    groups: int = 10,
+    group_size: int = 100,
+    missing_ratio: float = 0.0,
+    seed: int = 0,
+) -> SyntheticDataset:
+    """Generate a directory and an already-synced target.
+
+    ``missing_ratio`` of directory users get no target account, so they show
+    up as pending members.
+    """
+    rng = random.Random(seed)
+    group_size = min(group_size, users)
+    dataset = SyntheticDataset()
+    target_id_by_index: Dict[int, str] = {}
+    for i in range(users):
+        dataset.directory_users[user_dn(i)] = user_email(i)
+        if rng.random() >= missing_ratio:
+            user_id = f"{rng.getrandbits(128):032x}"
+            target_id_by_index[i] = user_id
+            dataset.target_users.append(
+                {
+                    "id": user_id,
+                    "email": user_email(i),
+                    "name": f"User {i}",
+                    "role": "user",
+                    "created_at": BASE_TIMESTAMP + i,
+                    "updated_at": BASE_TIMESTAMP + i,
+                }
+            )
+    for j in range(groups):
+        members = rng.sample(range(users), group_size)
+        dataset.ldap_groups[group_dn(j)] = [user_dn(i) for i in members]
+        dataset.target_groups.append(
+            {
+                "id": f"{rng.getrandbits(128):032x}",
+                "name": group_name(j),
+                "description": f"Synthetic group {j}",
+                "user_ids": [target_id_by_index[i] for i in members if i in target_id_by_index],
+            }
+        )
+        dataset.mappings.append({"ldap_group_dn": group_dn(j), "target_group_name": group_name(j)})
+    return dataset
+
+
+def apply_churn(dataset: SyntheticDataset, churn: float, seed: int = 0) -> int:
+    """Swap ``churn`` of each LDAP group's members for non-members.
+
+    Returns the number of memberships changed (adds plus removes).
+    """
+    rng = random.Random(seed)
+    all_dns = list(dataset.directory_users)
+    changed = 0
+    for dn, members in dataset.ldap_groups.items():
+        swaps = int(len(members) * churn)
+        if not swaps:
+            continue
+        current = set(members)
+        outside = [u for u in rng.sample(all_dns, min(len(all_dns), swaps * 4)) if u not in current]
+        for position, new_member in zip(rng.sample(range(len(members)), swaps), outside):
+            members[position] = new_member
+            changed += 2
+    return changed
+
+
+def write_ldif(dataset: SyntheticDataset, path: Path) -> None:
+    """Write the directory side as LDIF loadable into OpenLDAP (see ``ldif/``)."""
+    with path.open("w", encoding="utf-8") as fh:
+        fh.write("# Synthetic LDIF generated by sync_service.utils.synthetic\n\n")
+        for dn, email in dataset.directory_users.items():
+            cn = dn.split(",", 1)[0][3:]
+            fh.write(
+                f"dn: {dn}\ncn: {cn}\nsn: {cn}\nobjectClass: inetOrgPerson\nmail: {email}\n\n"
+            )
+        for dn, members in dataset.ldap_groups.items():
+            cn = dn.split(",", 1)[0][3:]
+            fh.write(f"dn: {dn}\ncn: {cn}\nobjectClass: groupOfNames\n")
+            for member in members:
+                fh.write(f"member: {member}\n")
+            fh.write("\n")
@@ -0,0 +1,74 @@
+"""In-memory stand-ins for the LDAP directory and an OpenWebUI target, shared by the tests."""
+
+from typing import Any, Dict, Iterable, List
+
+from sync_service.adapters.base import DirectoryProvider
+from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
+
+
+class FakeDirectory(DirectoryProvider):
+    """Every group has ``members``; reading a DN in ``broken`` fails."""
+
+    def __init__(self, members: Iterable[str] = (), broken: Iterable[str] = ()) -> None:
+        self.members = set(members)
+        self.broken = set(broken)
+
+    def get_group_members(self, group_dn: str) -> Iterable[str]:
+        if group_dn in self.broken:
+            raise RuntimeError("ldap down")
+        return set(self.members)
+
+
+class FakeAdapter(OpenWebUIAdapter):
+    """Target whose writes update ``groups`` and are recorded in ``added``/``removed``."""
+
+    def __init__(  # type: ignore[override]
+        self, groups: List[Dict[str, Any]] | None = None, users: List[Dict[str, Any]] | None = None
+    ) -> None:
+        super().__init__(base_url="http://fake", api_key="x")
+        self.groups = groups if groups is not None else [{"id": "1", "name": "grp"}]
+        self.users = users if users is not None else [
+            {"id": "10", "email": "b@example.com"},
+            {"id": "11", "email": "c@example.com"},
+            {"id": "12", "email": "a@example.com"},
+        ]
+        self.added: List[tuple[str, str]] = []
+        self.removed: List[tuple[str, str]] = []
+        self.listings = 0
+
+    def _group(self, group_id: str) -> Dict[str, Any]:
+        return next(g for g in self.groups if g["id"] == group_id)
+
+    def list_groups(self):  # type: ignore[override]
+        self.listings += 1
+        return self.groups
+
+    def list_users(self):  # type: ignore[override]
+        return self.users
+
+    def add_user_to_group(self, group_id: str, user_id: str) -> None:  # type: ignore[override]
+        self.add_group_members(group_id, [user_id])
+
+    def add_group_members(self, group_id: str, user_ids) -> None:  # type: ignore[override]
+        self.added.extend((group_id, u) for u in user_ids)
+        self._group(group_id).setdefault("user_ids", []).extend(user_ids)
+
+    def remove_user_from_group(self, group_id: str, user_id: str) -> None:  # type: ignore[override]
+        self.removed.append((group_id, user_id))
+        self._group(group_id)["user_ids"].remove(user_id)
+
+    def update_group_users(self, group_id, user_ids, group_name, group_description=""):  # type: ignore[override]
+        group = self._group(group_id)
+        user_ids = list(user_ids)
+        current = group.get("user_ids", [])
+        self.added.extend((group_id, u) for u in user_ids if u not in current)
+        self.removed.extend((group_id, u) for u in current if u not in user_ids)
+        group["user_ids"] = user_ids
+
+    def refresh_users(self):  # type: ignore[override]
+        changed = [u for u in self.users if u["id"] not in self.users_by_id]
+        for user in changed:
+            self._index_user(user)
+        if changed:
+            self.users_version += 1
+        return changed
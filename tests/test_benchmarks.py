@@ -0,0 +1,45 @@
+from benchmarks import diff_bulk, identity_memory, json_transfer
+from benchmarks.e2e_sync import BenchmarkParams, run_benchmark
+from sync_service.utils.synthetic import generate_dataset, write_ldif
+
+
+def test_e2e_benchmark_reports_requests_and_memory():
+    results = run_benchmark(
+        BenchmarkParams(users=60, groups=3, group_size=20, churn=0.1, iterations=2, directory="mock_sync")
+    )
+    steady = results["iterations"][1]
+    assert steady["target_requests"]["update_group"] == 3
+    # list_users + list_groups + 3 updates + per group: 1 group search and 20 member lookups
+    assert steady["external_calls"] == 1 + 1 + 3 + 3 * 21
+    assert results["summary"]["tracemalloc_peak_bytes"] > 0
+    assert results["summary"]["peak_rss_bytes"] > 0
+
+
+def test_generated_ldif_contains_every_group(tmp_path):
+    dataset = generate_dataset(users=10, groups=2, group_size=3)
+    path = tmp_path / "synthetic.ldif"
+    write_ldif(dataset, path)
+    text = path.read_text()
+    assert text.count("objectClass: groupOfNames") == 2
+    assert text.count("member: ") == 6
+
+
+def test_interned_membership_state_is_much_smaller():
+    results = identity_memory.run_benchmark(users=2000, groups=20, group_size=500)
+    assert results["memberships"] == 10000
+    assert results["retained_ratio"] > 4
+
+
+def test_diff_benchmark_covers_each_group_size():
+    results = diff_bulk.run_benchmark([10, 100], memberships=1000, churn=0.5, repeat=1)
+    assert [r["group_size"] for r in results["results"]] == [10, 100]
+    assert all(0 < r["changed_groups"] <= r["groups"] for r in results["results"])
+
+
+def test_json_transfer_benchmark_compresses_and_streams():
+    results = json_transfer.run_benchmark(users=10000)
+    baseline, fast = results["results"]["baseline"], results["results"]["fast"]
+    assert baseline["indexed_users"] == fast["indexed_users"] == 10000
+    assert results["listing_wire_ratio"] > 2
+    assert fast["update_wire_bytes"] < baseline["update_wire_bytes"]
+    assert fast["peak_bytes"] < baseline["peak_bytes"]
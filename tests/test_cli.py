@@ -0,0 +1,73 @@
+import json
+
+import pytest
+import yaml
+
+from fakes import FakeDirectory
+from sync_service import cli, logging_conf
+from sync_service.services.engine_manager import EngineManager
+
+
+@pytest.fixture(autouse=True)
+def _keep_test_logging(monkeypatch):
+    # The real setup installs a root queue handler whose listener writes to the
+    # stream captured by this test, long after it is closed
+    monkeypatch.setattr(logging_conf, "configure_logging", lambda: None)
+
+
+def _config(tmp_path, services):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        yaml.safe_dump(
+            {"version": 1, "identity": {"user_attribute": "mail"}, "ldap": {"url": "ldap://ldap"}, "services": services}
+        )
+    )
+    return str(path)
+
+
+def _service(name, mappings):
+    return {
+        "name": name,
+        "type": "mock",
+        "base_url": "mock://",
+        "auth": {"api_key": ""},
+        "group_mappings": [{"ldap_group_dn": dn, "target_group_name": group} for dn, group in mappings],
+        "sync": {"retries": 1},
+    }
+
+
+def _run(capsys, *argv):
+    code = cli.main(["sync", "--once", *argv])
+    return code, json.loads(capsys.readouterr().out)
+
+
+def test_sync_once_prints_summary_and_exit_code(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory(["demo@example.com"], broken=["cn=broken"]))
+    config = _config(
+        tmp_path,
+        [
+            _service("a", [("cn=one", "Mock Group 1"), ("cn=broken", "Mock Group 2")]),
+            _service("b", [("cn=one", "Mock Group 1")]),
+        ],
+    )
+
+    code, summary = _run(capsys, "--config", config, "--engine", "b")
+    assert code == cli.EXIT_OK
+    assert list(summary["engines"]) == ["b"]
+    assert summary["engines"]["b"]["mappings"]["Mock Group 1"] == {"status": "updated", "adds": 1, "deletes": 0}
+
+    code, summary = _run(capsys, "--config", config)
+    assert code == cli.EXIT_MAPPING_FAILED
+    assert summary["engines"]["a"]["status"] == "partial"
+    assert summary["engines"]["a"]["mappings"]["Mock Group 2"]["status"] == "failed"
+
+    code, summary = _run(capsys, "--config", config, "--mapping", "cn=one")
+    assert code == cli.EXIT_OK
+    assert all(list(e["mappings"]) == ["Mock Group 1"] for e in summary["engines"].values())
+
+
+def test_sync_once_rejects_unknown_engine(tmp_path, capsys):
+    config = _config(tmp_path, [_service("a", [])])
+    code, summary = _run(capsys, "--config", config, "--engine", "nope")
+    assert code == cli.EXIT_USAGE
+    assert "nope" in summary["error"]
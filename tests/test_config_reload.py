@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+
+import yaml
+
+from fakes import FakeDirectory
+from sync_service.metrics import registry
+from sync_service.services.config_watcher import ConfigWatcher
+from sync_service.services.engine_manager import EngineManager
+from sync_service.settings import load_config
+
+
+def _service(name, base_url="mock://", mappings=("Mock Group 1",), interval=60):
+    return {
+        "name": name,
+        "type": "mock",
+        "base_url": base_url,
+        "auth": {"api_key": ""},
+        "group_mappings": [{"ldap_group_dn": f"cn={m}", "target_group_name": m} for m in mappings],
+        "sync": {"interval_seconds": interval},
+    }
+
+
+def _write(path, services):
+    config = {
+        "version": 1,
+        "identity": {"user_attribute": "mail"},
+        "ldap": {"url": "ldap://ldap"},
+        "services": services,
+    }
+    path.write_text(yaml.safe_dump(config))
+    # Make sure the change is visible even within the filesystem's mtime resolution
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_touches_only_changed_engines(tmp_path, monkeypatch):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory())
+    path = tmp_path / "config.yaml"
+    _write(path, [_service("a"), _service("b"), _service("c")])
+    manager = EngineManager(load_config(path))
+    manager.build_engines()
+    before = dict(manager.engines)
+    watcher = ConfigWatcher(path, manager)
+
+    _write(
+        path,
+        [
+            _service("a"),
+            _service("b", mappings=("Mock Group 1", "Mock Group 2"), interval=30),
+            _service("c", base_url="mock://other"),
+            _service("d"),
+        ],
+    )
+    actions = asyncio.run(watcher.check())
+
+    assert actions["unchanged"] == ["a"]
+    assert actions["reconfigured"] == ["b"]
+    assert actions["rebuilt"] == ["c"]
+    assert actions["added"] == ["d"]
+    assert manager.engines["a"] is before["a"]
+    # Reconfigured in place: same adapter and directory, new mappings
+    assert manager.engines["b"] is before["b"]
+    assert [m.target_group_name for m in manager.engines["b"].mappings] == ["Mock Group 1", "Mock Group 2"]
+    # Rebuilt with a new adapter but the same LDAP provider
+    assert manager.engines["c"].adapter is not before["c"].adapter
+    assert manager.engines["c"].directory is before["c"].directory
+    assert registry.get_sample_value("config_reload_seconds_count", {"result": "applied"}) >= 1
+
+
+def test_invalid_config_keeps_running_engines(tmp_path, monkeypatch):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory())
+    path = tmp_path / "config.yaml"
+    _write(path, [_service("a")])
+    manager = EngineManager(load_config(path))
+    manager.build_engines()
+    engine = manager.engines["a"]
+    watcher = ConfigWatcher(path, manager)
+
+    path.write_text("services: [not-a-service]\n")
+    assert asyncio.run(watcher.check()) is None
+    assert manager.engines["a"] is engine
+    assert registry.get_sample_value("config_reload_seconds_count", {"result": "invalid"}) >= 1
+
+
+def test_snapshots_only_for_targets_shared_by_several_engines(tmp_path, monkeypatch):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory())
+
+    def owui(name, base_url="http://owui"):
+        return dict(_service(name, base_url=base_url), type="openwebui")
+
+    path = tmp_path / "config.yaml"
+    _write(path, [owui("a"), owui("b", "http://other")])
+    manager = EngineManager(load_config(path))
+    manager.build_engines()
+    watcher = ConfigWatcher(path, manager)
+    assert manager.engines["a"].adapter.snapshot is None
+    assert manager.engines["b"].adapter.snapshot is None
+
+    _write(path, [owui("a"), owui("b", "http://other"), owui("c")])
+    asyncio.run(watcher.check())
+    assert manager.engines["a"].adapter.snapshot is manager.engines["c"].adapter.snapshot is not None
+    assert manager.engines["b"].adapter.snapshot is None
+
+    _write(path, [owui("a"), owui("b", "http://other")])
+    asyncio.run(watcher.check())
+    assert manager.engines["a"].adapter.snapshot is None
+    assert len(manager.target_snapshots) == 0
+
+
+def test_reload_waits_for_a_running_warm_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory())
+    path = tmp_path / "config.yaml"
+    _write(path, [_service("a")])
+    manager = EngineManager(load_config(path))
+    manager.build_engines()
+    engine = manager.engines["a"]
+    release = threading.Event()
+    calls = []
+
+    def warm_up():
+        calls.append("start")
+        release.wait(5)
+        calls.append("end")
+
+    engine.warm_up = warm_up
+    _write(path, [_service("a", interval=30)])
+
+    async def scenario():
+        await manager.start()
+        while not calls:
+            await asyncio.sleep(0.01)
+        reload = asyncio.create_task(manager.apply_config(load_config(path)))
+        await asyncio.sleep(0.1)
+        # The old task is cancelled, but reconfiguring waits for its warm-up thread
+        assert not reload.done()
+        release.set()
+        assert (await reload)["reconfigured"] == ["a"]
+        while len(calls) < 4:
+            await asyncio.sleep(0.01)
+        await manager.stop()
+
+    asyncio.run(scenario())
+    assert calls == ["start", "end", "start", "end"]
+
+
+def test_restart_only_sections_are_reported(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(EngineManager, "_build_directory", lambda self, max_connections=1: FakeDirectory())
+    path = tmp_path / "config.yaml"
+    _write(path, [_service("a")])
+    manager = EngineManager(load_config(path))
+    manager.build_engines()
+    config = load_config(path).model_copy(update={"reload": {"interval_seconds": 5}})
+
+    actions = asyncio.run(manager.apply_config(config))
+
+    assert actions["unchanged"] == ["a"]
+    assert manager.config.reload == {"interval_seconds": 5}
+    assert "Config section 'reload' changed; restart the service to apply it" in caplog.text
+    assert "'sharding'" not in caplog.text
@@ -1,4 +1,6 @@
-from sync_service.services.mappers import diff_members
+from array import array
+
+from sync_service.services.mappers import bulk_diff, diff_members
 
 
 def test_diff_members():
@@ -7,3 +9,16 @@ def test_diff_members():
     )
     assert adds == {"a@example.com"}
     assert deletes == {"c@example.com"}
+
+
+def test_bulk_diff_returns_deltas_for_changed_groups_only():
+    deltas = bulk_diff(
+        {
+            "same": (array("I", [1, 2, 3]), array("I", [1, 2, 3])),
+            "changed": (array("I", [1, 2, 5]), array("I", [2, 3, 4])),
+            "new": (array("I", [7]), array("I")),
+        }
+    )
+    assert set(deltas) == {"changed", "new"}
+    assert deltas["changed"] == (array("I", [1, 5]), array("I", [3, 4]))
+    assert deltas["new"] == (array("I", [7]), array("I"))
@@ -0,0 +1,54 @@
+import os
+
+import httpx
+
+from sync_service.utils.http import ClientRegistry, PoolCollector, PoolSettings, ServiceClient
+
+
+def test_services_on_one_host_share_a_pool_with_their_own_headers():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((str(request.url), request.headers["Authorization"]))
+        return httpx.Response(200, json={})
+
+    created = []
+
+    def factory(settings):
+        created.append(settings)
+        return httpx.Client(transport=httpx.MockTransport(handler))
+
+    registry = ClientRegistry(factory=factory)
+    settings = PoolSettings(max_connections=4)
+    a = ServiceClient("http://owui:8080/api", settings, headers={"Authorization": "Bearer a"}, registry=registry)
+    b = ServiceClient("http://owui:8080", settings, headers={"Authorization": "Bearer b"}, registry=registry)
+    other = ServiceClient("http://other", settings, registry=registry, headers={"Authorization": "x"})
+    assert len(created) == 2
+
+    a.get("http://owui:8080/x")
+    b.post("http://owui:8080/y", json={})
+    assert seen == [("http://owui:8080/x", "Bearer a"), ("http://owui:8080/y", "Bearer b")]
+
+    families = {f.name: f for f in PoolCollector(registry).collect()}
+    limits = {s.labels["pool"]: s.value for s in families["http_pool_max_connections"].samples}
+    assert limits == {"http://owui:8080": 4, "http://other": 4}
+
+    a.close()
+    assert len(registry) == 2
+    b.close()
+    other.close()
+    assert len(registry) == 0
+
+
+def test_pools_sharing_an_origin_get_distinct_labels():
+    registry = ClientRegistry(factory=lambda settings: httpx.Client(transport=httpx.MockTransport(lambda r: None)))
+    small = ServiceClient("http://owui:8080", PoolSettings(max_connections=2), registry=registry)
+    large = ServiceClient("http://owui:8080", PoolSettings(max_connections=8), registry=registry)
+
+    families = {f.name: f for f in PoolCollector(registry, per_process=True).collect()}
+    samples = families["http_pool_max_connections"].samples
+    assert {s.labels["pool"]: s.value for s in samples} == {"http://owui:8080": 2, "http://owui:8080#2": 8}
+    assert {s.labels["pid"] for s in samples} == {str(os.getpid())}
+
+    small.close()
+    large.close()
@@ -0,0 +1,37 @@
+from sync_service.domain.identity import GroupRecord, IdentityTable
+
+
+def test_identity_table_interns_and_rebinds():
+    table = IdentityTable()
+    a = table.bind("a@example.com", "10")
+    assert table.intern("a@example.com") == a
+    assert table.intern("pending@example.com") == a + 1
+    assert table.target_id("pending@example.com") is None
+
+    # Target id moves to a new email: the old email keeps its ident but loses the account
+    b = table.bind("b@example.com", "10")
+    assert table.for_target("10") == b
+    assert table.target_ids[a] is None
+    assert table.bound_count == 1
+
+
+def test_group_record_holds_sorted_idents():
+    table = IdentityTable()
+    for i, email in enumerate(["c@x", "a@x", "b@x"]):
+        table.bind(email, str(i))
+    group = GroupRecord.from_api({"id": "g", "name": "grp", "user_ids": ["2", "0", "unknown"]}, table)
+    assert list(group.members) == [0, 2]
+    assert group.members.typecode == "I"
+
+
+def test_compact_drops_unbound_idents_and_keeps_order():
+    table = IdentityTable()
+    for email, target in [("a@x", "1"), ("gone@x", "2"), ("b@x", "3")]:
+        table.bind(email, target)
+    table.unbind("2")
+
+    remap = table.compact()
+    assert list(remap) == [0, -1, 1]
+    assert table.emails == ["a@x", "b@x"]
+    assert table.for_target("3") == 1
+    assert table.lookup("gone@x") is None
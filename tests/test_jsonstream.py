@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from sync_service.utils.jsonstream import iter_array_items
+
+
+def _bytewise(document):
+    data = json.dumps(document, ensure_ascii=False).encode()
+    return [data[i : i + 1] for i in range(len(data))]
+
+
+def test_items_are_parsed_across_chunk_boundaries():
+    users = [{"id": str(i), "email": f"ü{i}@example.com", "updated_at": 12345 + i} for i in range(5)]
+    assert list(iter_array_items(_bytewise(users))) == users
+    assert list(iter_array_items(_bytewise([1, 23, 456.5, None]))) == [1, 23, 456.5, None]
+
+
+def test_array_under_key_skips_preceding_values():
+    document = {"total": 2, "meta": {"users": "not this one"}, "users": [{"id": "1"}, {"id": "2"}], "next": None}
+    assert list(iter_array_items(_bytewise(document), "users")) == [{"id": "1"}, {"id": "2"}]
+    assert list(iter_array_items([b'{"users": []}'], "users")) == []
+
+
+def test_truncated_or_keyless_documents_raise():
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'[{"id": "1"}, {"id":']))
+    with pytest.raises(ValueError):
+        list(iter_array_items([b'{"total": 0}'], "users"))
@@ -38,3 +38,49 @@ def test_get_group_members():
     )
     members = list(provider.get_group_members("cn=group,dc=example,dc=com"))
     assert members == ["user1@example.com"]
+
+
+def test_pooled_connections_are_reused_across_threads_and_unbound_on_close(monkeypatch):
+    import threading
+
+    import sync_service.adapters.ldap_provider as ldap_provider
+
+    created = []
+
+    class FakeConnection:
+        def __init__(self, *args, **kwargs):
+            self.bound = False
+            self.entries = []
+            created.append(self)
+
+        def bind(self):
+            self.bound = True
+            return True
+
+        def unbind(self):
+            self.bound = False
+
+        def search(self, **kwargs):
+            pass
+
+    monkeypatch.setattr(ldap_provider, "Connection", FakeConnection)
+    provider = LDAPProvider(
+        url="ldap://pooled",
+        bind_dn="cn=admin,dc=example,dc=com",
+        bind_password="pw",
+        base_dn="dc=example,dc=com",
+        group_object_class="group",
+        membership_attr="member",
+        user_filter="(objectClass=user)",
+        identity_attr="mail",
+        max_connections=2,
+    )
+    provider.connect()
+    for _ in range(3):
+        # A new thread per iteration, as the sync pipeline starts
+        worker = threading.Thread(target=lambda: list(provider.get_group_members("cn=group,dc=example,dc=com")))
+        worker.start()
+        worker.join()
+    assert len(created) == 1
+    provider.close()
+    assert not created[0].bound
@@ -0,0 +1,149 @@
+from benchmarks.litellm_standin import LiteLLMStandIn
+from fakes import FakeDirectory
+from sync_service.adapters.litellm_adapter import LiteLLMAdapter
+from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
+from sync_service.adapters.resolver import UserResolver
+from sync_service.domain.models import GroupMapping
+from sync_service.services.sync_engine import SyncEngine
+from sync_service.services.write_plan import plan_write
+
+
+def _standin(users: int = 5, members=("u0", "u1")):
+    return LiteLLMStandIn(
+        users=[{"user_id": f"u{i}", "user_email": f"user{i}@example.com"} for i in range(users)],
+        teams={"t1": {"team_alias": "engineering", "members": list(members)}},
+    )
+
+
+def _adapter(standin: LiteLLMStandIn, **kwargs) -> LiteLLMAdapter:
+    adapter = LiteLLMAdapter(base_url="http://litellm", api_key=standin.master_key, **kwargs)
+    adapter.client = standin.client()
+    adapter.client.headers["Authorization"] = f"Bearer {standin.master_key}"
+    return adapter
+
+
+def test_lists_teams_and_pages_through_users():
+    standin = _standin(users=5)
+    adapter = _adapter(standin, users_page_size=2)
+
+    assert adapter.list_groups() == [
+        {"id": "t1", "name": "engineering", "description": "", "user_ids": ["u0", "u1"]}
+    ]
+    assert len(adapter.refresh_users()) == 5
+    assert standin.requests["GET /user/list"] == 3
+    assert adapter.identities.target_id("user4@example.com") == "u4"
+    assert adapter.refresh_users() == []
+    assert adapter.find_user("user3@example.com")["user_id"] == "u3"
+    assert adapter.find_user("user@example.com") is None
+
+
+def test_engine_adds_in_bulk_and_removes_per_member():
+    standin = _standin(users=6, members=("u0", "u1", "u5"))
+    adapter = _adapter(standin)
+    engine = SyncEngine(
+        FakeDirectory(["user0@example.com", "user2@example.com", "user3@example.com", "user4@example.com"]),
+        adapter,
+        [GroupMapping(ldap_group_dn="cn=eng,dc=example,dc=com", target_group_name="engineering")],
+    )
+
+    results = engine.run_iteration()
+
+    assert results["engineering"] == {"status": "updated", "adds": 3, "deletes": 2}
+    assert sorted(standin.teams["t1"]["members"]) == ["u0", "u2", "u3", "u4"]
+    assert standin.requests["POST /team/member_add"] == 1
+    assert standin.requests["POST /team/member_delete"] == 2
+    assert engine.run_iteration()["engineering"]["status"] == "unchanged"
+
+
+def test_write_plan_prefers_the_cheapest_supported_operations():
+    owui = OpenWebUIAdapter.capabilities
+    assert plan_write(owui, current=10, adds=5, deletes=5) == ("set_members",)
+    assert plan_write(owui, current=100000, adds=10, deletes=0) == ("add_members",)
+    # OpenWebUI cannot remove single members, so any removal rewrites the group
+    assert plan_write(owui, current=10000, adds=0, deletes=1) == ("set_members",)
+    assert plan_write(owui, current=100000, adds=3, deletes=2) == ("set_members",)
+    assert plan_write(owui, current=100000, adds=1, deletes=0, unknown=3) == ("set_members",)
+    litellm = LiteLLMAdapter.capabilities
+    assert plan_write(litellm, current=100000, adds=3, deletes=2) == ("add_members", "remove_member")
+    assert plan_write({"add_members"}, current=10, adds=1, deletes=1) is None
+
+
+def test_resolver_looks_up_new_members_and_lists_when_cheaper(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("sync_service.adapters.resolver.monotonic", lambda: clock[0])
+    standin = _standin(users=20, members=())
+    adapter = _adapter(standin, users_page_size=5)
+    ldap = FakeDirectory(["user0@example.com"])
+    engine = SyncEngine(
+        ldap,
+        adapter,
+        [GroupMapping(ldap_group_dn="cn=eng,dc=example,dc=com", target_group_name="engineering")],
+        resolver=UserResolver(adapter, max_lookups=3, concurrency=2),
+    )
+    engine.run_iteration()
+    assert standin.requests["GET /user/list"] == 4
+
+    # A new account and an email without one: two lookups, no listing
+    standin.users["u20"] = {"user_id": "u20", "user_email": "user20@example.com"}
+    ldap.members |= {"user1@example.com", "user20@example.com", "nobody@example.com"}
+    assert engine.run_iteration()["engineering"]["adds"] == 2
+    assert standin.requests["GET /user/list"] == 6
+    assert engine.pending.emails() == ["nobody@example.com"]
+
+    # Missing emails are not looked up again until recheck_seconds pass
+    assert engine.run_iteration()["engineering"]["status"] == "unchanged"
+    assert engine.sync_new_users() == 0
+    assert standin.requests["GET /user/list"] == 6
+
+    # The account appears: the pending email is looked up by the new-user check
+    standin.users["u21"] = {"user_id": "u21", "user_email": "nobody@example.com"}
+    clock[0] += engine.resolver.recheck_seconds
+    assert engine.sync_new_users() == 1
+    assert standin.requests["GET /user/list"] == 7
+    assert "u21" in standin.teams["t1"]["members"]
+
+    # More emails than max_lookups fall back to the full listing
+    for i in range(22, 28):
+        standin.users[f"u{i}"] = {"user_id": f"u{i}", "user_email": f"user{i}@example.com"}
+        ldap.members.add(f"user{i}@example.com")
+    assert engine.run_iteration()["engineering"]["adds"] == 6
+    assert standin.requests["GET /user/list"] == 7 + 6
+
+
+def test_new_user_checks_never_list_all_users(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("sync_service.adapters.resolver.monotonic", lambda: clock[0])
+    standin = _standin(users=20, members=())
+    adapter = _adapter(standin, users_page_size=5)
+    ldap = FakeDirectory(["user0@example.com", "gone0@example.com", "gone1@example.com"])
+    engine = SyncEngine(
+        ldap,
+        adapter,
+        [GroupMapping(ldap_group_dn="cn=eng,dc=example,dc=com", target_group_name="engineering")],
+        resolver=UserResolver(adapter, max_lookups=3, recheck_seconds=10),
+    )
+    engine.run_iteration()
+    listings = standin.requests["GET /user/list"]
+
+    # The listing just saw every account, so its misses are not looked up again
+    for _ in range(3):
+        clock[0] += 10
+        assert engine.sync_new_users() == 0
+    assert standin.requests["GET /user/list"] == listings
+
+    # Two rounds of lookups leave more pending emails than max_lookups
+    ldap.members |= {"new0@example.com", "new1@example.com"}
+    engine.run_iteration()
+    ldap.members |= {"new2@example.com", "new3@example.com"}
+    engine.run_iteration()
+    assert standin.requests["GET /user/list"] == listings + 4
+    assert len(engine.pending.emails()) == 6
+
+    # Rechecks look up at most max_lookups per tick and never list all users
+    clock[0] += 10
+    requests = []
+    for _ in range(3):
+        before = standin.requests["GET /user/list"]
+        assert engine.sync_new_users() == 0
+        requests.append(standin.requests["GET /user/list"] - before)
+    assert requests == [3, 1, 0]
@@ -0,0 +1,52 @@
+import json
+import logging
+import queue
+
+from sync_service.logging_conf import DeferredQueueHandler, JsonFormatter, SamplingFilter, capped, lazy
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord("sync", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_caps_collections_and_renders_lazily():
+    calls = []
+    record = make_record(
+        "plan %s",
+        capped(set(range(1000)), limit=3),
+        mapping="grp",
+        members=capped(list(range(1000)), limit=2),
+        expensive=lazy(lambda: calls.append(1) or 42),
+    )
+    assert calls == []
+    payload = json.loads(JsonFormatter().format(record))
+    assert payload["message"].startswith("plan 1000 [")
+    assert payload["members"] == {"count": 1000, "sample": [0, 1]}
+    assert payload["mapping"] == "grp"
+    assert payload["expensive"] == 42
+    assert calls == [1]
+
+
+def test_sampling_filter_keeps_first_then_every_nth():
+    sampler = SamplingFilter(first=2, every=5)
+    passed = [
+        record
+        for record in (make_record("x", sample_key="missing") for _ in range(10))
+        if sampler.filter(record)
+    ]
+    assert len(passed) == 4
+    assert passed[2].suppressed == 2
+    assert sampler.filter(make_record("unsampled"))
+
+
+def test_queue_handler_leaves_formatting_to_the_listener():
+    calls = []
+    handler = DeferredQueueHandler(queue.SimpleQueue())
+    handler.handle(make_record("value %s", lazy(lambda: calls.append(1) or "x")))
+
+    queued = handler.queue.get_nowait()
+    assert calls == []
+    assert queued.msg == "value %s" and len(queued.args) == 1
+    assert json.loads(JsonFormatter().format(queued))["message"] == "value x"
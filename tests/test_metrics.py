@@ -0,0 +1,44 @@
+from sync_service.metrics import (
+    count_external_calls,
+    registry,
+    track_external_request,
+)
+
+
+def test_external_calls_are_counted_per_context():
+    with count_external_calls() as calls:
+        with track_external_request("owui", "list_users"):
+            pass
+        with track_external_request("ldap", "member_lookup"):
+            pass
+    with track_external_request("owui", "list_users"):
+        pass
+    assert calls.count == 2
+    assert registry.get_sample_value(
+        "external_request_seconds_count",
+        {"target": "owui", "operation": "list_users"},
+    ) >= 2
+
+
+def test_multiprocess_mode_aggregates_worker_processes(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = (
+        "from sync_service.metrics import pending_users, track_external_request\n"
+        "with track_external_request('owui', 'list_users'):\n"
+        "    pending_users.labels(engine='owui').set(3)\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    scrape = subprocess.run(
+        [sys.executable, "-c", "import sys; from sync_service.metrics import export_metrics; sys.stdout.buffer.write(export_metrics())"],
+        env=env,
+        check=True,
+        capture_output=True,
+    ).stdout.decode()
+
+    assert 'external_request_seconds_count{operation="list_users",target="owui"} 2.0' in scrape
+    assert 'inflight_requests{target="owui"} 0.0' in scrape
@@ -0,0 +1,46 @@
+from sync_service.adapters.mock_adapter import MockAdapter
+from sync_service.domain.models import GroupMapping
+from sync_service.services.sync_engine import SyncEngine
+from sync_service.utils.synthetic import generate_dataset
+
+from benchmarks.e2e_sync import SyntheticDirectory
+
+
+def test_generated_mock_adapter_is_indexed_and_counts_calls():
+    adapter = MockAdapter.generated(users=100, groups=2, group_size=10)
+    group = adapter.list_groups()[0]
+    assert len(group["user_ids"]) == 10
+
+    adapter.update_group_users(group["id"], group["user_ids"][:3], group["name"])
+    adapter.add_user_to_group(group["id"], group["user_ids"][5])
+    adapter.remove_user_from_group(group["id"], group["user_ids"][0])
+    assert len(adapter.members[group["id"]]) == 3
+    assert adapter.calls["update_group"] == 1
+    assert adapter.calls["list_groups"] == 1
+
+
+def test_refresh_users_returns_only_new_accounts(tmp_path):
+    adapter = MockAdapter.generated(users=5, groups=1, group_size=2)
+    assert len(adapter.refresh_users()) == 5
+    assert adapter.refresh_users() == []
+    adapter.add_user({"id": "new", "email": "new@example.com"})
+    assert [u["id"] for u in adapter.refresh_users()] == ["new"]
+    assert adapter.identities.target_id("new@example.com") == "new"
+
+    path = tmp_path / "recorded.json"
+    adapter.dump(path)
+    assert len(MockAdapter(base_url="", api_key="", dataset_path=str(path)).users) == 6
+
+
+def test_engine_converges_against_mock_adapter():
+    dataset = generate_dataset(users=200, groups=3, group_size=40)
+    for members in dataset.ldap_groups.values():
+        del members[:5]
+    adapter = MockAdapter(base_url="", api_key="", dataset=dataset)
+    mappings = [GroupMapping(**m) for m in dataset.mappings]
+    engine = SyncEngine(SyntheticDirectory(dataset), adapter, mappings)
+    engine.run_iteration()
+    assert adapter.calls["update_group"] == 3
+    assert all(len(m) == 35 for m in adapter.members.values())
+    engine.run_iteration()
+    assert adapter.calls["update_group"] == 3
@@ -0,0 +1,39 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+spec = importlib.util.spec_from_file_location("mock_api", ROOT / "scripts" / "mock_api.py")
+mock_api = sys.modules["mock_api"] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mock_api)
+
+
+def test_generated_dataset_pagination_update_and_request_log():
+    app = mock_api.create_app(mock_api.MockSettings(users=250, groups=3, group_size=50, page_size=100))
+    client = TestClient(app)
+
+    page = client.get("/api/v1/users/", params={"page": 3, "order_by": "created_at"}).json()
+    assert page["total"] == 250
+    assert len(page["users"]) == 50
+
+    group = client.get("/api/v1/groups/").json()[0]
+    resp = client.post(
+        f"/api/v1/groups/id/{group['id']}/update",
+        json={"name": group["name"], "description": "", "user_ids": group["user_ids"][:10]},
+    )
+    assert resp.status_code == 200
+    assert len(resp.json()["user_ids"]) == 10
+
+    log = client.get("/_mock/requests").json()
+    assert log["requests"] == {"list_users": 1, "list_groups": 1, "update_group": 1}
+    client.delete("/_mock/requests")
+    assert client.get("/_mock/requests").json()["total"] == 0
+
+
+def test_injected_rate_limiting():
+    app = mock_api.create_app(mock_api.MockSettings(rate_limit_rate=1.0, retry_after_seconds=7))
+    resp = TestClient(app).get("/api/v1/groups")
+    assert resp.status_code == 429
+    assert resp.headers["retry-after"] == "7"
@@ -1,3 +1,8 @@
+import gzip
+import json
+
+import httpx
+
 from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
 
 
@@ -5,3 +10,167 @@ def test_path_templating():
     adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x")
     url = adapter._url("group_users", group_id="123")
     assert url == "http://localhost/api/v1/groups/123/users"
+
+
+def test_refresh_users_fetches_only_users_past_watermark():
+    users = [
+        {"id": "1", "email": "a@example.com", "created_at": 100, "updated_at": 100},
+        {"id": "2", "email": "b@example.com", "created_at": 200, "updated_at": 200},
+    ]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        ordered = sorted(users, key=lambda u: u["updated_at"], reverse=True)
+        return httpx.Response(200, json={"users": ordered, "total": len(ordered)})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x")
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert {u["id"] for u in adapter.refresh_users()} == {"1", "2"}
+    assert adapter.user_watermark == 200
+    assert adapter.refresh_users() == []
+
+    users.append({"id": "3", "email": "c@example.com", "created_at": 300, "updated_at": 300})
+    users[0] = {"id": "1", "email": "a2@example.com", "created_at": 100, "updated_at": 350}
+    changed = adapter.refresh_users()
+    assert {u["id"] for u in changed} == {"1", "3"}
+    assert adapter.identities.target_id("a2@example.com") == "1"
+    assert adapter.identities.target_id("a@example.com") is None
+    assert adapter.identities.target_id("c@example.com") == "3"
+    assert requests[-1].url.params["order_by"] == "updated_at"
+
+
+def test_update_group_users_streams_non_list_member_ids():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.read()))
+        return httpx.Response(200, json={})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x", path_templates={"update_group": "/g/{group_id}"})
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+    adapter.update_group_users("1", (str(i) for i in range(5)), "grp", "desc")
+    adapter.update_group_users("1", [], "grp")
+    assert bodies[0] == {"name": "grp", "description": "desc", "user_ids": ["0", "1", "2", "3", "4"]}
+    assert bodies[1]["user_ids"] == []
+
+
+def test_list_groups_revalidates_with_etag():
+    groups = [{"id": "1", "name": "grp", "user_ids": ["10"]}]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        etag = f'"v{len(groups[0]["user_ids"])}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, json=groups, headers={"ETag": etag})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x")
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert adapter.list_groups() == groups
+    assert not adapter.groups_unchanged
+    # Unchanged: the cached listing, without member lists
+    cached = adapter.list_groups()
+    assert cached == [{"id": "1", "name": "grp"}]
+    assert adapter.groups_unchanged
+    assert adapter.list_groups() is cached
+    assert requests[-1].headers["if-none-match"] == '"v1"'
+
+    groups[0]["user_ids"].append("11")
+    assert adapter.list_groups()[0]["user_ids"] == ["10", "11"]
+    assert not adapter.groups_unchanged
+
+
+def test_full_user_refresh_skips_reindex_on_identical_body():
+    users = [{"id": "1", "email": "a@example.com", "created_at": 100, "updated_at": 100}]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert "if-none-match" not in request.headers
+        return httpx.Response(200, json={"users": users, "total": len(users)})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x", full_user_refresh_seconds=0)
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert len(adapter.refresh_users()) == 1
+    version = adapter.users_version
+    indexed = []
+    adapter._index_user = indexed.append
+    assert adapter.refresh_users() == []
+    assert indexed == []
+    assert adapter.users_version == version
+    assert adapter.identities.target_id("a@example.com") == "1"
+
+
+def test_streamed_full_refresh_indexes_users_and_restores_on_failure():
+    users = [{"id": str(i), "email": f"u{i}@example.com", "updated_at": i} for i in range(1, 4)]
+    broken = []
+
+    def body():
+        data = json.dumps({"users": users, "total": len(users)}).encode()
+        yield data[:20]
+        if broken:
+            raise httpx.ReadError("connection reset")
+        yield data[20:]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x", stream_json=True, full_user_refresh_seconds=0)
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert [u["id"] for u in adapter.refresh_users()] == ["1", "2", "3"]
+    assert adapter.identities.target_id("u3@example.com") == "3"
+
+    broken.append(True)
+    users.pop()
+    try:
+        adapter.refresh_users()
+    except httpx.ReadError:
+        pass
+    assert adapter.identities.target_id("u3@example.com") == "3"
+    assert set(adapter.users_by_id) == {"1", "2", "3"}
+
+
+def test_update_group_users_gzips_bodies():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["content-encoding"] == "gzip"
+        bodies.append(json.loads(gzip.decompress(request.read())))
+        return httpx.Response(200, json={})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x", compress_requests=True)
+    adapter.path_templates["update_group"] = "/api/v1/groups/id/{group_id}/update"
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    adapter.update_group_users("1", ["a", "b"], "grp")
+    adapter.update_group_users("1", iter(["c"]), "grp")
+    assert [b["user_ids"] for b in bodies] == [["a", "b"], ["c"]]
+
+
+def test_incremental_refresh_pages_past_short_server_pages():
+    users = [{"id": str(i), "email": f"u{i}@example.com", "updated_at": 100 + i} for i in range(3)]
+    pages = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        ordered = sorted(users, key=lambda u: u["updated_at"], reverse=True)
+        if "page" not in request.url.params:
+            return httpx.Response(200, json={"users": ordered, "total": len(ordered)})
+        # The server pages by 2, not the 100 a client might assume
+        page = int(request.url.params["page"])
+        pages.append(page)
+        return httpx.Response(200, json={"users": ordered[(page - 1) * 2 : page * 2], "total": len(ordered)})
+
+    adapter = OpenWebUIAdapter(base_url="http://localhost", api_key="x")
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+    adapter.refresh_users()
+    assert adapter.user_watermark == 102
+
+    users.extend({"id": str(i), "email": f"u{i}@example.com", "updated_at": 200 + i} for i in range(3, 8))
+    pages.clear()
+    assert {u["id"] for u in adapter.refresh_users()} == {str(i) for i in range(3, 8)}
+    assert pages == [1, 2, 3, 4]
+    assert adapter.user_watermark == 207
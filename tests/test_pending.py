@@ -0,0 +1,21 @@
+from sync_service.services.pending import PendingRegistry
+
+
+def test_pending_registry_tracks_groups_and_pages():
+    registry = PendingRegistry()
+    assert registry.add("b@example.com", "grp")
+    assert not registry.add("b@example.com", "other")
+    assert registry.add("a@example.com", "grp")
+    assert len(registry) == 2
+
+    registry.resolve("b@example.com", "grp")
+    assert registry.groups_for("b@example.com") == {"other"}
+    assert registry.emails_for("grp") == {"a@example.com"}
+
+    page = registry.page(offset=1, limit=1)
+    assert page["total"] == 2
+    assert [item["email"] for item in page["items"]] == ["b@example.com"]
+
+    registry.mark_checked("grp", 3)
+    assert registry.is_fresh("grp", 3)
+    assert not registry.is_fresh("grp", 4)
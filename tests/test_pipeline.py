@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from sync_service.services.pipeline import Pipeline, Stage
+
+
+def test_stages_overlap():
+    written = threading.Event()
+    order = []
+
+    def fetch(item):
+        if item == 1:
+            # Only completes if item 0 is written while item 1 is being read
+            assert written.wait(timeout=5)
+        order.append(("fetch", item))
+        return item
+
+    def write(item):
+        order.append(("write", item))
+        written.set()
+
+    Pipeline([Stage("fetch", fetch), Stage("write", write)], engine="overlap").run(range(3))
+    assert order.index(("write", 0)) < order.index(("fetch", 1))
+    assert [i for stage, i in order if stage == "write"] == [0, 1, 2]
+
+
+def test_bounded_queues_hold_back_upstream_stages():
+    release = threading.Event()
+    fetched = []
+
+    def fetch(item):
+        fetched.append(item)
+        return item
+
+    def write(item):
+        release.wait(timeout=5)
+
+    pipeline = Pipeline([Stage("fetch", fetch), Stage("write", write)], queue_size=1, engine="bounded")
+    runner = threading.Thread(target=pipeline.run, args=(range(20),))
+    runner.start()
+    # One item in the writer, one waiting for it, one held by the fetcher, one queued for the fetcher
+    runner.join(timeout=0.2)
+    assert len(fetched) <= 3
+    release.set()
+    runner.join(timeout=5)
+    assert fetched == list(range(20))
+
+
+def test_first_error_stops_the_pipeline_and_is_raised():
+    seen = []
+
+    def fetch(item):
+        if item == 2:
+            raise RuntimeError("directory down")
+        return item
+
+    with pytest.raises(RuntimeError, match="directory down"):
+        Pipeline(
+            [Stage("fetch", fetch, workers=2), Stage("write", seen.append, workers=2)], engine="failing"
+        ).run(range(100))
+    assert len(seen) < 100
+
+
+def test_batch_stage_receives_every_waiting_item():
+    fetched = threading.Event()
+    batches = []
+
+    def fetch(item):
+        if item == 5:
+            fetched.set()
+        return item
+
+    def diff(items):
+        # Hold the first batch until everything else waits in the queue
+        assert fetched.wait(timeout=5)
+        batches.append(list(items))
+        return [item for item in items if item % 2]
+
+    written = []
+    Pipeline(
+        [Stage("fetch", fetch), Stage("diff", diff, batch=True), Stage("write", written.append)],
+        queue_size=8,
+        engine="batch",
+    ).run(range(6))
+    assert len(batches) <= 2
+    assert sorted(i for batch in batches for i in batch) == list(range(6))
+    assert written == [1, 3, 5]
@@ -0,0 +1,102 @@
+from pathlib import Path
+from typing import Iterable, List
+
+from fakes import FakeAdapter
+from sync_service.adapters.base import DirectoryProvider
+from sync_service.domain.models import GroupMapping
+from sync_service.metrics import registry
+from sync_service.services.engine_manager import EngineManager
+from sync_service.services.schedule import MappingSchedule
+from sync_service.services.sync_engine import SyncEngine
+from sync_service.settings import load_config
+
+
+class ChurningDirectory(DirectoryProvider):
+    """``busy`` gets a new member on every read; ``static`` never changes."""
+
+    def __init__(self) -> None:
+        self.reads: List[str] = []
+
+    def get_group_members(self, group_dn: str) -> Iterable[str]:
+        name = group_dn.split(",")[0][3:]
+        self.reads.append(name)
+        if name == "busy":
+            return {f"u{i}@example.com" for i in range(self.reads.count("busy"))}
+        return {"u0@example.com"}
+
+
+def _adapter() -> FakeAdapter:
+    return FakeAdapter(
+        groups=[{"id": "1", "name": "busy", "user_ids": []}, {"id": "2", "name": "static", "user_ids": []}],
+        users=[{"id": str(i), "email": f"u{i}@example.com"} for i in range(20)],
+    )
+
+
+def test_intervals_adapt_within_bounds():
+    schedule = MappingSchedule(min_seconds=10, max_seconds=100, initial_seconds=40)
+    assert schedule.due(["a"], now=0) == ["a"]
+    schedule.record("a", "updated", changes=3, duration=0.1, now=0)
+    assert schedule.interval("a") == 20
+    assert schedule.due(["a"], now=19) == []
+    for now in (20, 40, 60):
+        schedule.record("a", "updated", changes=1, duration=0.1, now=now)
+    assert schedule.interval("a") == 10
+    for now in range(70, 200, 10):
+        schedule.record("a", "unchanged", changes=0, duration=0.1, now=now)
+    assert schedule.interval("a") == 100
+    # A slow sync is not repeated more often than its cost allows
+    schedule.record("b", "updated", changes=1, duration=5, now=0)
+    assert schedule.interval("b") == 50
+    schedule.record("b", "failed", changes=0, duration=5, now=0)
+    assert schedule.due(["b"], now=10) == ["b"]
+
+
+def test_engine_syncs_only_due_mappings(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("sync_service.services.sync_engine.monotonic", lambda: clock[0])
+    directory = ChurningDirectory()
+    adapter = _adapter()
+    mappings = [
+        GroupMapping(ldap_group_dn=f"cn={name},dc=example,dc=com", target_group_name=name)
+        for name in ("busy", "static")
+    ]
+    engine = SyncEngine(
+        directory, adapter, mappings, schedule=MappingSchedule(min_seconds=10, max_seconds=160, initial_seconds=40)
+    )
+
+    for _ in range(16):
+        engine.run_iteration()
+        clock[0] += 10
+    # busy converges on every tick after its first interval of 20s; static
+    # gets its member once, then backs off 30s, 45s, 67.5s
+    assert directory.reads.count("busy") == 15
+    assert directory.reads.count("static") == 4
+    assert engine.schedule.interval("busy") == 10
+    assert engine.schedule.interval("static") == 67.5
+
+    # Nothing due: the target is not even listed
+    engine.mappings = mappings[1:]
+    listings = adapter.listings
+    assert engine.run_iteration() == {}
+    assert adapter.listings == listings
+
+
+def test_ticks_without_due_mappings_are_not_counted_as_iterations():
+    engine = SyncEngine(
+        ChurningDirectory(),
+        _adapter(),
+        [GroupMapping(ldap_group_dn="cn=busy,dc=example,dc=com", target_group_name="busy")],
+        name="scheduled",
+        schedule=MappingSchedule(min_seconds=10, max_seconds=160, initial_seconds=40),
+    )
+    manager = EngineManager(load_config(Path("config/config.yaml")))
+    manager.engines = {"scheduled": engine}
+
+    def iterations():
+        return registry.get_sample_value("sync_iterations_total", {"engine": "scheduled"}) or 0
+
+    before = iterations()
+    assert manager.run_once()["scheduled"]["mappings"]
+    assert iterations() == before + 1
+    assert manager.run_once()["scheduled"]["mappings"] == {}
+    assert iterations() == before + 1
@@ -0,0 +1,81 @@
+from sync_service.domain.models import GroupMapping
+from sync_service.services.sharding import HashRing, ShardCoordinator, SQLiteLeaseBackend
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _mappings(n):
+    return [GroupMapping(ldap_group_dn=f"cn=g{i}", target_group_name=f"g{i}") for i in range(n)]
+
+
+def test_ring_moves_few_keys_when_a_member_joins():
+    keys = [f"owui\x00g{i}" for i in range(1000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [k for k in keys if before.owner(k) != after.owner(k)]
+    # Only keys taken over by the new member change owner
+    assert all(after.owner(k) == "d" for k in moved)
+    assert 150 < len(moved) < 350
+    assert HashRing([]).owner("x") is None
+
+
+def test_replicas_split_mappings_and_rebalance(tmp_path):
+    clock = Clock()
+    backend = SQLiteLeaseBackend(str(tmp_path / "leases.db"), clock=clock)
+    first = ShardCoordinator(backend, "replica-1", lease_ttl_seconds=30)
+    second = ShardCoordinator(backend, "replica-2", lease_ttl_seconds=30)
+    mappings = _mappings(50)
+
+    first.refresh()
+    assert first.owned("owui", mappings) == mappings
+
+    second.refresh()
+    assert first.refresh()
+    owned_1 = first.owned("owui", mappings)
+    owned_2 = second.owned("owui", mappings)
+    assert owned_1 and owned_2
+    assert sorted(m.target_group_name for m in owned_1 + owned_2) == sorted(m.target_group_name for m in mappings)
+
+    # replica-2 stops renewing; once its lease expires replica-1 takes everything
+    clock.now += 31
+    first.refresh()
+    assert first.ring.members == ["replica-1"]
+    assert first.owned("owui", mappings) == mappings
+
+    second.refresh()
+    second.release()
+    first.refresh()
+    assert first.ring.members == ["replica-1"]
+
+
+def test_engine_syncs_only_owned_mappings(tmp_path):
+    from sync_service.adapters.mock_adapter import MockAdapter
+    from sync_service.services.sync_engine import SyncEngine
+
+    class Directory:
+        def connect(self):
+            pass
+
+        def get_group_members(self, group_dn):
+            return ["demo@example.com"]
+
+    backend = SQLiteLeaseBackend(str(tmp_path / "leases.db"))
+    coordinators = [ShardCoordinator(backend, f"r{i}") for i in range(2)]
+    for c in coordinators * 2:
+        c.refresh()
+    groups = [{"id": f"g{i}", "name": f"g{i}", "user_ids": []} for i in range(20)]
+    synced = set()
+    for coordinator in coordinators:
+        adapter = MockAdapter(base_url="mock://", api_key="")
+        adapter.seed(users=[{"id": "u1", "email": "demo@example.com"}], groups=groups)
+        engine = SyncEngine(Directory(), adapter, _mappings(20), name="owui", shard=coordinator)
+        results = engine.run_iteration()
+        assert synced.isdisjoint(results)
+        synced |= set(results)
+    assert synced == {f"g{i}" for i in range(20)}
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import httpx
+
+from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
+from sync_service.adapters.snapshot import SnapshotRegistry, TargetSnapshot
+
+
+def _target(delay: float = 0.0):
+    groups = [{"id": "1", "name": "a", "user_ids": ["10"]}, {"id": "2", "name": "b", "user_ids": []}]
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        time.sleep(delay)
+        return httpx.Response(200, json=groups if request.method == "GET" else {})
+
+    return requests, httpx.MockTransport(handler)
+
+
+def _adapters(transport, snapshot, count=2):
+    adapters = []
+    for _ in range(count):
+        adapter = OpenWebUIAdapter(
+            base_url="http://owui", api_key="x", snapshot=snapshot, snapshot_max_age_seconds=60,
+            path_templates={"update_group": "/api/v1/groups/{group_id}/update"},
+        )
+        adapter.client = httpx.Client(transport=transport)
+        adapters.append(adapter)
+    return adapters
+
+
+def test_adapters_share_one_fetch_per_tick():
+    requests, transport = _target(delay=0.05)
+    adapters = _adapters(transport, TargetSnapshot(), count=4)
+    results = []
+    threads = [threading.Thread(target=lambda a=a: results.append(a.list_groups())) for a in adapters]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(requests) == 1
+    assert all(groups is results[0] for groups in results)
+    assert adapters[0].list_groups() is results[0]
+    assert adapters[0].groups_unchanged
+
+
+def test_writes_are_published_copy_on_write():
+    requests, transport = _target()
+    writer, reader = _adapters(transport, TargetSnapshot())
+    before = reader.list_groups()
+
+    writer.update_group_users("1", ["10", "11"], "a")
+    after = reader.list_groups()
+
+    assert [r.method for r in requests] == ["GET", "POST"]
+    assert not reader.groups_unchanged
+    assert after[0]["user_ids"] == ["10", "11"]
+    assert before[0]["user_ids"] == ["10"]
+    assert after[1] is before[1]
+
+
+def test_registry_shares_snapshots_per_key_until_released():
+    registry = SnapshotRegistry()
+    a = registry.acquire(("http://owui", "k"))
+    b = registry.acquire(("http://owui", "k"))
+    c = registry.acquire(("http://owui", "other"))
+
+    assert a is b
+    assert a is not c
+    registry.release(a)
+    registry.release(b)
+    assert len(registry) == 1
+
+
+def test_unkept_listings_drop_their_body_once_expired():
+    snapshot = TargetSnapshot()
+    fetches = []
+
+    def fetch(previous):
+        fetches.append(previous)
+        return {"body": "x" * 10}
+
+    entry, fetched = snapshot.get("users", fetch, 0.05, expire=lambda e: dict(e, body=None))
+    assert fetched and entry["body"]
+    assert snapshot.get("users", fetch, 0.05)[1] is False
+    time.sleep(0.06)
+    # Any read sweeps expired entries, whatever its key
+    snapshot.get("groups", lambda previous: [], 60)
+    snapshot.get("users", fetch, 0.05)
+    assert fetches[-1] == {"body": None}
+
+
+def test_hash_match_does_not_mutate_the_published_listing():
+    etags = iter(["a", "b"])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=[], headers={"etag": next(etags)})
+
+    transport = httpx.MockTransport(handler)
+    snapshot = TargetSnapshot()
+    first, second = _adapters(transport, snapshot)
+    for adapter in (first, second):
+        adapter.snapshot_max_age_seconds = 0
+    first.list_groups()
+    published = next(iter(first._listings.values()))
+
+    second.list_groups()
+    assert published.etag == "a"
+    assert next(iter(second._listings.values())).etag == "b"
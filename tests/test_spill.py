@@ -0,0 +1,31 @@
+from array import array
+import os
+
+from sync_service.services.spill import SpilledEmails, SpilledIdents, collect_members, merge_diff
+
+
+def test_spilled_idents_merge_sorted_unique_runs(tmp_path):
+    spilled = SpilledIdents(run_size=3, directory=str(tmp_path))
+    spilled.extend([9, 2, 5, 2, 7, 1, 9, 0])
+    spilled.finish()
+    assert len(os.listdir(spilled._dir)) == 3
+    assert list(spilled) == [0, 1, 2, 5, 7, 9]
+    assert len(spilled) == 6
+    spilled.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_merge_diff_yields_adds_and_deletes():
+    changes = list(merge_diff([0, 2, 3, 8], array("I", [1, 2, 8, 9])))
+    assert changes == [(0, True), (1, False), (3, True), (9, False)]
+
+
+def test_collect_members_spills_streams_at_the_threshold(tmp_path):
+    assert collect_members(iter(["a", "b"]), threshold=3) == ["a", "b"]
+
+    members = collect_members((f"user{i}@example.com" for i in range(5)), threshold=3, directory=str(tmp_path))
+    assert isinstance(members, SpilledEmails)
+    assert len(members) == 5
+    assert list(members) == [f"user{i}@example.com" for i in range(5)]
+    members.close()
+    assert os.listdir(tmp_path) == []
@@ -1,51 +1,15 @@
 from typing import Iterable, List
 
-from sync_service.adapters.base import DirectoryProvider
+from fakes import FakeAdapter, FakeDirectory
 from sync_service.adapters.openwebui_adapter import OpenWebUIAdapter
 from sync_service.domain.models import GroupMapping
 from sync_service.services.sync_engine import SyncEngine
 
-
-class FakeDirectory(DirectoryProvider):
-    def get_group_members(self, group_dn: str) -> Iterable[str]:
-        return {"a@example.com", "b@example.com"}
-
-
-class FakeAdapter(OpenWebUIAdapter):
-    def __init__(self) -> None:  # type: ignore[override]
-        self.groups = [{"id": "1", "name": "grp"}]
-        self.users = [
-            {"id": "10", "email": "b@example.com"},
-            {"id": "11", "email": "c@example.com"},
-            {"id": "12", "email": "a@example.com"},
-        ]
-        self.group_members = {
-            "1": [
-                {"id": "10", "email": "b@example.com"},
-                {"id": "11", "email": "c@example.com"},
-            ]
-        }
-        self.added: List[tuple[str, str]] = []
-        self.removed: List[tuple[str, str]] = []
-
-    def list_groups(self):  # type: ignore[override]
-        return self.groups
-
-    def list_users(self):  # type: ignore[override]
-        return self.users
-
-    def list_group_users(self, group_id: str):  # type: ignore[override]
-        return self.group_members[group_id]
-
-    def add_user_to_group(self, group_id: str, user_id: str) -> None:  # type: ignore[override]
-        self.added.append((group_id, user_id))
-
-    def remove_user_from_group(self, group_id: str, user_id: str) -> None:  # type: ignore[override]
-        self.removed.append((group_id, user_id))
+MEMBERS = ("a@example.com", "b@example.com")
 
 
 def test_sync_engine_adds_and_deletes():
-    directory = FakeDirectory()
+    directory = FakeDirectory(MEMBERS)
     adapter = FakeAdapter()
     mapping = GroupMapping(
         ldap_group_dn="cn=grp,dc=example,dc=com",
@@ -58,3 +22,219 @@ def test_sync_engine_adds_and_deletes():
     assert ("1", "10") in adapter.added  # b@example.com
     # Note: User removal is not implemented in current version
     # assert adapter.removed == [("1", "11")]  # c@example.com should be removed
+
+
+def test_sync_new_users_reconciles_only_waiting_groups():
+    directory = FakeDirectory(MEMBERS)
+    adapter = FakeAdapter()
+    adapter.users = [{"id": "10", "email": "b@example.com"}]
+    adapter.groups.append({"id": "2", "name": "other"})
+    mappings = [
+        GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp"),
+        GroupMapping(ldap_group_dn="cn=other,dc=example,dc=com", target_group_name="other"),
+    ]
+    engine = SyncEngine(directory, adapter, mappings)
+    engine.run_iteration()
+    assert engine.pending.groups_for("a@example.com") == {"grp", "other"}
+
+    # Nothing new in the target: no group is touched
+    adapter.added.clear()
+    assert engine.sync_new_users() == 0
+
+    adapter.users.append({"id": "12", "email": "a@example.com"})
+    engine.mappings = mappings[:1]
+    assert engine.sync_new_users() == 1
+    assert adapter.added == [("1", "12")]
+    assert engine.pending.groups_for("a@example.com") == {"other"}
+
+
+def test_pending_users_are_not_rechecked_until_target_users_change(caplog):
+    directory = FakeDirectory(MEMBERS)
+    adapter = FakeAdapter()
+    adapter.users = [{"id": "10", "email": "b@example.com"}]
+    mapping = GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")
+    engine = SyncEngine(directory, adapter, [mapping], name="owui")
+
+    with caplog.at_level("INFO"):
+        engine.run_iteration()
+        engine.run_iteration()
+    assert caplog.text.count("User a@example.com not found") == 1
+    # Only the resolvable member was written; the pending one does not force updates
+    assert adapter.added == [("1", "10")]
+    assert engine.pending.page()["items"][0]["email"] == "a@example.com"
+
+
+def test_iteration_metrics_are_labeled_by_engine_and_mapping():
+    from sync_service.metrics import registry
+
+    engine = SyncEngine(
+        FakeDirectory(MEMBERS),
+        FakeAdapter(),
+        [GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")],
+        name="labeled",
+    )
+    engine.run_iteration()
+    assert registry.get_sample_value("sync_iteration_seconds_count", {"engine": "labeled"}) == 1
+    for phase in ("ldap_fetch", "resolve", "write"):
+        assert registry.get_sample_value(
+            "sync_phase_seconds_count",
+            {"engine": "labeled", "mapping": "grp", "phase": phase},
+        ) == 1
+    for phase in ("target_fetch", "diff"):
+        assert registry.get_sample_value(
+            "sync_phase_seconds_count",
+            {"engine": "labeled", "mapping": "all", "phase": phase},
+        ) == 1
+    for stage in ("fetch", "resolve", "diff", "write"):
+        assert registry.get_sample_value(
+            "sync_stage_busy_seconds_total", {"engine": "labeled", "stage": stage}
+        ) > 0
+
+
+def test_oversized_groups_are_diffed_on_disk(tmp_path):
+    from sync_service.adapters.mock_adapter import MockAdapter
+
+    adapter = MockAdapter(base_url="mock://", api_key="")
+    adapter.seed(
+        users=[{"id": "10", "email": "b@example.com"}, {"id": "12", "email": "a@example.com"}],
+        groups=[{"id": "1", "name": "grp", "user_ids": ["10", "11"]}],
+    )
+    engine = SyncEngine(
+        FakeDirectory(MEMBERS),
+        adapter,
+        [GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")],
+        spill_threshold=2,
+        spill_dir=str(tmp_path),
+    )
+    engine.run_iteration()
+    assert adapter.members["1"] == {"10", "12"}
+    # The LDAP members file is gone; the written member list is the group's current one
+    assert [p.name.startswith("sync-spill-") for p in tmp_path.iterdir()] == [True]
+
+    engine.run_iteration()
+    assert adapter.calls["update_group"] == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_engine_construction_is_offline_and_warm_up_records_phases():
+    from sync_service.adapters.mock_adapter import MockAdapter
+
+    adapter = MockAdapter(base_url="mock://", api_key="")
+    mapping = GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="Mock Group 1")
+    engine = SyncEngine(FakeDirectory(MEMBERS), adapter, [mapping])
+    assert sum(adapter.calls.values()) == 0
+    assert not engine.ready
+
+    engine.warm_up()
+    assert engine.warmup == {"directory": "done", "groups": "done", "users": "done"}
+    assert engine.group_name_to_id == {"Mock Group 1": "mock-group-1", "Mock Group 2": "mock-group-2"}
+
+
+def test_group_index_refreshes_on_missing_group():
+    adapter = FakeAdapter()
+    adapter.groups = []
+    mapping = GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")
+    engine = SyncEngine(FakeDirectory(MEMBERS), adapter, [mapping])
+    engine.warm_up()
+    assert engine.group_name_to_id == {}
+
+    # Created after discovery: picked up by the next iteration's listing
+    adapter.groups = [{"id": "1", "name": "grp"}]
+    engine.run_iteration()
+    assert engine.group_name_to_id == {"grp": "1"}
+    assert ("1", "10") in adapter.added
+
+
+def test_deadline_skips_remaining_mappings_and_stalest_run_first(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("sync_service.services.sync_engine.monotonic", lambda: clock[0])
+
+    class SlowDirectory(FakeDirectory):
+        def __init__(self) -> None:
+            super().__init__(MEMBERS)
+            self.read: List[str] = []
+
+        def get_group_members(self, group_dn: str) -> Iterable[str]:
+            self.read.append(group_dn.split(",")[0][3:])
+            clock[0] += 10
+            return super().get_group_members(group_dn)
+
+    directory = SlowDirectory()
+    adapter = FakeAdapter()
+    adapter.groups = [{"id": str(i), "name": f"g{i}"} for i in range(3)]
+    mappings = [
+        GroupMapping(ldap_group_dn=f"cn=g{i},dc=example,dc=com", target_group_name=f"g{i}") for i in range(3)
+    ]
+    engine = SyncEngine(directory, adapter, mappings, iteration_deadline_seconds=15)
+
+    results = engine.run_iteration()
+    assert [results[f"g{i}"]["status"] for i in range(3)] == ["updated", "updated", "skipped"]
+    assert directory.read == ["g0", "g1"]
+
+    # The skipped mapping has never succeeded, so it goes first next time
+    directory.read.clear()
+    results = engine.run_iteration()
+    assert directory.read == ["g2", "g0"]
+    assert results["g1"]["status"] == "skipped"
+
+
+def test_unchanged_listing_keeps_members_and_drops_deleted_users():
+    import json
+
+    import httpx
+
+    users = [{"id": "10", "email": "a@example.com"}, {"id": "11", "email": "b@example.com"}]
+    groups = [{"id": "1", "name": "grp", "user_ids": ["10", "11"]}]
+    updates = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            updates.append(request)
+            return httpx.Response(200, json={})
+        if request.url.path.endswith("/groups"):
+            if request.headers.get("if-none-match") == '"g"':
+                return httpx.Response(304)
+            return httpx.Response(200, json=groups, headers={"ETag": '"g"'})
+        return httpx.Response(200, json={"users": users})
+
+    adapter = OpenWebUIAdapter(
+        base_url="http://owui",
+        api_key="x",
+        full_user_refresh_seconds=0,
+        path_templates={"update_group": "/api/v1/groups/{group_id}/update"},
+    )
+    adapter.client = httpx.Client(transport=httpx.MockTransport(handler))
+    mapping = GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")
+    engine = SyncEngine(FakeDirectory(MEMBERS), adapter, [mapping])
+
+    assert engine.run_iteration()["grp"]["status"] == "unchanged"
+    assert engine.run_iteration()["grp"]["status"] == "unchanged"
+    assert adapter.groups_unchanged
+
+    # b@example.com's account is deleted: the 304 listing has no member lists to re-read
+    del users[1]
+    assert engine.run_iteration()["grp"]["status"] == "unchanged"
+    assert engine.pending.emails() == ["b@example.com"]
+
+    # Recreated under a new id: the deleted id is unknown, so the whole list is written
+    users.append({"id": "12", "email": "b@example.com"})
+    assert engine.run_iteration()["grp"]["adds"] == 1
+    assert [r.url.path for r in updates] == ["/api/v1/groups/1/update"]
+    assert sorted(json.loads(updates[0].content)["user_ids"]) == ["10", "12"]
+
+
+def test_identity_table_is_compacted_with_group_members(monkeypatch):
+    from sync_service.services import sync_engine
+
+    monkeypatch.setattr(sync_engine, "IDENTITY_COMPACT_MIN", 1)
+    adapter = FakeAdapter()
+    adapter.groups[0]["user_ids"] = ["10", "12"]
+    mapping = GroupMapping(ldap_group_dn="cn=grp,dc=example,dc=com", target_group_name="grp")
+    engine = SyncEngine(FakeDirectory(MEMBERS), adapter, [mapping])
+    for n in range(5):
+        adapter.identities.bind(f"old{n}@example.com", f"old{n}")
+        adapter.identities.unbind(f"old{n}")
+
+    assert engine.run_iteration()["grp"]["status"] == "unchanged"
+    assert len(adapter.identities) == 3
+    assert engine.run_iteration()["grp"]["status"] == "unchanged"
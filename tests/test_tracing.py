@@ -0,0 +1,49 @@
+import json
+
+from sync_service.metrics import track_external_request
+from sync_service.tracing import OTLPJsonFileExporter, Tracer, start_span
+
+
+def test_tracer_keeps_recent_span_trees(tmp_path):
+    exported = tmp_path / "spans.jsonl"
+    tracer = Tracer("owui", buffer_size=2, exporter=OTLPJsonFileExporter(str(exported)))
+
+    for i in range(3):
+        with tracer.trace("iteration", attempt=i):
+            with start_span("mapping", mapping="grp"):
+                with track_external_request("owui", "list_users"):
+                    pass
+
+    traces = tracer.recent_traces()
+    assert [t["attributes"]["attempt"] for t in traces] == [2, 1]
+    mapping = traces[0]["children"][0]
+    assert mapping["attributes"] == {"mapping": "grp"}
+    assert mapping["children"][0]["name"] == "owui.list_users"
+
+    # Exported in the background, several traces per request
+    tracer.close()
+    lines = exported.read_text().splitlines()
+    assert 1 <= len(lines) <= 3
+    spans = [s for line in lines for s in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    assert [s["name"] for s in spans] == ["iteration", "mapping", "owui.list_users"] * 3
+    assert spans[2]["parentSpanId"] == spans[1]["spanId"]
+
+
+def test_repeated_operations_beyond_the_cap_are_summarized():
+    tracer = Tracer("ldap", max_children=3)
+    with tracer.trace("iteration"):
+        with start_span("mapping", mapping="grp"):
+            for _ in range(10):
+                with track_external_request("ldap", "member_lookup"):
+                    pass
+
+    mapping = tracer.recent_traces()[0]["children"][0]
+    assert [c["name"] for c in mapping["children"]] == ["ldap.member_lookup"] * 4
+    summary = mapping["children"][-1]
+    assert summary["attributes"]["aggregated"] == 7
+    assert summary["attributes"]["errors"] == 0
+
+
+def test_spans_outside_a_trace_are_not_recorded():
+    with start_span("orphan") as span:
+        assert span is None